@@ -0,0 +1,107 @@
+"""Offline benchmark: best-of-N parallel drafts vs. the serial critic loop.
+
+Usage:
+    uv run python benchmarks/bench_best_of_n.py [--latency-ms 400] [--candidates 3] [--iterations 2]
+
+Runs every non-empty file in topic/ through the workflow twice with a fake
+LLM (fixed latency, drafts of mixed quality picked at random):
+  - serial: `iterations` critic → generator loops, one draft per call
+  - best-of-N: no critic loop, N concurrent first drafts, best kept by the
+    local scorer (src/agents/validators/xhs_post_scorer.py)
+and reports wall-clock time, LLM calls and the local score of the final post.
+The fake ignores critiques, so scores only show what ranking buys over a
+random draft; compare real-model quality separately.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("LLM_CACHE", "false")
+os.environ.setdefault("XHS_DATA_DIR", tempfile.mkdtemp(prefix="xhs-bench-"))
+
+from src.agents.state import XHSPost  # noqa: E402
+from src.agents.validators.xhs_post_scorer import score_post  # noqa: E402
+from src.tools import generate_xhs_post  # noqa: E402
+from src.utils.fake_llm import FakeChatModel  # noqa: E402
+from src.utils.llm import Backend, LLMPool, set_llm_pool  # noqa: E402
+
+# Drafts of mixed quality: tidy with hashtags/emojis, one long block, too short
+DRAFTS = [
+    {
+        "title": "踩坑3个月，我总结了RAG的5个教训",
+        "body": "\n".join(
+            ["刚开始做RAG时我以为很简单😅", "结果上线第一周就翻车了", ""]
+            + [f"{i}. 第{i}个坑：检索结果不稳定💡" for i in range(1, 6)] * 6
+            + ["", "你们踩过哪些坑？评论区聊聊👇", "", "#RAG #AI工程 #大模型 #踩坑记录"]
+        ),
+    },
+    {
+        "title": "关于RAG的一些想法",
+        "body": "最近在项目里做了检索增强生成，整体感觉效果还可以，但是也遇到了很多问题，" * 12,
+    },
+    {
+        "title": "RAG",
+        "body": "RAG很好用 #AI",
+    },
+]
+
+
+def make_pool(latency_ms: float) -> LLMPool:
+    llm = FakeChatModel(latency_ms=latency_ms, jitter_ms=latency_ms / 4, seed=7, responses={
+        "XHSPost": DRAFTS,
+        "ContentAnalysis": {
+            "target_audience": "AI工程师",
+            "audience_needs": "实战经验",
+            "recommended_structure": "经历 → 教训 → 建议",
+            "tone_guidance": "真诚、口语化",
+        },
+        "text": "可以更具体一些，加上真实细节。",
+    })
+    return LLMPool([Backend("fake", "bench", llm=llm)])
+
+
+async def run_mode(sources: list[str], latency_ms: float, iterations: int, candidates: int) -> dict:
+    pool = make_pool(latency_ms)
+    set_llm_pool(pool)
+    durations, scores = [], []
+    for content in sources:
+        start = time.perf_counter()
+        result = await generate_xhs_post({"content": content, "iterations": iterations, "candidates": candidates})
+        durations.append((time.perf_counter() - start) * 1000)
+        title, _, body = result["final_post"].partition("\n\n")
+        scores.append(score_post(XHSPost(title=title, body=body))["score"])
+    return {
+        "wall_ms": statistics.mean(durations),
+        "llm_calls": pool.backends[0].calls / len(sources),
+        "score": statistics.mean(scores),
+    }
+
+
+async def main(latency_ms: float, candidates: int, iterations: int) -> None:
+    sources = [p.read_text(encoding="utf-8") for p in sorted((ROOT / "topic").iterdir()) if p.is_file()]
+    sources = [s for s in sources if s.strip()]
+
+    serial = await run_mode(sources, latency_ms, iterations, 1)
+    best_of_n = await run_mode(sources, latency_ms, 0, candidates)
+
+    print(f"sources: {len(sources)}, fake LLM latency: {latency_ms:.0f}ms")
+    for label, r in ((f"serial ({iterations} critic loops)", serial), (f"best-of-{candidates}", best_of_n)):
+        print(f"{label:<26} wall={r['wall_ms']:>7.0f}ms  llm_calls={r['llm_calls']:>4.1f}  score={r['score']:>6.2f}")
+    print(f"wall-clock speedup: {serial['wall_ms'] / best_of_n['wall_ms']:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency-ms", type=float, default=400)
+    parser.add_argument("--candidates", type=int, default=3)
+    parser.add_argument("--iterations", type=int, default=2)
+    args = parser.parse_args()
+    asyncio.run(main(args.latency_ms, args.candidates, args.iterations))
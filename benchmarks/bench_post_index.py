@@ -0,0 +1,100 @@
+"""Microbenchmark: near-duplicate lookups in the MinHash/LSH post index.
+
+Usage:
+    uv run python benchmarks/bench_post_index.py [--posts 20000] [--queries 200]
+
+Indexes --posts synthetic posts (lines from topic/ shuffled into bodies) in
+a temporary database, then looks up --queries lightly edited copies of
+indexed posts and as many unrelated posts, and reports:
+  - index build time per post
+  - lookup latency (p50/p99) and the number of candidates compared
+  - the same lookups as a pairwise signature scan over every post
+  - recall of the edited copies and false positives of the unrelated posts
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src.utils.metrics import percentile  # noqa: E402
+from src.utils.minhash import signature, similarity, unpack  # noqa: E402
+from src.utils.post_index import VARIETY_THRESHOLD, PostIndex  # noqa: E402
+
+
+def source_lines() -> list[str]:
+    sources = [p.read_text(encoding="utf-8") for p in sorted((ROOT / "topic").iterdir()) if p.is_file()]
+    lines = [line.strip() for source in sources for line in source.splitlines() if len(line.strip()) >= 8]
+    return lines or ["今天分享一个小技巧，亲测有效。", "人工智能正在改变我们的工作方式。"]
+
+
+def build_post(rng: random.Random, lines: list[str]) -> tuple[str, str]:
+    body = "\n".join(line[:60] for line in rng.sample(lines, min(12, len(lines))))
+    return f"第{rng.randrange(10**6)}篇：{rng.choice(lines)[:14]}", f"{body}\n\n#AI工程 #效率工具"
+
+
+def edit(rng: random.Random, title: str, body: str) -> tuple[str, str]:
+    """Change a few characters, like a light rewrite of the same post."""
+    chars = list(body)
+    for _ in range(max(1, len(chars) // 50)):
+        chars[rng.randrange(len(chars))] = rng.choice("的了是在我有和就不人都")
+    return title, "".join(chars)
+
+
+async def main(count: int, queries: int) -> None:
+    rng = random.Random(7)
+    lines = source_lines()
+    posts = [build_post(rng, lines) for _ in range(count)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = PostIndex(str(Path(tmp) / "posts.sqlite"))
+        start = time.perf_counter()
+        for i, (title, body) in enumerate(posts):
+            await index.add(f"thread-{i}", title, body)
+        build_s = time.perf_counter() - start
+        print(f"indexed {count} posts in {build_s:.1f}s ({build_s / count * 1000:.2f}ms/post)\n")
+
+        duplicates = [edit(rng, *posts[rng.randrange(count)]) for _ in range(queries)]
+        unrelated = [build_post(random.Random(10**6 + i), lines) for i in range(queries)]
+
+        latencies, candidates, found, false_positives = [], [], 0, 0
+        for kind, batch in (("duplicate", duplicates), ("unrelated", unrelated)):
+            for title, body in batch:
+                start = time.perf_counter()
+                result = await index.find_similar(title, body)
+                latencies.append((time.perf_counter() - start) * 1000)
+                candidates.append(result["candidates"])
+                if kind == "duplicate":
+                    found += bool(result["matches"])
+                else:
+                    false_positives += bool(result["matches"])
+
+        rows = await index._conn.execute_fetchall("SELECT signature FROM posts")
+        signatures = [unpack(row[0]) for row in rows]
+        scan_ms = []
+        for title, body in duplicates[:20]:
+            start = time.perf_counter()
+            sig = signature(f"{title}\n{body}")
+            [s for s in signatures if similarity(sig, s) >= VARIETY_THRESHOLD]
+            scan_ms.append((time.perf_counter() - start) * 1000)
+        await index.aclose()
+
+    print(f"LSH lookup        p50={percentile(latencies, 50):>7.2f}ms  p99={percentile(latencies, 99):>7.2f}ms  "
+          f"candidates p50={percentile(candidates, 50):.0f} max={max(candidates)}")
+    print(f"pairwise scan     p50={percentile(scan_ms, 50):>7.2f}ms  ({count} signatures per lookup)")
+    print(f"\nrecall of edited copies: {found}/{queries}, unrelated posts flagged: {false_positives}/{queries} "
+          f"(threshold {VARIETY_THRESHOLD})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.posts, args.queries))
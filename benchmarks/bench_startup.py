@@ -0,0 +1,104 @@
+"""Startup benchmark: MCP server time-to-ready and import time per module.
+
+Usage:
+    uv run python benchmarks/bench_startup.py [--runs 5] [--top 15]
+
+Spawns `main.py` over stdio the way an MCP client does and measures:
+  - time until `initialize` is answered (time-to-ready)
+  - time until `tools/list` is answered
+  - time until the first resource that needs the workflow stack is served
+    (the cost deferred from startup to the first tool call)
+Then runs `python -X importtime` on `import main` and on the deferred
+`src.tools` stack and prints the slowest modules by cumulative import time.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Let the LLM client initialize without a real key and keep logs quiet
+ENV = {
+    **os.environ,
+    "DEEPSEEK_API_KEY": os.environ.get("DEEPSEEK_API_KEY", "benchmark"),
+    "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "benchmark"),
+    "LOG_LEVEL": "WARNING",
+    "PYTHONWARNINGS": "ignore",
+}
+
+
+async def time_to_ready() -> dict:
+    """Spawn the server over stdio and time the first protocol round trips."""
+    from mcp import ClientSession, StdioServerParameters
+    from mcp.client.stdio import stdio_client
+
+    params = StdioServerParameters(command=sys.executable, args=["main.py"], env=ENV, cwd=str(ROOT))
+    timings = {}
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull:
+        async with stdio_client(params, errlog=devnull) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                timings["initialize"] = time.perf_counter() - start
+                await session.list_tools()
+                timings["list_tools"] = time.perf_counter() - start
+                await session.read_resource("xhs://stats/checkpointer")
+                timings["workflow_stack"] = time.perf_counter() - start
+    return timings
+
+
+def import_times(statement: str) -> list[tuple[int, int, str]]:
+    """(self µs, cumulative µs, module) for every module imported by statement."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT, env=ENV, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        rows.append((int(self_us), int(cumulative_us), module.strip()))
+    return rows
+
+
+def print_import_report(label: str, statement: str, top: int) -> None:
+    rows = import_times(statement)
+    total = max(cumulative for _, cumulative, _ in rows)
+    print(f"\n{label}: `{statement}` — {total / 1000:.0f}ms, {len(rows)} modules")
+    print(f"  {'cumulative':>10}  {'self':>8}  module")
+    for self_us, cumulative_us, module in sorted(rows, key=lambda r: r[1], reverse=True)[:top]:
+        print(f"  {cumulative_us / 1000:>8.1f}ms  {self_us / 1000:>6.1f}ms  {module}")
+    heavy = sorted({m.split(".")[0] for _, _, m in rows} & {"langchain", "langchain_core", "langgraph", "openai", "langchain_deepseek"})
+    print(f"  heavy packages loaded: {', '.join(heavy) or 'none'}")
+
+
+async def main(runs: int, top: int) -> None:
+    samples = {"initialize": [], "list_tools": [], "workflow_stack": []}
+    for _ in range(runs):
+        for key, value in (await time_to_ready()).items():
+            samples[key].append(value)
+
+    print(f"server spawns: {runs}")
+    for key, values in samples.items():
+        print(
+            f"{key + ' answered':<26} mean={statistics.mean(values) * 1000:>7.0f}ms  "
+            f"min={min(values) * 1000:>7.0f}ms  max={max(values) * 1000:>7.0f}ms"
+        )
+
+    print_import_report("startup imports", "import main", top)
+    print_import_report("deferred to first tool call", "import src.tools; from src.utils.llm import get_llm_pool; get_llm_pool()", top)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+    asyncio.run(main(args.runs, args.top))
@@ -0,0 +1,84 @@
+"""Offline benchmark: perceived latency of streamed vs. non-streamed drafts.
+
+Usage:
+    uv run python benchmarks/bench_streaming.py [--latency-ms 8000] [--body-chars 2000]
+
+Generates one post (no critic loop) with a fake LLM whose generator call
+takes --latency-ms and streams a --body-chars body, with and without
+partial-draft streaming, and reports when the first tokens, the complete
+title and the complete draft reached the progress callback.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("LLM_CACHE", "false")
+os.environ.setdefault("XHS_DATA_DIR", tempfile.mkdtemp(prefix="xhs-bench-"))
+
+from src.agents import nodes  # noqa: E402
+from src.tools import generate_xhs_post  # noqa: E402
+from src.utils.fake_llm import FakeChatModel  # noqa: E402
+from src.utils.llm import Backend, LLMPool, set_llm_pool  # noqa: E402
+
+
+async def run(streaming: bool, latency_ms: float, body_chars: int) -> dict:
+    nodes.GENERATOR_STREAMING = streaming
+    set_llm_pool(LLMPool([Backend("fake", "bench", llm=FakeChatModel(
+        latency_ms=latency_ms, first_token_ms=latency_ms / 20, responses={
+            "XHSPost": {"title": "踩坑3个月，我总结了RAG的5个教训", "body": ("今天聊聊检索增强生成。" * body_chars)[:body_chars]},
+            "ContentAnalysis": {
+                "target_audience": "AI工程师",
+                "audience_needs": "实战经验",
+                "recommended_structure": "经历 → 教训 → 建议",
+                "tone_guidance": "真诚、口语化",
+            },
+        },
+    ))]))
+
+    timings = {"first_token": None, "title": None, "draft": None}
+    start = None
+
+    def on_progress(event: dict) -> None:
+        nonlocal start
+        now = (time.perf_counter() - start) * 1000
+        if event["node"] != "generator":
+            return
+        if timings["first_token"] is None:
+            timings["first_token"] = now
+        if timings["title"] is None and (event.get("title_complete") or not event.get("partial")):
+            timings["title"] = now
+        if not event.get("partial"):
+            timings["draft"] = now
+
+    # Measure from the generator's start: analyze/compact are not streamed
+    async def progress(event: dict) -> None:
+        nonlocal start
+        if event["node"] == "compact":
+            start = time.perf_counter()
+        elif start is not None:
+            on_progress(event)
+
+    await generate_xhs_post({"content": "RAG 实战经验分享", "iterations": 0}, on_progress=progress)
+    return timings
+
+
+async def main(latency_ms: float, body_chars: int) -> None:
+    print(f"generator latency: {latency_ms:.0f}ms, body: {body_chars} chars (times from generator start)\n")
+    for label, streaming in (("not streamed", False), ("streamed", True)):
+        t = await run(streaming, latency_ms, body_chars)
+        print(f"{label:<14} first tokens={t['first_token']:>7.0f}ms  title={t['title']:>7.0f}ms  "
+              f"full draft={t['draft']:>7.0f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency-ms", type=float, default=8000)
+    parser.add_argument("--body-chars", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main(args.latency_ms, args.body_chars))
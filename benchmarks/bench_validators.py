@@ -0,0 +1,181 @@
+"""Microbenchmark: post validator throughput and emoji/hashtag accuracy.
+
+Usage:
+    uv run python benchmarks/bench_validators.py [--posts 2000] [--repeat 5]
+
+Builds posts from the files in topic/ (title + body lines with emojis,
+hashtags and mentions) and times, per validation:
+  - legacy: validate_post before the line scanner (length checks, a
+    per-character emoji loop and `'#' in text`)
+  - validate_post / validate_posts on posts never validated before
+    (empty caches, every line new)
+  - validate_post on posts validated before
+  - one run: every draft of a revision chain validated as often as the
+    workflow does (convergence check, critic, formatting, scorer), each
+    revision rewriting a few lines of the previous draft
+then prints counts for a few strings the legacy loop got wrong.
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src.agents.state import XHSPost  # noqa: E402
+from src.agents.validators import (  # noqa: E402
+    BODY_MAX_CHARS,
+    BODY_OPTIMAL_MAX,
+    BODY_OPTIMAL_MIN,
+    TITLE_MAX_CHARS,
+    TITLE_OPTIMAL_MAX,
+    TITLE_OPTIMAL_MIN,
+    validate_post,
+    validate_posts,
+)
+from src.agents.validators import xhs_post_validators  # noqa: E402
+
+# Validations of each draft in a run (convergence check, critic, formatting, scorer)
+VALIDATIONS_PER_DRAFT = 4
+REVISIONS = 3
+
+DECORATIONS = ["✨", "💡", "👨‍👩‍👧", "🇨🇳", "1️⃣", "👍🏽", "❤️", "🔥"]
+
+ACCURACY_CASES = [
+    "一家人👨‍👩‍👧",
+    "中国🇨🇳加油",
+    "第一步1️⃣",
+    "点赞👍🏽",
+    "喜欢❤️和✨",
+    "#小红书 #AI工具",
+]
+
+
+def legacy_validate(post: XHSPost) -> dict:
+    """validate_post before the line scanner (same checks and messages)."""
+    issues, suggestions = [], []
+    title_len, body_len = len(post.title), len(post.body)
+    if title_len > TITLE_MAX_CHARS:
+        issues.append(f"Title too long: {title_len}/{TITLE_MAX_CHARS} characters")
+    elif not TITLE_OPTIMAL_MIN <= title_len <= TITLE_OPTIMAL_MAX:
+        suggestions.append(f"Title is {title_len} chars. Consider {TITLE_OPTIMAL_MIN}-{TITLE_OPTIMAL_MAX} chars")
+    if body_len > BODY_MAX_CHARS:
+        issues.append(f"Body too long: {body_len}/{BODY_MAX_CHARS} characters")
+    elif not BODY_OPTIMAL_MIN <= body_len <= BODY_OPTIMAL_MAX:
+        suggestions.append(f"Body is {body_len} chars. Consider {BODY_OPTIMAL_MIN}-{BODY_OPTIMAL_MAX} chars")
+    full_post = f"{post.title}\n{post.body}"
+    if "#" not in full_post:
+        suggestions.append("Add hashtags for better discoverability")
+    emoji_count = sum(1 for char in full_post if ord(char) > 0x1F300)
+    if emoji_count == 0:
+        suggestions.append("Add emojis for better engagement")
+    elif emoji_count > 20:
+        suggestions.append(f"Too many emojis ({emoji_count}). Use them sparingly")
+    return {
+        "valid": not issues,
+        "issues": issues,
+        "suggestions": suggestions,
+        "stats": {
+            "title_length": title_len,
+            "body_length": body_len,
+            "total_length": title_len + body_len,
+            "emoji_count": emoji_count,
+            "has_hashtags": "#" in full_post,
+        },
+    }
+
+
+def clear_caches() -> None:
+    xhs_post_validators._line_cache.clear()
+    xhs_post_validators._post_cache.clear()
+
+
+def build_posts(count: int) -> list[XHSPost]:
+    sources = [p.read_text(encoding="utf-8") for p in sorted((ROOT / "topic").iterdir()) if p.is_file()]
+    lines = [line.strip() for source in sources for line in source.splitlines() if line.strip()]
+    lines = lines or ["今天分享一个小技巧，亲测有效。"]
+    posts = []
+    for i in range(count):
+        body_lines = [
+            f"{lines[(i + j) % len(lines)][:60]}{DECORATIONS[(i + j) % len(DECORATIONS)]}"
+            for j in range(20)
+        ]
+        body_lines += ["", "@小助手 你们怎么看？", "#AI工程 #大模型 #效率工具"]
+        posts.append(XHSPost(title=f"第{i}篇：{lines[i % len(lines)][:16]}", body="\n".join(body_lines)))
+    return posts
+
+
+def revisions(post: XHSPost, count: int) -> list[XHSPost]:
+    """The post and count revisions, each rewriting three body lines of the one before."""
+    drafts = [post]
+    for i in range(count):
+        lines = drafts[-1].body.split("\n")
+        for j in range(3 * i, 3 * i + 3):
+            lines[j % len(lines)] += f"（第{i + 1}版补充）"
+        drafts.append(XHSPost(title=post.title, body="\n".join(lines)))
+    return drafts
+
+
+def best_of(repeat: int, fn, before=None) -> float:
+    timings = []
+    for _ in range(repeat):
+        if before:
+            before()
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(count: int, repeat: int) -> None:
+    posts = build_posts(count)
+    chars = sum(len(p.title) + len(p.body) for p in posts)
+    print(f"posts: {count}, average length: {chars / count:.0f} chars, best of {repeat} runs\n")
+
+    # Every line new: number each line with its post
+    unrelated = [
+        XHSPost(title=f"{i} {p.title}", body="\n".join(f"{i} {line}" for line in p.body.split("\n")))
+        for i, p in enumerate(posts)
+    ]
+    runs = [
+        ("legacy validate_post", lambda: [legacy_validate(p) for p in unrelated], None, count),
+        ("validate_post, new posts", lambda: [validate_post(p) for p in unrelated], clear_caches, count),
+        ("validate_posts, new posts", lambda: validate_posts(unrelated), clear_caches, count),
+        ("validate_post, seen posts", lambda: [validate_post(p) for p in unrelated], None, count),
+    ]
+    for label, fn, before, validations in runs:
+        seconds = best_of(repeat, fn, before)
+        print(f"{label:<30} {seconds * 1000:>8.1f}ms  {seconds / validations * 1e6:>7.1f}µs/validation")
+
+    run = [draft for p in unrelated for draft in revisions(p, REVISIONS) for _ in range(VALIDATIONS_PER_DRAFT)]
+    print(f"\none run: {REVISIONS + 1} drafts per post, each validated {VALIDATIONS_PER_DRAFT} times")
+    for label, fn, before in (
+        ("legacy validate_post", lambda: [legacy_validate(p) for p in run], None),
+        ("validate_post", lambda: [validate_post(p) for p in run], clear_caches),
+    ):
+        seconds = best_of(repeat, fn, before)
+        print(f"{label:<30} {seconds * 1000:>8.1f}ms  {seconds / len(run) * 1e6:>7.1f}µs/validation")
+
+    stats = [v["stats"] for v in validate_posts(posts)]
+    print(f"\naverage per post: {statistics.mean(s['emoji_count'] for s in stats):.1f} emojis, "
+          f"{statistics.mean(s['hashtag_count'] for s in stats):.1f} hashtags, "
+          f"{statistics.mean(len(s['long_lines']) for s in stats):.1f} long lines")
+
+    print("\naccuracy (emojis, has_hashtags):")
+    for text in ACCURACY_CASES:
+        post = XHSPost(title="", body=text)
+        old = legacy_validate(post)["stats"]
+        new = validate_post(post)["stats"]
+        print(f"  {text:<14} legacy=({old['emoji_count']}, {old['has_hashtags']})  "
+              f"engine=({new['emoji_count']}, {new['has_hashtags']})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.posts, args.repeat)
@@ -0,0 +1,261 @@
+"""Offline benchmark suite: end-to-end workflow throughput, latency and overhead.
+
+Usage:
+    uv run python benchmarks/bench_workflow.py [--concurrency 1,4,16] [--iterations 0,2]
+        [--latency-ms 20] [--latency-sigma 0.5] [--repeat 4]
+        [--save benchmarks/baselines/workflow.json] [--baseline benchmarks/baselines/workflow.json]
+
+Every LLM backend is replaced by a deterministic FakeChatModel (canned
+ContentAnalysis, XHSPost drafts that change every round, a plain critique;
+log-normal latency with median --latency-ms). For each concurrency x
+iterations scenario, every file in topic/ (x --repeat) goes through
+generate_xhs_post, then each resulting thread through one
+refinement_xhs_post round. Reported per scenario:
+  - throughput (runs/s) and p50/p99 latency of generation and refinement
+  - LLM calls per generation
+  - framework overhead: run latency not spent waiting on the LLM, per run
+    and per node (node time minus its LLM calls)
+  - checkpointer growth (bytes and threads added, bytes per thread)
+
+--save writes the results as a baseline; --baseline compares against one
+and exits with status 1 when a metric regressed by more than --tolerance.
+Run with --latency-ms 0 to measure pure framework overhead.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import zlib
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("LLM_CACHE", "false")
+os.environ.setdefault("REQUEST_COALESCING", "false")
+# Every fake post is the same; near-duplicate lookups have their own
+# benchmark (bench_post_index.py)
+os.environ.setdefault("VARIETY_CHECK", "off")
+os.environ.setdefault("XHS_DATA_DIR", tempfile.mkdtemp(prefix="xhs-bench-"))
+
+from langchain_core.messages import AIMessage, HumanMessage  # noqa: E402
+from src.agents.checkpointers import get_checkpointer  # noqa: E402
+from src.tools import generate_xhs_post, refinement_xhs_post  # noqa: E402
+from src.utils.fake_llm import FakeChatModel  # noqa: E402
+from src.utils.llm import Backend, LLMPool, set_llm_pool  # noqa: E402
+from src.utils.metrics import get_metrics, percentile  # noqa: E402
+
+ANALYSIS = {
+    "target_audience": "想用AI提升效率的工程师",
+    "audience_needs": "能直接上手的实战经验和避坑建议",
+    "recommended_structure": "痛点开场 → 3-5个要点 → 个人体会 → 互动提问",
+    "tone_guidance": "真诚、口语化，少用术语",
+}
+
+POINTS = [
+    "先把问题拆小，再决定要不要上AI💡",
+    "检索结果不稳定，多半是切块太大了",
+    "提示词写清楚输入输出，比堆技巧有用✨",
+    "评估集要尽早建，不然改了也不知道好坏",
+    "别迷信大模型，规则能解决的先用规则",
+    "日志一定要留，出问题才有据可查📌",
+    "先跑通最小闭环，再慢慢优化体验",
+    "成本要算清楚，token 花得比想象快💰",
+]
+
+# Metrics compared against a baseline; True = higher is better
+BASELINE_METRICS = {
+    "generate_throughput_rps": True,
+    "generate_p50_ms": False,
+    "generate_p99_ms": False,
+    "refine_p50_ms": False,
+    "refine_p99_ms": False,
+    "overhead_ms_per_run": False,
+    "checkpointer_bytes_per_thread": False,
+}
+
+
+def fake_post(llm_input) -> dict:
+    """Deterministic draft: depends on the source and on how many drafts the thread already has."""
+    messages = llm_input if isinstance(llm_input, list) else []
+    round_no = sum(isinstance(m, AIMessage) for m in messages)
+    source = next((m.content for m in messages if isinstance(m, HumanMessage)), "")
+    seed = zlib.crc32(source.encode("utf-8"))
+    lines = [f"{i + 1}. {POINTS[(seed + round_no + i) % len(POINTS)]}" for i in range(6)]
+    return {
+        "title": f"做了半年AI项目，我总结的{6 + round_no % 3}个经验",
+        "body": "\n".join(
+            ["刚开始我也踩了很多坑😅", f"这是第{round_no + 1}版整理👇", ""]
+            + lines
+            + ["", "你们还遇到过哪些坑？评论区聊聊~", "", "#AI工程 #效率工具 #经验分享"]
+        ),
+    }
+
+
+def make_pool(latency_ms: float, sigma: float) -> LLMPool:
+    llm = FakeChatModel(latency_ms=latency_ms, latency_sigma=sigma, seed=42, responses={
+        "ContentAnalysis": ANALYSIS,
+        "XHSPost": fake_post,
+        "text": "整体不错，可以再加一些真实的细节和数据。",
+    })
+    return LLMPool([Backend("fake", "bench", llm=llm)])
+
+
+async def run_all(calls, concurrency: int) -> tuple[list, list[float], float]:
+    """Run coroutine factories with bounded concurrency; return results, latencies (ms) and wall seconds."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(call):
+        async with semaphore:
+            start = time.perf_counter()
+            result = await call()
+            latencies.append((time.perf_counter() - start) * 1000)
+            return result
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one(call) for call in calls))
+    return results, latencies, time.perf_counter() - start
+
+
+def node_overhead(snapshot: dict) -> dict[str, float]:
+    """Mean time per node execution not spent in the node's LLM calls (ms)."""
+    stages = snapshot["stages"]
+    overhead = {}
+    for name, stage in stages.items():
+        if name.startswith("llm:") or not stage["count"]:
+            continue
+        llm_ms = stages.get(f"llm:{name}", {}).get("total_ms", 0.0)
+        overhead[name] = round((stage["total_ms"] - llm_ms) / stage["count"], 3)
+    return overhead
+
+
+async def run_scenario(sources: list[str], concurrency: int, iterations: int, latency_ms: float, sigma: float) -> dict:
+    pool = make_pool(latency_ms, sigma)
+    set_llm_pool(pool)
+    saver = await get_checkpointer()
+    before = await saver.astats()
+    metrics = get_metrics()
+    metrics.reset()
+
+    posts, gen_latencies, gen_wall = await run_all(
+        [lambda s=s: generate_xhs_post({"content": s, "iterations": iterations}) for s in sources], concurrency
+    )
+    snapshot = metrics.snapshot()
+    llm_ms = sum(stage["total_ms"] for name, stage in snapshot["stages"].items() if name.startswith("llm:"))
+    llm_calls = pool.backends[0].llm.calls
+
+    _, refine_latencies, _ = await run_all(
+        [lambda p=p: refinement_xhs_post({"thread_id": p["thread_id"], "feedback": "更口语化一点", "iterations": 1})
+         for p in posts],
+        concurrency,
+    )
+    after = await saver.astats()
+    added_threads = max(0, after["threads"] - before["threads"])
+    added_bytes = after["bytes"] - before["bytes"]
+
+    runs = len(sources)
+    return {
+        "runs": runs,
+        "generate_throughput_rps": round(runs / gen_wall, 2),
+        "generate_p50_ms": round(percentile(gen_latencies, 50), 1),
+        "generate_p99_ms": round(percentile(gen_latencies, 99), 1),
+        "refine_p50_ms": round(percentile(refine_latencies, 50), 1),
+        "refine_p99_ms": round(percentile(refine_latencies, 99), 1),
+        "llm_calls_per_run": round(llm_calls / runs, 2),
+        "overhead_ms_per_run": round(statistics.mean(gen_latencies) - llm_ms / runs, 2),
+        "node_overhead_ms": node_overhead(snapshot),
+        "checkpointer_bytes_added": added_bytes,
+        "checkpointer_threads_added": added_threads,
+        "checkpointer_bytes_per_thread": round(added_bytes / added_threads) if added_threads else 0,
+    }
+
+
+def print_scenario(name: str, r: dict) -> None:
+    print(
+        f"{name:<8} runs={r['runs']:>3}  gen {r['generate_throughput_rps']:>7.2f} runs/s  "
+        f"p50={r['generate_p50_ms']:>7.1f}ms p99={r['generate_p99_ms']:>7.1f}ms  "
+        f"refine p50={r['refine_p50_ms']:>7.1f}ms p99={r['refine_p99_ms']:>7.1f}ms  "
+        f"llm/run={r['llm_calls_per_run']:>4.1f}  overhead/run={r['overhead_ms_per_run']:>6.2f}ms  "
+        f"ckpt +{r['checkpointer_bytes_added'] / 1024:>7.1f}KiB ({r['checkpointer_bytes_per_thread']}B/thread)"
+    )
+    print("         node overhead (ms): " + ", ".join(f"{k}={v}" for k, v in r["node_overhead_ms"].items()))
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> bool:
+    """Print the change of every baseline metric; True if anything regressed beyond tolerance."""
+    regressed = False
+    print(f"\nvs. baseline ({baseline['meta']['created']}, tolerance {tolerance:.0%}):")
+    for name, result in results.items():
+        base = baseline["scenarios"].get(name)
+        if base is None:
+            print(f"  {name}: not in baseline")
+            continue
+        for metric, higher_is_better in BASELINE_METRICS.items():
+            old, new = base.get(metric), result[metric]
+            if not old:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            flag = "REGRESSION" if worse > tolerance else ""
+            regressed = regressed or bool(flag)
+            print(f"  {name:<8} {metric:<30} {old:>10} → {new:>10}  {change:+7.1%} {flag}")
+    return regressed
+
+
+async def main(args) -> int:
+    sources = [p.read_text(encoding="utf-8") for p in sorted((ROOT / "topic").iterdir()) if p.is_file()]
+    sources = [s for s in sources if s.strip()] * args.repeat
+
+    print(f"sources per scenario: {len(sources)}, fake LLM latency: median {args.latency_ms}ms, "
+          f"sigma {args.latency_sigma}\n")
+    results = {}
+    for iterations in args.iterations:
+        for concurrency in args.concurrency:
+            name = f"c{concurrency}_i{iterations}"
+            results[name] = await run_scenario(sources, concurrency, iterations, args.latency_ms, args.latency_sigma)
+            print_scenario(name, results[name])
+
+    regressed = False
+    if args.baseline:
+        regressed = compare(results, json.loads(Path(args.baseline).read_text(encoding="utf-8")), args.tolerance)
+
+    if args.save:
+        path = Path(args.save)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({
+            "meta": {
+                "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "latency_ms": args.latency_ms,
+                "latency_sigma": args.latency_sigma,
+                "repeat": args.repeat,
+            },
+            "scenarios": results,
+        }, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"\nbaseline saved to {path}")
+
+    return 1 if regressed else 0
+
+
+def int_list(value: str) -> list[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int_list, default=[1, 4, 16])
+    parser.add_argument("--iterations", type=int_list, default=[0, 2])
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--repeat", type=int, default=4)
+    parser.add_argument("--save", help="write results as a baseline JSON file")
+    parser.add_argument("--baseline", help="compare against a baseline JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    sys.exit(asyncio.run(main(parser.parse_args())))
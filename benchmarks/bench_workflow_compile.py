@@ -0,0 +1,77 @@
+"""Micro-benchmark: per-request workflow overhead, rebuild vs. registry.
+
+Usage:
+    uv run python benchmarks/bench_workflow_compile.py [--requests 200]
+
+Before: every tool call built the StateGraph and compiled it.
+After: tool calls fetch the compiled graph from the process-wide registry.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Make `src` importable and let the LLM client initialize without a real key
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DEEPSEEK_API_KEY", "benchmark")
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from src.agents.workflow import build_workflow, clear_workflows, get_workflow  # noqa: E402
+
+
+def summarize(label: str, samples: list[float]) -> None:
+    """Print mean/p50/p95 in microseconds."""
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(
+        f"{label:<28} mean={statistics.mean(samples) * 1e6:>10.1f}µs  "
+        f"p50={statistics.median(samples) * 1e6:>10.1f}µs  p95={p95 * 1e6:>10.1f}µs"
+    )
+
+
+async def main(requests: int) -> None:
+    # Before: build + compile per request
+    rebuild = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        build_workflow()
+        rebuild.append(time.perf_counter() - start)
+
+    # After: registry lookup per request (first call compiles)
+    clear_workflows()
+    start = time.perf_counter()
+    await get_workflow()
+    first = time.perf_counter() - start
+
+    cached = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        await get_workflow()
+        cached.append(time.perf_counter() - start)
+
+    # Concurrent cold start: many callers, one compile
+    clear_workflows()
+    start = time.perf_counter()
+    graphs = await asyncio.gather(*(get_workflow() for _ in range(requests)))
+    concurrent = time.perf_counter() - start
+
+    print(f"requests per scenario: {requests}")
+    summarize("rebuild per request", rebuild)
+    summarize("registry lookup", cached)
+    print(f"{'first (lazy) compile':<28} {first * 1e6:>15.1f}µs")
+    print(
+        f"{'concurrent cold start':<28} {concurrent * 1e6:>15.1f}µs total, "
+        f"{len({id(g) for g in graphs})} graph(s) compiled"
+    )
+    print(f"speedup (mean): {statistics.mean(rebuild) / statistics.mean(cached):.0f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
@@ -28,6 +28,14 @@ logger.info("🚀 Starting 小紅書 Content Generator MCP Server...")
 logger.info("📋 Available tools:")
 logger.info("  • generate_xhs_post_tool - Generate 小紅書 posts")
 logger.info("  • refinement_xhs_post_tool - Refine posts with feedback")
+logger.info("  • generate_xhs_posts_batch_tool - Generate posts for many sources")
+logger.info("  • sync_xhs_posts_tool - Regenerate only posts whose sources changed")
+logger.info("  • find_similar_posts_tool - Find earlier posts similar to a draft")
+logger.info("  • suggest_hashtags_tool - Suggest hashtags from post history")
+logger.info("  • extract_content_tool - Extract text from PDF/Markdown/HTML files")
+logger.info("  • fetch_webpage_tool - Fetch and extract web pages")
+logger.info("  • submit_xhs_post_job_tool - Queue posts for background generation")
+logger.info("  • job_status_tool / job_result_tool / cancel_job_tool - Track queued jobs")
 logger.info("✅ Server is ready and listening...")
 logger.info("")
 
@@ -1,10 +1,12 @@
 """Multi-agent orchestration for content generation."""
 
-from .workflow import get_workflow
+from .workflow import get_workflow, register_workflow, clear_workflows
 from .prompts import GENERATOR_PROMPT, CRITIC_PROMPT
 
 __all__ = [
     "get_workflow",
+    "register_workflow",
+    "clear_workflows",
     "GENERATOR_PROMPT",
     "CRITIC_PROMPT",
 ]
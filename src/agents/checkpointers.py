@@ -0,0 +1,581 @@
+"""Checkpointers for long-running workflow servers."""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+import aiosqlite
+from langgraph.checkpoint.base import WRITES_IDX_MAP, get_checkpoint_metadata
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from ..utils.paths import data_path
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Channels of writes that end a step without a checkpoint
+# (langgraph's ERROR and INTERRUPT; the constants are private since 1.0)
+_STEP_END_CHANNELS = frozenset({"__error__", "__interrupt__"})
+
+
+@dataclass
+class _ThreadUsage:
+    """Bookkeeping for one thread held by BoundedMemorySaver."""
+    last_access: float
+    bytes: int = 0
+    blob_keys: set = field(default_factory=set)
+    write_keys: set = field(default_factory=set)
+
+
+def _typed_size(typed) -> int:
+    """Size in bytes of a serialized (type, payload) pair."""
+    return len(typed[1]) if typed else 0
+
+
+class BoundedMemorySaver(InMemorySaver):
+    """
+    In-memory checkpointer with LRU/TTL eviction and a byte budget.
+
+    Every thread is tracked in least-recently-used order. Threads are
+    evicted when they exceed the TTL, when more than max_threads are held,
+    or when the serialized size of all checkpoints exceeds max_bytes. The
+    thread currently being written is never evicted.
+
+    With latest_only=True only the newest checkpoint of each thread (plus the
+    blobs it references) is kept, which is all refinement needs to resume.
+    State history (time travel) is lost in that mode.
+
+    Args:
+        max_threads: Maximum number of threads held (None = unlimited)
+        ttl_seconds: Evict threads idle for longer than this (None = never)
+        max_bytes: Budget for serialized checkpoint data (None = unlimited)
+        latest_only: Drop superseded checkpoints on every put
+    """
+
+    def __init__(
+        self,
+        *,
+        max_threads: int | None = 1000,
+        ttl_seconds: float | None = 24 * 3600,
+        max_bytes: int | None = 256 * 1024 * 1024,
+        latest_only: bool = True,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.max_threads = max_threads
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.latest_only = latest_only
+
+        self._threads: OrderedDict[str, _ThreadUsage] = OrderedDict()
+        self._bytes = 0
+        self._evictions = {"lru": 0, "ttl": 0, "bytes": 0}
+        self._pruned_checkpoints = 0
+
+    # ------------------------------------------------------------------
+    # Bookkeeping
+    # ------------------------------------------------------------------
+
+    def _touch(self, thread_id: str) -> _ThreadUsage:
+        """Mark a thread as most recently used, creating its entry if needed."""
+        usage = self._threads.get(thread_id)
+        if usage is None:
+            usage = self._threads[thread_id] = _ThreadUsage(last_access=time.monotonic())
+        else:
+            usage.last_access = time.monotonic()
+            self._threads.move_to_end(thread_id)
+        return usage
+
+    def _adjust(self, usage: _ThreadUsage, delta: int) -> None:
+        usage.bytes += delta
+        self._bytes += delta
+
+    def _writes_size(self, outer_key) -> int:
+        return sum(_typed_size(w[2]) for w in self.writes.get(outer_key, {}).values())
+
+    def _drop_thread(self, thread_id: str) -> None:
+        """Remove every checkpoint, write and blob of a thread."""
+        usage = self._threads.pop(thread_id, None)
+        self.storage.pop(thread_id, None)
+        if usage is None:
+            return
+        for key in usage.write_keys:
+            self.writes.pop(key, None)
+        for key in usage.blob_keys:
+            self.blobs.pop(key, None)
+        self._bytes -= usage.bytes
+
+    def _evict_thread(self, thread_id: str, reason: str) -> None:
+        self._drop_thread(thread_id)
+        self._evictions[reason] += 1
+        logger.debug(f"🧹 Evicted thread {thread_id} ({reason})")
+
+    def _evict(self, protect: str | None = None) -> None:
+        """Evict threads until TTL, thread count and byte budget are satisfied."""
+        if self.ttl_seconds is not None:
+            cutoff = time.monotonic() - self.ttl_seconds
+            while self._threads:
+                thread_id, usage = next(iter(self._threads.items()))
+                if thread_id == protect or usage.last_access >= cutoff:
+                    break
+                self._evict_thread(thread_id, "ttl")
+
+        if self.max_threads is not None:
+            while len(self._threads) > self.max_threads:
+                thread_id = next(iter(self._threads))
+                if thread_id == protect:
+                    break
+                self._evict_thread(thread_id, "lru")
+
+        if self.max_bytes is not None:
+            while self._bytes > self.max_bytes and self._threads:
+                thread_id = next(iter(self._threads))
+                if thread_id == protect:
+                    break
+                self._evict_thread(thread_id, "bytes")
+
+    def _prune_superseded(self, thread_id: str, checkpoint_ns: str, checkpoint) -> None:
+        """Keep only the given checkpoint (and the blobs it references) for a thread."""
+        usage = self._threads[thread_id]
+        saved = self.storage[thread_id][checkpoint_ns]
+
+        for checkpoint_id in [cid for cid in saved if cid != checkpoint["id"]]:
+            stored, metadata, _ = saved.pop(checkpoint_id)
+            self._adjust(usage, -(_typed_size(stored) + _typed_size(metadata)))
+            outer_key = (thread_id, checkpoint_ns, checkpoint_id)
+            if outer_key in self.writes:
+                self._adjust(usage, -self._writes_size(outer_key))
+                del self.writes[outer_key]
+            usage.write_keys.discard(outer_key)
+            self._pruned_checkpoints += 1
+
+        live = {
+            (thread_id, checkpoint_ns, channel, version)
+            for channel, version in checkpoint["channel_versions"].items()
+        }
+        for key in [k for k in usage.blob_keys if k[1] == checkpoint_ns and k not in live]:
+            self._adjust(usage, -_typed_size(self.blobs.pop(key, None)))
+            usage.blob_keys.discard(key)
+
+    # ------------------------------------------------------------------
+    # BaseCheckpointSaver API
+    # ------------------------------------------------------------------
+
+    def get_tuple(self, config):
+        self._evict()
+        thread_id = config["configurable"]["thread_id"]
+        # Avoid the base class creating empty entries for unknown threads
+        if thread_id not in self.storage:
+            return None
+        self._touch(thread_id)
+        return super().get_tuple(config)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        usage = self._touch(thread_id)
+
+        blob_keys = [(thread_id, checkpoint_ns, k, v) for k, v in new_versions.items()]
+        self._adjust(usage, -sum(_typed_size(self.blobs.get(key)) for key in blob_keys))
+
+        result = super().put(config, checkpoint, metadata, new_versions)
+
+        usage.blob_keys.update(blob_keys)
+        self._adjust(usage, sum(_typed_size(self.blobs.get(key)) for key in blob_keys))
+        stored, stored_metadata, _ = self.storage[thread_id][checkpoint_ns][checkpoint["id"]]
+        self._adjust(usage, _typed_size(stored) + _typed_size(stored_metadata))
+
+        if self.latest_only:
+            self._prune_superseded(thread_id, checkpoint_ns, checkpoint)
+
+        self._evict(protect=thread_id)
+        return result
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        thread_id = config["configurable"]["thread_id"]
+        outer_key = (
+            thread_id,
+            config["configurable"].get("checkpoint_ns", ""),
+            config["configurable"]["checkpoint_id"],
+        )
+        usage = self._touch(thread_id)
+
+        before = self._writes_size(outer_key)
+        super().put_writes(config, writes, task_id, task_path)
+        usage.write_keys.add(outer_key)
+        self._adjust(usage, self._writes_size(outer_key) - before)
+
+        self._evict(protect=thread_id)
+
+    def delete_thread(self, thread_id: str) -> None:
+        # Use the per-thread index instead of scanning every write and blob
+        self._drop_thread(thread_id)
+
+    def stats(self) -> dict:
+        """
+        Report memory held by the checkpointer.
+
+        Returns:
+            dict with threads, bytes, limits, evictions by reason and
+            number of superseded checkpoints pruned
+        """
+        return {
+            "threads": len(self._threads),
+            "bytes": self._bytes,
+            "max_threads": self.max_threads,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "latest_only": self.latest_only,
+            "evictions": dict(self._evictions),
+            "evictions_total": sum(self._evictions.values()),
+            "pruned_checkpoints": self._pruned_checkpoints,
+        }
+
+    async def astats(self) -> dict:
+        """Asynchronous version of `stats`."""
+        return self.stats()
+
+
+class DurableSqliteSaver(AsyncSqliteSaver):
+    """
+    Persistent async SQLite checkpointer tuned for many long-lived threads.
+
+    Differences from AsyncSqliteSaver:
+      - WAL journal with synchronous=NORMAL, so commits don't fsync
+      - Pending writes of a graph step are staged in the open transaction
+        and committed together with the step's checkpoint in aput(). A
+        step that ends without a checkpoint (error or interrupt writes)
+        commits at once; aflush() commits what a cancelled run left staged
+      - A thread_activity table records when each thread last changed
+        and up to which change it was compacted, so compaction only visits
+        threads changed since its last pass
+
+    Resuming a thread is a primary-key seek on (thread_id, checkpoint_ns,
+    checkpoint_id), so lookup cost stays flat as the store grows.
+
+    Args:
+        conn: Open aiosqlite connection
+        idle_seconds: Threads untouched for this long are considered finished
+            and are compacted down to their latest checkpoint
+    """
+
+    def __init__(self, conn: aiosqlite.Connection, *, idle_seconds: float = 600, **kwargs):
+        super().__init__(conn, **kwargs)
+        self.idle_seconds = idle_seconds
+        self._compacted_threads = 0
+        self._compacted_checkpoints = 0
+        self._compaction_task: asyncio.Task | None = None
+        self._activity_ready = False
+        self._staged = False
+
+    async def setup(self) -> None:
+        if self._activity_ready:
+            return
+        await super().setup()
+        async with self.lock:
+            if self._activity_ready:
+                return
+            await self.conn.executescript(
+                """
+                PRAGMA synchronous=NORMAL;
+                PRAGMA busy_timeout=5000;
+                CREATE TABLE IF NOT EXISTS thread_activity (
+                    thread_id TEXT PRIMARY KEY,
+                    updated_at REAL NOT NULL,
+                    compacted_at REAL
+                );
+                CREATE INDEX IF NOT EXISTS idx_thread_activity_updated
+                    ON thread_activity (updated_at);
+                CREATE INDEX IF NOT EXISTS idx_thread_activity_uncompacted
+                    ON thread_activity (updated_at)
+                    WHERE compacted_at IS NULL OR compacted_at < updated_at;
+                """
+            )
+            await self.conn.commit()
+            self._activity_ready = True
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        await self.setup()
+        thread_id = str(config["configurable"]["thread_id"])
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        type_, serialized_checkpoint = self.serde.dumps_typed(checkpoint)
+        serialized_metadata = json.dumps(
+            get_checkpoint_metadata(config, metadata), ensure_ascii=False
+        ).encode("utf-8", "ignore")
+
+        async with self.lock:
+            await self.conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    config["configurable"].get("checkpoint_id"),
+                    type_,
+                    serialized_checkpoint,
+                    serialized_metadata,
+                ),
+            )
+            await self.conn.execute(
+                "INSERT INTO thread_activity (thread_id, updated_at) VALUES (?, ?) "
+                "ON CONFLICT(thread_id) DO UPDATE SET updated_at = excluded.updated_at",
+                (thread_id, time.time()),
+            )
+            # One commit per step: staged writes + checkpoint + activity
+            await self.conn.commit()
+            self._staged = False
+
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        query = (
+            "INSERT OR REPLACE INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+            if all(w[0] in WRITES_IDX_MAP for w in writes)
+            else "INSERT OR IGNORE INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+        )
+        await self.setup()
+        async with self.lock:
+            await self.conn.executemany(
+                query,
+                [
+                    (
+                        str(config["configurable"]["thread_id"]),
+                        str(config["configurable"]["checkpoint_ns"]),
+                        str(config["configurable"]["checkpoint_id"]),
+                        task_id,
+                        WRITES_IDX_MAP.get(channel, idx),
+                        channel,
+                        *self.serde.dumps_typed(value),
+                    )
+                    for idx, (channel, value) in enumerate(writes)
+                ],
+            )
+            if any(channel in _STEP_END_CHANNELS for channel, _ in writes):
+                # The step stops here, no aput() follows to commit it
+                await self.conn.commit()
+                self._staged = False
+            else:
+                # Staged in the open transaction; committed by the step's aput()
+                self._staged = True
+
+    async def aflush(self) -> None:
+        """Commit writes staged by a step that never reached aput() (e.g. a cancelled run)."""
+        async with self.lock:
+            if self._staged:
+                await self.conn.commit()
+                self._staged = False
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await super().adelete_thread(thread_id)
+        async with self.lock:
+            await self.conn.execute(
+                "DELETE FROM thread_activity WHERE thread_id = ?", (str(thread_id),)
+            )
+            await self.conn.commit()
+
+    async def acompact(self, batch_size: int = 500) -> int:
+        """
+        Prune intermediate checkpoints of finished threads.
+
+        Keeps the latest checkpoint (and its pending writes) of every thread
+        that has been idle for idle_seconds, which is all that refinement
+        needs to resume. Each compacted thread records the change it was
+        compacted at (compacted_at = updated_at), and a partial index holds
+        only threads changed since, so a pass never rescans compacted
+        threads. Works in batches so the lock is never held long.
+
+        Args:
+            batch_size: Threads compacted per transaction
+
+        Returns:
+            Number of checkpoints deleted
+        """
+        await self.setup()
+        cutoff = time.time() - self.idle_seconds
+        deleted = 0
+
+        while True:
+            async with self.lock:
+                async with self.conn.execute(
+                    "SELECT thread_id FROM thread_activity "
+                    "WHERE updated_at < ? AND (compacted_at IS NULL OR compacted_at < updated_at) "
+                    "LIMIT ?",
+                    (cutoff, batch_size),
+                ) as cur:
+                    thread_ids = [row[0] for row in await cur.fetchall()]
+                if not thread_ids:
+                    break
+
+                for thread_id in thread_ids:
+                    cur = await self.conn.execute(
+                        """
+                        DELETE FROM checkpoints
+                        WHERE thread_id = ?1 AND checkpoint_id <> (
+                            SELECT MAX(c.checkpoint_id) FROM checkpoints c
+                            WHERE c.thread_id = ?1 AND c.checkpoint_ns = checkpoints.checkpoint_ns
+                        )
+                        """,
+                        (thread_id,),
+                    )
+                    deleted += cur.rowcount
+                    await self.conn.execute(
+                        """
+                        DELETE FROM writes
+                        WHERE thread_id = ?1 AND checkpoint_id NOT IN (
+                            SELECT checkpoint_id FROM checkpoints WHERE thread_id = ?1
+                        )
+                        """,
+                        (thread_id,),
+                    )
+                await self.conn.executemany(
+                    "UPDATE thread_activity SET compacted_at = updated_at WHERE thread_id = ?",
+                    [(thread_id,) for thread_id in thread_ids],
+                )
+                await self.conn.commit()
+                self._compacted_threads += len(thread_ids)
+
+            # Let request handlers in between batches
+            await asyncio.sleep(0)
+
+        self._compacted_checkpoints += deleted
+        if deleted:
+            logger.info(f"🗜️ Compacted {deleted} intermediate checkpoints")
+        return deleted
+
+    def start_compaction(self, interval_seconds: float = 300) -> asyncio.Task:
+        """
+        Run acompact() periodically in a background task.
+
+        Args:
+            interval_seconds: Delay between compaction passes
+
+        Returns:
+            The background asyncio.Task
+        """
+        async def _loop():
+            while True:
+                try:
+                    await self.acompact()
+                except Exception:
+                    logger.exception("Checkpoint compaction failed")
+                await asyncio.sleep(interval_seconds)
+
+        if self._compaction_task is None or self._compaction_task.done():
+            self._compaction_task = asyncio.create_task(_loop())
+        return self._compaction_task
+
+    async def aclose(self) -> None:
+        """Stop background compaction, commit staged writes and close the connection."""
+        if self._compaction_task is not None:
+            self._compaction_task.cancel()
+            self._compaction_task = None
+        await self.aflush()
+        await self.conn.close()
+
+    async def astats(self) -> dict:
+        """
+        Report what the store holds.
+
+        Returns:
+            dict with threads, checkpoints, database size and compaction counters
+        """
+        await self.setup()
+        async with self.lock:
+            async with self.conn.execute("SELECT COUNT(*) FROM thread_activity") as cur:
+                threads = (await cur.fetchone())[0]
+            async with self.conn.execute("SELECT COUNT(*) FROM checkpoints") as cur:
+                checkpoints = (await cur.fetchone())[0]
+            async with self.conn.execute(
+                "SELECT page_count * page_size FROM pragma_page_count(), pragma_page_size()"
+            ) as cur:
+                db_bytes = (await cur.fetchone())[0]
+        return {
+            "backend": "sqlite",
+            "threads": threads,
+            "checkpoints": checkpoints,
+            "bytes": db_bytes,
+            "idle_seconds": self.idle_seconds,
+            "compacted_threads": self._compacted_threads,
+            "compacted_checkpoints": self._compacted_checkpoints,
+        }
+
+
+# ----------------------------------------------------------------------
+# Configured process-wide checkpointer
+# ----------------------------------------------------------------------
+
+# "memory" (bounded, lost on restart) or "sqlite" (durable)
+CHECKPOINT_BACKEND = os.environ.get("CHECKPOINT_BACKEND", "memory").lower()
+CHECKPOINT_DB_PATH = os.environ.get("CHECKPOINT_DB_PATH", "")
+
+
+def _env_limit(name: str, default, cast=int):
+    """Read a numeric limit from the environment; 0 or negative means unlimited."""
+    value = cast(os.environ.get(name, default))
+    return value if value > 0 else None
+
+
+_checkpointer = None
+_checkpointer_lock = asyncio.Lock()
+
+
+async def get_checkpointer():
+    """
+    Get the process-wide checkpointer selected by CHECKPOINT_BACKEND.
+
+    The SQLite backend needs a running event loop, so construction is
+    deferred to the first call. It also starts the background compaction job.
+
+    Returns:
+        BoundedMemorySaver or DurableSqliteSaver
+    """
+    global _checkpointer
+    if _checkpointer is not None:
+        return _checkpointer
+
+    async with _checkpointer_lock:
+        if _checkpointer is not None:
+            return _checkpointer
+
+        if CHECKPOINT_BACKEND == "sqlite":
+            path = CHECKPOINT_DB_PATH or str(data_path("checkpoints.sqlite"))
+            conn = aiosqlite.connect(path)
+            # Don't let the connection thread block interpreter exit
+            conn.daemon = True
+            await conn
+            saver = DurableSqliteSaver(
+                conn,
+                idle_seconds=float(os.environ.get("CHECKPOINT_IDLE_SECONDS", 600)),
+            )
+            await saver.setup()
+            saver.start_compaction(float(os.environ.get("CHECKPOINT_COMPACT_INTERVAL", 300)))
+            logger.info(f"💾 Using SQLite checkpointer at {path}")
+        elif CHECKPOINT_BACKEND == "memory":
+            saver = BoundedMemorySaver(
+                max_threads=_env_limit("CHECKPOINT_MAX_THREADS", 1000),
+                ttl_seconds=_env_limit("CHECKPOINT_TTL_SECONDS", 24 * 3600, cast=float),
+                max_bytes=_env_limit("CHECKPOINT_MAX_BYTES", 256 * 1024 * 1024),
+                latest_only=os.environ.get("CHECKPOINT_LATEST_ONLY", "true").lower() == "true",
+            )
+        else:
+            raise ValueError(f"Unknown CHECKPOINT_BACKEND: {CHECKPOINT_BACKEND}")
+
+        _checkpointer = saver
+        return saver
+
+
+async def close_checkpointer() -> None:
+    """Flush and close the process-wide checkpointer (no-op for memory)."""
+    global _checkpointer
+    saver, _checkpointer = _checkpointer, None
+    if isinstance(saver, DurableSqliteSaver):
+        await saver.aclose()
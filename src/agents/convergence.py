@@ -0,0 +1,123 @@
+"""Early-exit checks for the generator → critic loop."""
+
+import os
+import time
+from difflib import SequenceMatcher
+from ..utils.metrics import current_node, get_metrics
+from .state import XHSPost
+from .validators.xhs_post_validators import validate_post
+
+# Stop when a new draft is at least this similar to the previous one (0-1)
+CONVERGENCE_SIMILARITY = float(os.environ.get("CONVERGENCE_SIMILARITY", 0.95))
+
+# Ask the critic to answer NO_MAJOR_ISSUES_MARKER when nothing important is
+# left, and stop when it does and the draft passes validation
+CONVERGENCE_CRITIC_SIGNAL = os.environ.get("CONVERGENCE_CRITIC_SIGNAL", "true").lower() == "true"
+
+# Stop as soon as a draft has no validation issues or suggestions,
+# without waiting for the critic
+CONVERGENCE_STOP_ON_CLEAN = os.environ.get("CONVERGENCE_STOP_ON_CLEAN", "false").lower() == "true"
+
+# Default per-request budgets (0 = unlimited); tools can override them
+RUN_TIME_BUDGET_SECONDS = float(os.environ.get("RUN_TIME_BUDGET_SECONDS", 0))
+RUN_TOKEN_BUDGET = int(os.environ.get("RUN_TOKEN_BUDGET", 0))
+
+NO_MAJOR_ISSUES_MARKER = "NO_MAJOR_ISSUES"
+
+
+def _thread_tokens(thread_id: str | None) -> int:
+    stats = get_metrics().thread_stats(thread_id) if thread_id else None
+    return stats["prompt_tokens"] + stats["completion_tokens"] if stats else 0
+
+
+def new_budget(thread_id: str, time_budget_s: float | None = None, token_budget: int | None = None) -> dict:
+    """
+    Budget for one run, stored in state.
+
+    Args:
+        thread_id: Thread the run belongs to (token usage is read from metrics)
+        time_budget_s: Wall-clock budget in seconds (None = RUN_TIME_BUDGET_SECONDS, 0 = unlimited)
+        token_budget: LLM token budget (None = RUN_TOKEN_BUDGET, 0 = unlimited)
+
+    Returns:
+        dict with started_at, time_budget_s, token_budget and tokens_at_start
+    """
+    return {
+        "started_at": time.time(),
+        "time_budget_s": RUN_TIME_BUDGET_SECONDS if time_budget_s is None else time_budget_s,
+        "token_budget": RUN_TOKEN_BUDGET if token_budget is None else token_budget,
+        "tokens_at_start": _thread_tokens(thread_id),
+    }
+
+
+def draft_similarity(previous: XHSPost, current: XHSPost) -> float:
+    """
+    Similarity ratio (0-1) of two drafts' title and body.
+
+    Exact at or above CONVERGENCE_SIMILARITY; below it, a cheap upper bound.
+    """
+    a = f"{previous.title}\n{previous.body}"
+    b = f"{current.title}\n{current.body}"
+    matcher = SequenceMatcher(None, a, b, autojunk=False)
+    # Cheap upper bounds first; drafts that differ a lot exit here
+    if matcher.real_quick_ratio() < CONVERGENCE_SIMILARITY or matcher.quick_ratio() < CONVERGENCE_SIMILARITY:
+        return matcher.quick_ratio()
+    return matcher.ratio()
+
+
+def critic_reports_no_major_issues(critique: str) -> bool:
+    """Whether the critique carries the no-major-issues signal."""
+    return CONVERGENCE_CRITIC_SIGNAL and NO_MAJOR_ISSUES_MARKER in critique
+
+
+def budget_exhausted(state: dict) -> str | None:
+    """
+    Check the run's budget before another critic → generator round.
+
+    The time check projects the average round duration so far, so a round
+    that would end past the deadline is not started.
+
+    Returns:
+        "time_budget" or "token_budget" when exhausted, None otherwise
+    """
+    budget = state.get("budget") or {}
+    rounds = max(1, state.get("iteration", 0))
+
+    time_budget = budget.get("time_budget_s") or 0
+    if time_budget > 0:
+        elapsed = time.time() - budget["started_at"]
+        if elapsed + elapsed / rounds > time_budget:
+            return "time_budget"
+
+    token_budget = budget.get("token_budget") or 0
+    if token_budget > 0:
+        thread_id, _ = current_node()
+        used = _thread_tokens(thread_id) - budget.get("tokens_at_start", 0)
+        if used + used / rounds > token_budget:
+            return "token_budget"
+
+    return None
+
+
+def draft_stop_reason(state: dict, post: XHSPost) -> str | None:
+    """
+    Decide whether a new draft ends the loop early.
+
+    Args:
+        state: Workflow state before the draft is applied
+        post: The new draft
+
+    Returns:
+        "similar_drafts", "clean", "time_budget", "token_budget" or None
+    """
+    previous = state.get("post")
+    if state.get("iteration", 0) > 0 and previous is not None and previous.body:
+        if draft_similarity(previous, post) >= CONVERGENCE_SIMILARITY:
+            return "similar_drafts"
+
+    if CONVERGENCE_STOP_ON_CLEAN:
+        validation = validate_post(post)
+        if validation["valid"] and not validation["suggestions"]:
+            return "clean"
+
+    return budget_exhausted({**state, "iteration": state.get("iteration", 0) + 1})
@@ -0,0 +1,100 @@
+"""Message-history compaction for the generator → critic loop."""
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from ..utils.tokens import estimate_message_tokens
+
+# Prefix of user feedback messages added by refinement_xhs_post
+USER_FEEDBACK_PREFIX = "User feedback:"
+
+# Prefix of source-edit messages added by update_source_xhs_post
+SOURCE_UPDATE_PREFIX = "Source update:"
+
+# Stable id of the summary message so repeated compaction replaces it
+SUMMARY_MESSAGE_ID = "history-summary"
+
+# Characters kept from each older critique in the summary
+CRITIQUE_EXCERPT_CHARS = 200
+
+
+def _excerpt(text: str, limit: int) -> str:
+    text = " ".join(str(text).split())
+    return text if len(text) <= limit else f"{text[:limit]}…"
+
+
+def compact_messages(messages: list, token_budget: int) -> tuple[list | None, int, int]:
+    """
+    Shrink the conversation sent to the generator to fit a token budget.
+
+    Always kept verbatim: leading system messages, the analysis message
+    (first human message), the latest draft and everything after it
+    (the critique or user feedback the next draft must answer).
+
+    Older drafts are dropped. Older user feedback and source updates are
+    kept verbatim since they carry the user's standing preferences and
+    edits. Older critiques are condensed into one summary message. If that
+    is still over budget, the critique summary is dropped as well.
+
+    Args:
+        messages: Current message history
+        token_budget: Target estimated token count
+
+    Returns:
+        Tuple of (compacted messages or None if nothing changed,
+        tokens before, tokens after)
+    """
+    before = estimate_message_tokens(messages)
+    if before <= token_budget:
+        return None, before, before
+
+    # Leading system messages + analysis message
+    head_end = 0
+    while head_end < len(messages) and isinstance(messages[head_end], SystemMessage):
+        head_end += 1
+    if head_end < len(messages) and isinstance(messages[head_end], HumanMessage):
+        head_end += 1
+
+    # Latest draft and everything after it
+    latest_draft = None
+    for i in range(len(messages) - 1, head_end - 1, -1):
+        if isinstance(messages[i], AIMessage):
+            latest_draft = i
+            break
+    if latest_draft is None:
+        return None, before, before
+
+    head = messages[:head_end]
+    middle = messages[head_end:latest_draft]
+    tail = messages[latest_draft:]
+    if not middle:
+        return None, before, before
+
+    feedback = []
+    critiques = []
+    for message in middle:
+        if message.id == SUMMARY_MESSAGE_ID:
+            critiques.extend(
+                line[2:] for line in str(message.content).splitlines() if line.startswith("- ")
+            )
+        elif isinstance(message, HumanMessage):
+            content = str(message.content)
+            if content.startswith((USER_FEEDBACK_PREFIX, SOURCE_UPDATE_PREFIX)):
+                feedback.append(message)
+            else:
+                critiques.append(_excerpt(content, CRITIQUE_EXCERPT_CHARS))
+        # Older drafts (AIMessage) are superseded by the latest one
+
+    summary = []
+    if critiques:
+        summary.append(HumanMessage(
+            id=SUMMARY_MESSAGE_ID,
+            content="Earlier critique points (already addressed in the latest draft):\n"
+            + "\n".join(f"- {c}" for c in critiques),
+        ))
+
+    compacted = head + summary + feedback + tail
+    after = estimate_message_tokens(compacted)
+    if after > token_budget and summary:
+        compacted = head + feedback + tail
+        after = estimate_message_tokens(compacted)
+
+    return compacted, before, after
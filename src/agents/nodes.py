@@ -1,80 +1,328 @@
 """Reusable node functions for LangGraph workflows."""
 
+import asyncio
 import logging
+import os
+import time
 from typing import Literal
-from pydantic import BaseModel, Field
-from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
-from ..utils.llm import base_llm
-from .validators.xhs_post_validators import validate_post, format_validation_feedback
-from .state import XHSPost
-from .prompts import CRITIC_PROMPT, ANALYZE_PROMPT, ANALYZE_INSTRUCTION_TEMPLATE, FORMATTING_PROMPT
+from pydantic import BaseModel
+from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, RemoveMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.config import get_stream_writer
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+from ..utils.llm import ainvoke_llm, get_route
+from ..utils.cache import get_response_cache, make_cache_key
+from ..utils.metrics import instrument_node
+from ..utils.post_index import NearDuplicateError, get_post_index, post_signature
+from .validators.xhs_post_validators import HASHTAG_MAX, validate_post, format_validation_feedback, is_mechanical_only, scan_text, without_checks
+from .validators.xhs_post_formatter import format_post
+from .validators.xhs_post_hashtags import fix_hashtags
+from .validators.xhs_post_scorer import HASHTAGS_OPTIMAL_MIN, score_post
+from .convergence import CONVERGENCE_CRITIC_SIGNAL, NO_MAJOR_ISSUES_MARKER, critic_reports_no_major_issues, draft_stop_reason
+from .history import compact_messages
+from .preprocess import build_digest
+from .state import XHSPost, ContentAnalysis
+from .prompts import CANDIDATE_ANGLES, CRITIC_PROMPT, CRITIC_SIGNAL_INSTRUCTION, ANALYZE_PROMPT, ANALYZE_INSTRUCTION_TEMPLATE, FORMATTING_PROMPT, PROMPT_VERSION
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
+# Moving average of each node's LLM latency (cache hits left out); the
+# formatting one is the time saved when the local formatter is enough
+_llm_latency_ms: dict[str, float] = {}
 
-class ContentAnalysis(BaseModel):
-    """Structured output for content analysis and custom structure generation."""
-    target_audience: str = Field(
-        description="Specific audience who would be most interested in this content (e.g., 'Tech leaders managing AI teams', 'Senior engineers evaluating tools', 'Product managers launching features')"
-    )
-    audience_needs: str = Field(
-        description="What this audience cares about and their key concerns/interests"
-    )
-    recommended_structure: str = Field(
-        description="Custom post structure tailored to this specific content and audience (step-by-step outline)"
-    )
-    tone_guidance: str = Field(
-        description="How to write for this audience (voice, style, what to emphasize, what to avoid)"
+# Estimated token budget for the message history sent to the generator
+HISTORY_TOKEN_BUDGET = int(os.environ.get("HISTORY_TOKEN_BUDGET", 4000))
+
+# Character budgets for the source digest given to the analyzer / generator
+SOURCE_ANALYZE_MAX_CHARS = int(os.environ.get("SOURCE_ANALYZE_MAX_CHARS", 6000))
+SOURCE_GENERATOR_MAX_CHARS = int(os.environ.get("SOURCE_GENERATOR_MAX_CHARS", 3000))
+
+# Give the first generation the raw source, then swap in the digest
+SOURCE_RAW_FIRST_GENERATION = os.environ.get("SOURCE_RAW_FIRST_GENERATION", "false").lower() == "true"
+
+# Parallel candidate drafts for the first generation of a run (1 = off)
+GENERATOR_CANDIDATES = int(os.environ.get("GENERATOR_CANDIDATES", 1))
+
+# Stream single-draft generations so partial posts reach progress listeners
+GENERATOR_STREAMING = os.environ.get("GENERATOR_STREAMING", "true").lower() == "true"
+
+# Minimum milliseconds between partial draft events (title completion is always sent)
+GENERATOR_STREAM_INTERVAL_MS = float(os.environ.get("GENERATOR_STREAM_INTERVAL_MS", 100))
+
+# When the critic sends validator feedback instead of an LLM critique:
+#   off        - never
+#   issues     - the draft breaks a platform limit and every failed check is mechanical
+#   mechanical - also when only mechanical suggestions remain after the
+#                run's first LLM critique
+CRITIC_VALIDATOR_ONLY = os.environ.get("CRITIC_VALIDATOR_ONLY", "mechanical").lower()
+
+# What the variety check does with a final post that nearly duplicates an
+# earlier one (see src/utils/post_index.py):
+#   off    - no check, posts are not indexed (so hashtag suggestions
+#            don't learn from them either)
+#   flag   - report the matches in the run metadata and index the post
+#   reject - raise NearDuplicateError; the post is not indexed
+VARIETY_CHECK = os.environ.get("VARIETY_CHECK", "flag").lower()
+
+# Let local formatting fix hashtags from the post history (dedupe, trim to
+# HASHTAG_MAX, add suggestions when too few); the critic then leaves
+# hashtag counts alone when the history can supply enough tags
+HASHTAG_AUTOFIX = os.environ.get("HASHTAG_AUTOFIX", "true").lower() == "true"
+
+
+async def cached_llm_call(node: str, prompt: str, schema: type[BaseModel] | None = None, config: RunnableConfig | None = None):
+    """
+    Call the node's LLM route with a fully rendered prompt, serving repeats from the response cache.
+
+    The cache key covers the node's model route, prompt version, node,
+    output schema and prompt text. Set `cache_bypass` in the run's
+    configurable to skip the lookup (the fresh response still refreshes the cache).
+
+    Args:
+        node: Name of the calling node (part of the cache key)
+        prompt: Rendered prompt
+        schema: Pydantic model for structured output, or None for plain text
+        config: RunnableConfig of the current run
+
+    Returns:
+        Instance of schema, or the response text when schema is None
+    """
+    cache = get_response_cache()
+    bypass = (config or {}).get("configurable", {}).get("cache_bypass", False)
+
+    key = None
+    if cache is not None:
+        key = make_cache_key(
+            route=get_route(node).cache_key(),
+            prompt_version=PROMPT_VERSION,
+            node=node,
+            schema=schema.model_json_schema() if schema else None,
+            input=prompt,
+        )
+        if not bypass:
+            cached = await cache.get(key)
+            if cached is not None:
+                logger.info(f"💾 Cache hit for {node}")
+                return schema.model_validate(cached) if schema else cached
+
+    start = time.perf_counter()
+    if schema:
+        result = await ainvoke_llm(prompt, schema, node)
+        value = result.model_dump()
+    else:
+        response = await ainvoke_llm(prompt, node=node)
+        result = value = response.content
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    previous = _llm_latency_ms.get(node)
+    _llm_latency_ms[node] = elapsed_ms if previous is None else 0.8 * previous + 0.2 * elapsed_ms
+
+    if key is not None:
+        await cache.set(key, value)
+    return result
+
+
+def render_analysis_message(source: str, analysis: ContentAnalysis, message_id: str | None = None) -> HumanMessage:
+    """Build the generator's instruction message from source text and analysis."""
+    return HumanMessage(
+        id=message_id,
+        content=ANALYZE_INSTRUCTION_TEMPLATE.format(
+            content=source,
+            target_audience=analysis.target_audience,
+            audience_needs=analysis.audience_needs,
+            tone_guidance=analysis.tone_guidance,
+            recommended_structure=analysis.recommended_structure
+        )
     )
 
 
+def route_entry(state: dict) -> Literal["analyze", "compact"]:
+    """
+    Routing function: Skips analysis when the thread was already analyzed.
+
+    Refinement runs resume a finished thread; its analysis message is still
+    in the history, so they go straight to the generator.
+
+    Args:
+        state: Current workflow state
 
-async def analyze_node(state: dict) -> dict:
+    Returns:
+        "compact" if an analysis exists, "analyze" otherwise
+    """
+    return "compact" if state.get("analysis") else "analyze"
+
+
+@instrument_node("analyze")
+async def analyze_node(state: dict, config: RunnableConfig) -> dict:
     """
     Analyze node: Analyzes content and generates custom structure dynamically.
 
+    Long sources are reduced to size-bounded digests first (agents/preprocess.py):
+    one for the analysis prompt and a smaller one that is kept in the
+    generator's message history.
+
     Args:
         state: Current workflow state
+        config: Run configuration (cache_bypass)
 
     Returns:
-        Dict with state updates (messages with instruction + content + analysis)
+        Dict with state updates (instruction message, analysis, digest)
     """
     # Get content directly from state
     content = state.get("content", "")
+    analyze_source = build_digest(content, SOURCE_ANALYZE_MAX_CHARS)
+    digest = build_digest(content, SOURCE_GENERATOR_MAX_CHARS)
 
     # Build analyze prompt
-    prompt = ANALYZE_PROMPT.format(content=content)
+    prompt = ANALYZE_PROMPT.format(content=analyze_source)
 
-    # Use structured output with Pydantic model
-    structured_llm = base_llm.with_structured_output(ContentAnalysis)
+    # Get content analysis from LLM (structured output, cached by content)
+    analysis: ContentAnalysis = await cached_llm_call("analyze", prompt, ContentAnalysis, config)
 
-    # Get content analysis from LLM
-    analysis: ContentAnalysis = await structured_llm.ainvoke(prompt)
+    # Create the HumanMessage with instruction + source + analysis
+    raw_first = SOURCE_RAW_FIRST_GENERATION and digest != content
+    message = render_analysis_message(content if raw_first else digest, analysis)
 
-    # Create the HumanMessage with instruction + content + analysis
-    # This combines what was previously two separate messages
-    message = HumanMessage(
-        content=ANALYZE_INSTRUCTION_TEMPLATE.format(
-            content=content,
-            target_audience=analysis.target_audience,
-            audience_needs=analysis.audience_needs,
-            tone_guidance=analysis.tone_guidance,
-            recommended_structure=analysis.recommended_structure
+    return {
+        "messages": [message],
+        "analysis": analysis,
+        "digest": digest,
+        "raw_source_in_history": raw_first,
+        "run_stats": {
+            "source_chars": len(content),
+            "analyze_source_chars": len(analyze_source),
+            "digest_chars": len(digest),
+        },
+    }
+
+
+@instrument_node("compact")
+async def compact_history_node(state: dict) -> dict:
+    """
+    Compaction node: Keeps the generator's message history within a token budget.
+
+    Older drafts are dropped and older critiques condensed (see
+    agents/history.py), so each refinement round doesn't resend the whole
+    conversation.
+
+    Args:
+        state: Current workflow state
+
+    Returns:
+        Dict with replaced messages and compaction stats (empty if under budget)
+    """
+    messages = state.get("messages", [])
+    update = {}
+
+    # After the first generation, replace the raw source with the digest
+    if state.get("raw_source_in_history") and state.get("iteration", 0) > 0:
+        index, analysis_message = next(
+            (i, m) for i, m in enumerate(messages) if isinstance(m, HumanMessage)
         )
-    )
+        replacement = render_analysis_message(state["digest"], state["analysis"], analysis_message.id)
+        messages = [*messages[:index], replacement, *messages[index + 1:]]
+        update = {"messages": [replacement], "raw_source_in_history": False}
+
+    compacted, before, after = compact_messages(messages, HISTORY_TOKEN_BUDGET)
+    if compacted is None:
+        return update
 
+    logger.info(f"🗜️ Compacted history: ~{before} → ~{after} tokens")
+    history = state.get("run_stats", {}).get("history_compaction", [])
     return {
-        "messages": [message],
+        **update,
+        "messages": [RemoveMessage(id=REMOVE_ALL_MESSAGES), *compacted],
+        "run_stats": {
+            "history_compaction": [*history, {"tokens_before": before, "tokens_after": after}],
+            "history_tokens_saved": sum(c["tokens_before"] - c["tokens_after"] for c in history) + before - after,
+        },
     }
 
 
-async def generator_node(state: dict) -> dict:
+async def _generate_candidates(messages: list, count: int) -> tuple[XHSPost, dict]:
+    """
+    Generate `count` drafts concurrently and keep the best by local score.
+
+    Each candidate after the first gets an extra instruction from
+    CANDIDATE_ANGLES so drafts differ. Failed candidates are dropped as
+    long as one succeeds.
+
+    Returns:
+        Tuple of (best post, run_stats entries)
+    """
+    async def generate(index: int) -> tuple[XHSPost, float]:
+        start = time.perf_counter()
+        request = messages
+        if index:
+            request = [*messages, HumanMessage(content=CANDIDATE_ANGLES[(index - 1) % len(CANDIDATE_ANGLES)])]
+        post = await ainvoke_llm(request, XHSPost)
+        return post, (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(generate(i) for i in range(count)), return_exceptions=True)
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    succeeded = [r for r in results if not isinstance(r, BaseException)]
+    if not succeeded:
+        raise results[0]
+    for error in (r for r in results if isinstance(r, BaseException)):
+        logger.warning(f"⚠️ Candidate draft failed: {error}")
+
+    scores = [score_post(post)["score"] for post, _ in succeeded]
+    best = max(range(len(succeeded)), key=scores.__getitem__)
+    serial_ms = sum(ms for _, ms in succeeded)
+    logger.info(f"🎯 Picked candidate {best + 1}/{len(succeeded)} (scores {scores}) in {wall_ms:.0f}ms vs ~{serial_ms:.0f}ms serial")
+
+    return succeeded[best][0], {
+        "candidates": count,
+        "candidate_scores": scores,
+        "best_candidate": best,
+        "candidates_wall_ms": round(wall_ms, 1),
+        "candidates_serial_ms": round(serial_ms, 1),
+    }
+
+
+def _draft_streamer(iteration: int):
+    """
+    on_partial callback writing partial drafts to the graph's custom stream.
+
+    Events are throttled to GENERATOR_STREAM_INTERVAL_MS; the first one and
+    the one completing the title are always sent.
+    """
+    writer = get_stream_writer()
+    last_sent = 0.0
+    title_sent = False
+
+    def on_partial(values: dict, completed: set) -> None:
+        nonlocal last_sent, title_sent
+        now = time.perf_counter()
+        title_complete = "title" in completed
+        if title_complete == title_sent and (now - last_sent) * 1000 < GENERATOR_STREAM_INTERVAL_MS:
+            return
+        last_sent, title_sent = now, title_complete
+        writer({
+            "partial_post": {"title": values.get("title", ""), "body": values.get("body", "")},
+            "title_complete": title_complete,
+            "iteration": iteration + 1,
+        })
+
+    return on_partial
+
+
+@instrument_node("generator")
+async def generator_node(state: dict, config: RunnableConfig) -> dict:
     """
     Generator node: Creates or improves a 小紅書 post using message chain.
 
+    With more than one candidate configured (state "candidates" or
+    GENERATOR_CANDIDATES), the first draft of a run is picked from that
+    many concurrent generations by local score (best-of-N). Otherwise, when
+    the run asks for it (`stream_drafts` in configurable), the draft is
+    streamed and partial posts are written to the custom stream.
+
     Args:
         state: Current workflow state
+        config: Run configuration (stream_drafts)
 
     Returns:
         Dict with state updates (title, body, iteration, messages, process_log)
@@ -85,56 +333,195 @@ async def generator_node(state: dict) -> dict:
     # Get message history (conversation so far)
     messages = state.get("messages", [])
 
-    # Use structured output with Pydantic model
-    structured_llm = base_llm.with_structured_output(XHSPost)
-
-    # Call LLM with message chain
-    post: XHSPost = await structured_llm.ainvoke(messages)
+    candidates = state.get("candidates") or GENERATOR_CANDIDATES
+    run_stats = {}
+    if iteration == 0 and candidates > 1:
+        # Best-of-N first draft
+        post, run_stats = await _generate_candidates(messages, candidates)
+    else:
+        # Call LLM with message chain (structured output with Pydantic model)
+        stream = GENERATOR_STREAMING and (config or {}).get("configurable", {}).get("stream_drafts")
+        on_partial = _draft_streamer(iteration) if stream else None
+        post: XHSPost = await ainvoke_llm(messages, XHSPost, on_partial=on_partial)
 
     # Create AI response message with the generated post
     ai_message = AIMessage(
         content=f"Title: {post.title}\n\nBody:\n{post.body}"
     )
 
+    # Stop early if the draft converged or the run's budget is spent
+    # (only matters when more rounds are left)
+    stop_reason = None
+    if iteration + 1 <= state.get("max_iterations", 2):
+        stop_reason = draft_stop_reason(state, post)
+        if stop_reason:
+            logger.info(f"🏁 Stopping after draft {iteration + 1}: {stop_reason}")
+            run_stats["stop_reason"] = stop_reason
+
     # Return state updates
-    return {
+    update = {
         "iteration": iteration + 1,
         "messages": [ai_message],
         "post": post,
+        "stop_reason": stop_reason,
     }
+    if run_stats:
+        update["run_stats"] = run_stats
+    return update
+
 
-async def critic_node(state: dict) -> dict:
+def _validator_feedback_is_enough(validation: dict, llm_reviews: int) -> bool:
+    """Whether the critic can send validator feedback instead of calling the LLM."""
+    if CRITIC_VALIDATOR_ONLY == "off" or not is_mechanical_only(validation):
+        return False
+    if not validation["valid"]:
+        return True
+    return CRITIC_VALIDATOR_ONLY == "mechanical" and llm_reviews > 0
+
+
+def _hashtags_fixed_locally(post: XHSPost, hashtags) -> bool:
+    """Whether local formatting will leave the post with HASHTAGS_OPTIMAL_MIN..HASHTAG_MAX tags."""
+    fixed, _ = fix_hashtags(format_post(post), hashtags.rank)
+    return HASHTAGS_OPTIMAL_MIN <= len(scan_text(f"{fixed.title}\n{fixed.body}")["hashtags"]) <= HASHTAG_MAX
+
+
+@instrument_node("critic")
+async def critic_node(state: dict, config: RunnableConfig) -> dict:
     """
     Critic node: Critiques content quality (tone, authenticity, audience fit).
 
+    The local validator runs first and its findings are appended to the
+    critique. When the draft only has mechanical problems (length, hashtags,
+    line width; see CRITIC_VALIDATOR_ONLY), the LLM critique is skipped and
+    the validator feedback is sent on its own. Hashtag counts are left to
+    local formatting when HASHTAG_AUTOFIX can fill the post with enough
+    tags from the post history.
+
     Args:
         state: Current workflow state
+        config: Run configuration (cache_bypass)
 
     Returns:
-        Dict with state updates (messages)
+        Dict with state updates (messages, run_stats)
     """
+    post = state['post']
+    validation = validate_post(post)
+    if HASHTAG_AUTOFIX and any(c["check"] == "hashtags" for c in validation["checks"]):
+        hashtags = await get_post_index().hashtag_index()
+        if len(hashtags) and _hashtags_fixed_locally(post, hashtags):
+            # Local formatting fixes hashtag counts, no need to spend a round on them
+            validation = without_checks(validation, {"hashtags"})
+    feedback = format_validation_feedback(validation)
+    run_stats = state.get("run_stats") or {}
+    llm_reviews = run_stats.get("critic_llm_reviews", 0)
+
+    if _validator_feedback_is_enough(validation, llm_reviews):
+        logger.info("⚡ Only mechanical problems, skipping the LLM critique")
+        return {
+            "messages": [HumanMessage(
+                content=f"Critique:{feedback}\n\nPlease fix these problems and keep the rest of the post unchanged."
+            )],
+            "run_stats": {"critic_validator_only": run_stats.get("critic_validator_only", 0) + 1},
+        }
+
     # Build critic prompt
-    critic_prompt = CRITIC_PROMPT.format(title=state['post'].title, body=state['post'].body)
+    critic_prompt = CRITIC_PROMPT.format(title=post.title, body=post.body)
+    if CONVERGENCE_CRITIC_SIGNAL:
+        critic_prompt += CRITIC_SIGNAL_INSTRUCTION.format(marker=NO_MAJOR_ISSUES_MARKER)
 
-    # Get critique from LLM
-    response = await base_llm.ainvoke(critic_prompt)
+    # Get critique from LLM (cached by title/body)
+    critique = await cached_llm_call("critic", critic_prompt, config=config)
 
-    # Add critique as feedback message
+    # Add critique and validator findings as feedback message
     critique_message = HumanMessage(
-        content=f"Critique:\n{response.content}\n\nPlease improve the post based on this feedback."
+        content=f"Critique:\n{critique}{feedback}\n\nPlease improve the post based on this feedback."
     )
 
-    return {
+    update = {
         "messages": [critique_message],
+        "run_stats": {"critic_llm_reviews": llm_reviews + 1},
+    }
+
+    # No major issues and no hard validation issues: skip the rewrite
+    if critic_reports_no_major_issues(critique) and validation["valid"]:
+        logger.info("🏁 Critic reports no major issues, stopping early")
+        update["stop_reason"] = "critic_approved"
+        update["run_stats"]["stop_reason"] = "critic_approved"
+
+    return update
+
+
+@instrument_node("local_formatting")
+async def local_formatting_node(state: dict) -> dict:
+    """
+    Local formatting node: Deterministic layout cleanup without an LLM call.
+
+    Re-wraps long lines, normalizes paragraph spacing and moves hashtags to
+    the end. With HASHTAG_AUTOFIX, the closing hashtags are then fixed from
+    the post history (see validators/xhs_post_hashtags.py). When the result
+    passes validation, the LLM formatter is skipped.
+
+    Args:
+        state: Current workflow state
+
+    Returns:
+        Dict with formatted post and formatting stats
+    """
+    hashtags = await get_post_index().hashtag_index() if HASHTAG_AUTOFIX else None
+
+    start = time.perf_counter()
+    post = format_post(state['post'])
+    changes = None
+    if hashtags is not None:
+        post, changes = fix_hashtags(post, hashtags.rank)
+    validation = validate_post(post)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    run_stats = {"local_formatting_ms": round(elapsed_ms, 3)}
+    if changes and (changes["added"] or changes["removed"]):
+        logger.info(f"🏷️ Hashtags fixed: +{changes['added']} -{changes['removed']}")
+        run_stats["hashtags_added"] = changes["added"]
+        run_stats["hashtags_removed"] = changes["removed"]
+    if state.get("stop_reason"):
+        # Generations planned (first draft + one per critic loop) minus done
+        run_stats["iterations_skipped"] = max(0, state.get("max_iterations", 2) + 1 - state.get("iteration", 0))
+    if validation["valid"]:
+        run_stats["formatting"] = "local"
+        # Only once an LLM formatting call has been timed in this process
+        if "formatting" in _llm_latency_ms:
+            run_stats["formatting_saved_ms"] = round(_llm_latency_ms["formatting"] - elapsed_ms, 1)
+    else:
+        logger.info(f"📏 Post needs LLM formatting: {validation['issues']}")
+
+    return {
+        "post": post,
+        "run_stats": run_stats,
     }
 
 
-async def formatting_node(state: dict) -> dict:
+def needs_llm_formatting(state: dict) -> Literal["formatting", "end"]:
+    """
+    Routing function: Sends the post to the LLM formatter only on hard issues.
+
+    Args:
+        state: Current workflow state
+
+    Returns:
+        "formatting" if validate_post reports issues, "end" otherwise
+    """
+    if validate_post(state['post'])["valid"]:
+        return "end"
+    return "formatting"
+
+
+@instrument_node("formatting")
+async def formatting_node(state: dict, config: RunnableConfig) -> dict:
     """
     Formatting node: Uses LLM to improve formatting and ensure length compliance.
 
     Args:
         state: Current workflow state
+        config: Run configuration (cache_bypass)
 
     Returns:
         Dict with formatted post
@@ -158,13 +545,62 @@ async def formatting_node(state: dict) -> dict:
     )
 
     # Use structured output to get formatted post
-    structured_llm = base_llm.with_structured_output(XHSPost)
-    formatted_post: XHSPost = await structured_llm.ainvoke(prompt)
+    start = time.perf_counter()
+    formatted_post: XHSPost = await cached_llm_call("formatting", prompt, XHSPost, config)
+    elapsed_ms = (time.perf_counter() - start) * 1000
 
     return {
         "post": formatted_post,
+        "run_stats": {"formatting": "llm", "formatting_ms": round(elapsed_ms, 1)},
     }
 
+
+@instrument_node("variety_check")
+async def variety_check_node(state: dict, config: RunnableConfig) -> dict:
+    """
+    Variety check node: Compares the final post with every earlier post.
+
+    Near-duplicates are found through the local MinHash/LSH post index.
+    Depending on VARIETY_CHECK they are flagged in the run stats or the run
+    is rejected. Accepted posts are indexed under the thread, replacing the
+    thread's previous version. Hashing and comparing run in worker threads,
+    so other runs' nodes keep going meanwhile.
+
+    Args:
+        state: Current workflow state
+        config: Run configuration (thread_id)
+
+    Returns:
+        Dict with variety stats (near_duplicates when any were found)
+    """
+    if VARIETY_CHECK == "off":
+        return {}
+
+    post = state['post']
+    thread_id = config["configurable"]["thread_id"]
+    index = get_post_index()
+
+    start = time.perf_counter()
+    sig = await asyncio.to_thread(post_signature, post.title, post.body)
+    found = await index.find_similar(post.title, post.body, exclude_thread_id=thread_id, sig=sig)
+    matches = found["matches"]
+    if matches and VARIETY_CHECK == "reject":
+        best = matches[0]
+        raise NearDuplicateError(
+            f"Post is {best['similarity']:.0%} similar to an earlier post ({best['thread_id']}: {best['title']}). "
+            "Refine it with feedback asking for a different angle.",
+            matches,
+        )
+    await index.add(thread_id, post.title, post.body, sig=sig)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    run_stats = {"variety_check_ms": round(elapsed_ms, 1)}
+    if matches:
+        logger.warning(f"👯 Post is {matches[0]['similarity']:.0%} similar to thread {matches[0]['thread_id']}")
+        run_stats["near_duplicates"] = matches
+    return {"run_stats": run_stats}
+
+
 def should_continue(state: dict) -> Literal["critic", "end"]:
     """
     Routing function: Decides whether to continue to critic or end.
@@ -173,13 +609,26 @@ def should_continue(state: dict) -> Literal["critic", "end"]:
         state: Current workflow state
 
     Returns:
-        "critic" if should continue iterating, "end" if done
+        "critic" if should continue iterating, "end" if done or converged
     """
     # Check if we should continue to critic or end the workflow
     # Note: iteration was already incremented by generator_node
     current_iteration = state.get("iteration", 0)
     max_iterations = state.get("max_iterations", 2)
 
-    if current_iteration <= max_iterations:
+    if current_iteration <= max_iterations and not state.get("stop_reason"):
         return "critic"
     return "end"
+
+
+def after_critic(state: dict) -> Literal["compact", "end"]:
+    """
+    Routing function: Regenerate after a critique unless the critic approved the draft.
+
+    Args:
+        state: Current workflow state
+
+    Returns:
+        "end" if the loop stopped early, "compact" (→ generator) otherwise
+    """
+    return "end" if state.get("stop_reason") else "compact"
@@ -0,0 +1,194 @@
+"""Source pre-processing: size-bounded digests of long inputs and change detection between versions."""
+
+import hashlib
+import math
+import re
+from collections import Counter
+from difflib import SequenceMatcher
+
+# Chunks longer than this are split at sentence boundaries before scoring
+MAX_CHUNK_CHARS = 400
+
+# Marker inserted where source text was left out
+OMISSION = "……"
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[。！？!?；;.])\s*")
+_TERMS = re.compile(r"[a-zA-Z][a-zA-Z0-9_\-]{2,}|[\u4e00-\u9fff]{2,}")
+_HEADING = re.compile(r"^\s*(#{1,6}\s|\d+[.、)]\s*|[一二三四五六七八九十]+[、.])|[:：]\s*$")
+_NUMBER = re.compile(r"\d")
+
+# Replaced passages longer than this (old + new) count as fully changed
+# instead of being compared character by character
+DIFF_MAX_COMPARE_CHARS = 4000
+
+
+def split_chunks(content: str, max_chunk_chars: int = MAX_CHUNK_CHARS) -> list[str]:
+    """
+    Split source text into paragraph-sized chunks.
+
+    Paragraphs are separated by blank lines (or by single newlines when the
+    text has no blank lines). Paragraphs longer than max_chunk_chars are
+    split into groups of whole sentences.
+    """
+    text = content.replace("\r\n", "\n").strip()
+    paragraphs = _PARAGRAPH_BREAK.split(text) if _PARAGRAPH_BREAK.search(text) else text.split("\n")
+
+    chunks = []
+    for paragraph in (p.strip() for p in paragraphs):
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chunk_chars:
+            chunks.append(paragraph)
+            continue
+        current = ""
+        for sentence in _SENTENCE_END.split(paragraph):
+            if current and len(current) + len(sentence) > max_chunk_chars:
+                chunks.append(current)
+                current = ""
+            current += sentence
+        if current:
+            chunks.append(current)
+    return chunks
+
+
+def _terms(text: str) -> list[str]:
+    """Lower-cased words plus CJK bigrams."""
+    terms = []
+    for match in _TERMS.findall(text):
+        if match[0].isascii():
+            terms.append(match.lower())
+        else:
+            terms.extend(match[i:i + 2] for i in range(len(match) - 1))
+    return terms
+
+
+def _score_chunks(chunks: list[str]) -> list[float]:
+    """
+    Score chunks with cheap local heuristics.
+
+    Chunks rich in terms that recur across the document score high;
+    headings, the opening, the closing and chunks with numbers get a bonus.
+    """
+    chunk_terms = [_terms(chunk) for chunk in chunks]
+    doc_freq = Counter(term for terms in chunk_terms for term in set(terms))
+
+    scores = []
+    for i, (chunk, terms) in enumerate(zip(chunks, chunk_terms)):
+        distinct = set(terms)
+        score = sum(math.log1p(doc_freq[t]) for t in distinct) / math.sqrt(len(distinct) + 1)
+        if _HEADING.search(chunk) or len(chunk) <= 30:
+            score += 2.0
+        if _NUMBER.search(chunk):
+            score += 0.5
+        if i < 2:
+            score += 3.0
+        elif i == len(chunks) - 1:
+            score += 1.5
+        scores.append(score)
+    return scores
+
+
+def build_digest(content: str, max_chars: int) -> str:
+    """
+    Reduce source content to at most max_chars characters of key sections.
+
+    Content that already fits is returned unchanged. Otherwise the text is
+    chunked, chunks are scored (see _score_chunks) and the best ones are kept
+    in their original order, with an omission marker where text was skipped.
+
+    Args:
+        content: Raw source text
+        max_chars: Character budget for the digest (<= 0 disables digesting)
+
+    Returns:
+        Digest text
+    """
+    if max_chars <= 0 or len(content) <= max_chars:
+        return content
+
+    chunks = split_chunks(content)
+    scores = _score_chunks(chunks)
+
+    selected = set()
+    used = 0
+    for i in sorted(range(len(chunks)), key=lambda i: scores[i], reverse=True):
+        cost = len(chunks[i]) + len(OMISSION) + 1
+        if used + cost > max_chars:
+            continue
+        selected.add(i)
+        used += cost
+
+    parts = []
+    previous = -1
+    for i in sorted(selected):
+        if i != previous + 1:
+            parts.append(OMISSION)
+        parts.append(chunks[i])
+        previous = i
+    if previous != len(chunks) - 1:
+        parts.append(OMISSION)
+
+    return "\n".join(parts)
+
+
+def _chunk_key(chunk: str) -> str:
+    """Chunk text with whitespace differences removed."""
+    return " ".join(chunk.split())
+
+
+def paragraph_fingerprints(content: str) -> list[str]:
+    """
+    Fingerprint source text paragraph by paragraph.
+
+    Chunks come from split_chunks; whitespace-only edits don't change a
+    fingerprint.
+
+    Returns:
+        One short hex digest per chunk, in order
+    """
+    return [
+        hashlib.blake2b(_chunk_key(chunk).encode("utf-8"), digest_size=8).hexdigest()
+        for chunk in split_chunks(content)
+    ]
+
+
+def diff_sources(old: str, new: str) -> dict:
+    """
+    Measure how much of a source changed between two versions.
+
+    Chunks are aligned first; only replaced chunks are compared character
+    by character, so a typo fix in one paragraph counts as a few changed
+    characters rather than a changed paragraph.
+
+    Args:
+        old: Previous source text
+        new: Edited source text
+
+    Returns:
+        dict with:
+            - ratio: Changed characters relative to the longer version (0-1)
+            - changes: [{"before", "after"}] for every edited, added or
+              removed passage, in order
+    """
+    old_chunks, new_chunks = split_chunks(old), split_chunks(new)
+    matcher = SequenceMatcher(
+        None, [_chunk_key(c) for c in old_chunks], [_chunk_key(c) for c in new_chunks], autojunk=False
+    )
+
+    changed = 0.0
+    changes = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        before = "\n".join(old_chunks[i1:i2])
+        after = "\n".join(new_chunks[j1:j2])
+        if tag == "replace" and len(before) + len(after) <= DIFF_MAX_COMPARE_CHARS:
+            similarity = SequenceMatcher(None, before, after, autojunk=False).ratio()
+            changed += (1 - similarity) * max(len(before), len(after))
+        else:
+            changed += max(len(before), len(after))
+        changes.append({"before": before, "after": after})
+
+    total = max(len(old), len(new), 1)
+    return {"ratio": min(1.0, changed / total), "changes": changes}
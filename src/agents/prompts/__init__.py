@@ -1,14 +1,20 @@
 """Prompts for 小紅書 content generation workflow."""
 
-from .generator import GENERATOR_PROMPT
-from .critic import CRITIC_PROMPT
+from .generator import GENERATOR_PROMPT, CANDIDATE_ANGLES
+from .critic import CRITIC_PROMPT, CRITIC_SIGNAL_INSTRUCTION
 from .analyze import ANALYZE_PROMPT, ANALYZE_INSTRUCTION_TEMPLATE
 from .formatting import FORMATTING_PROMPT
 
+# Bump when prompt semantics change so cached LLM responses are invalidated
+PROMPT_VERSION = "1"
+
 __all__ = [
     "GENERATOR_PROMPT",
+    "CANDIDATE_ANGLES",
     "CRITIC_PROMPT",
+    "CRITIC_SIGNAL_INSTRUCTION",
     "ANALYZE_PROMPT",
     "ANALYZE_INSTRUCTION_TEMPLATE",
     "FORMATTING_PROMPT",
+    "PROMPT_VERSION",
 ]
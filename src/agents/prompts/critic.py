@@ -18,3 +18,9 @@ CRITIC_PROMPT = """你是一位小红书内容评审专家，负责帮助优化
 {body}
 
 请给出具体、可立即落地的优化建议。"""
+
+
+# Appended to CRITIC_PROMPT when the early-exit signal is enabled
+CRITIC_SIGNAL_INSTRUCTION = """
+
+如果帖子已经没有需要修改的重大问题，请只回复：{marker}"""
@@ -28,3 +28,12 @@ GENERATOR_PROMPT = f"""你是一位小红书内容创作专家，专注于打造
 - 正文：≤ {BODY_MAX_CHARS} 字符（严格执行）
 - 理想范围：标题 {TITLE_OPTIMAL_MIN}-{TITLE_OPTIMAL_MAX}，正文 {BODY_OPTIMAL_MIN}-{BODY_OPTIMAL_MAX}
 """
+
+# Extra instruction per parallel candidate draft (best-of-N), so candidates
+# differ in angle; candidate 0 gets no extra instruction
+CANDIDATE_ANGLES = [
+    "这一版请用一个具体的踩坑经历开头，突出前后对比。",
+    "这一版请用一个引发共鸣的问题开头，正文按步骤清单展开。",
+    "这一版请用一个具体数字或结果开头，语气更轻松口语化。",
+    "这一版请先给出结论，再用两三个真实细节支撑。",
+]
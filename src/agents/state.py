@@ -9,6 +9,37 @@ class XHSPost(BaseModel):
     title: str = Field(description="Post title (max 64 characters)")
     body: str = Field(description="Post body content (max 10,000 characters)")
 
+
+class ContentAnalysis(BaseModel):
+    """Structured output for content analysis and custom structure generation."""
+    target_audience: str = Field(
+        description="Specific audience who would be most interested in this content (e.g., 'Tech leaders managing AI teams', 'Senior engineers evaluating tools', 'Product managers launching features')"
+    )
+    audience_needs: str = Field(
+        description="What this audience cares about and their key concerns/interests"
+    )
+    recommended_structure: str = Field(
+        description="Custom post structure tailored to this specific content and audience (step-by-step outline)"
+    )
+    tone_guidance: str = Field(
+        description="How to write for this audience (voice, style, what to emphasize, what to avoid)"
+    )
+
+def merge_run_stats(left: dict | None, right: dict | None) -> dict:
+    """
+    Reducer for per-run statistics.
+
+    Node updates are merged into the current stats. An update carrying a new
+    run_id starts a fresh set, so refinement runs on an existing thread
+    don't inherit the previous run's numbers.
+    """
+    left = left or {}
+    right = right or {}
+    if "run_id" in right and right["run_id"] != left.get("run_id"):
+        return dict(right)
+    return {**left, **right}
+
+
 class WorkflowState(TypedDict):
     """State for the analyze → generator → critic workflow.
 
@@ -21,7 +52,27 @@ class WorkflowState(TypedDict):
     # Source content to generate post from
     content: str
 
+    # Size-bounded digest of the source used in the generator's messages
+    digest: str
+
+    # Content analysis (set once; refinement runs skip re-analysis)
+    analysis: ContentAnalysis
+
+    # True while the analysis message still embeds the raw source
+    raw_source_in_history: bool
+
     # Working state - structured post
     post: XHSPost
     iteration: int
     max_iterations: int
+
+    # Parallel candidate drafts for a run's first generation (None = env default)
+    candidates: int | None
+
+    # Early exit: run budget (see agents/convergence.py) and why the loop
+    # stopped before max_iterations (None while running / ran in full)
+    budget: dict
+    stop_reason: str | None
+
+    # Per-run statistics reported back to the caller (latency saved, ...)
+    run_stats: Annotated[dict, merge_run_stats]
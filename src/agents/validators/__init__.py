@@ -2,22 +2,39 @@
 
 from .xhs_post_validators import (
     validate_post,
+    validate_posts,
+    scan_text,
+    line_widths,
     format_validation_feedback,
+    is_mechanical_only,
+    without_checks,
+    MECHANICAL_CHECKS,
     TITLE_MAX_CHARS,
     BODY_MAX_CHARS,
     TITLE_OPTIMAL_MIN,
     TITLE_OPTIMAL_MAX,
     BODY_OPTIMAL_MIN,
     BODY_OPTIMAL_MAX,
+    BODY_MAX_LINE_WIDTH,
 )
+from .xhs_post_hashtags import fix_hashtags, HASHTAGS_TARGET
 
 __all__ = [
     "validate_post",
+    "validate_posts",
+    "scan_text",
+    "line_widths",
     "format_validation_feedback",
+    "is_mechanical_only",
+    "without_checks",
+    "MECHANICAL_CHECKS",
     "TITLE_MAX_CHARS",
     "BODY_MAX_CHARS",
     "TITLE_OPTIMAL_MIN",
     "TITLE_OPTIMAL_MAX",
     "BODY_OPTIMAL_MIN",
     "BODY_OPTIMAL_MAX",
+    "BODY_MAX_LINE_WIDTH",
+    "fix_hashtags",
+    "HASHTAGS_TARGET",
 ]
@@ -0,0 +1,100 @@
+"""Deterministic 小紅書 post formatting (no LLM)."""
+
+import re
+from ...utils.hashtags import HASHTAG, HASHTAG_LINE
+from ..state import XHSPost
+from .xhs_post_validators import BODY_MAX_LINE_WIDTH, line_widths
+
+# Lines made up only of emojis
+_EMOJI_LINE = re.compile(r"^[\U0001F000-\U0001FAFF\u2600-\u27BF\u2B00-\u2BFF\uFE0F\u200D\s]+$")
+
+# Sentence boundaries used for re-wrapping; closing brackets/quotes stay
+# with the sentence they end
+_SENTENCE_END = re.compile(r"(?<=[。！？!?；;…])(?![。！？!?；;…）)」』”’】\]\"'])")
+
+_BLANK_RUNS = re.compile(r"\n{3,}")
+
+
+def _wrap_line(line: str, width: int) -> list[str]:
+    """
+    Re-wrap an overlong line at sentence boundaries.
+
+    Sentences are packed greedily up to `width` display columns (measured
+    like validate_post, see line_widths); a single sentence wider than
+    `width` is kept whole so wording is never split mid-phrase.
+    """
+    if line_widths([line])[0] <= width:
+        return [line]
+
+    sentences = [s for s in _SENTENCE_END.split(line) if s]
+    if len(sentences) == 1:
+        return [line]
+
+    wrapped, current, current_width = [], "", 0
+    for sentence, sentence_width in zip(sentences, line_widths(sentences)):
+        if current and current_width + sentence_width > width:
+            wrapped.append(current.rstrip())
+            current = sentence.lstrip()
+            current_width = line_widths([current])[0]
+        else:
+            current += sentence
+            current_width += sentence_width
+    if current:
+        wrapped.append(current.rstrip())
+    return wrapped
+
+
+def format_body(body: str, line_width: int = BODY_MAX_LINE_WIDTH) -> str:
+    """
+    Normalize body layout without changing its wording.
+
+    - Re-wraps overlong lines at sentence punctuation around `line_width`
+    - Single blank line between paragraphs, no trailing whitespace
+    - Emoji-only lines are attached to the preceding line
+    - Hashtag-only lines are merged into one line at the end
+
+    Args:
+        body: Post body
+        line_width: Target display columns per line (CJK characters take 2)
+
+    Returns:
+        Formatted body
+    """
+    lines = body.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+
+    hashtags: list[str] = []
+    formatted: list[str] = []
+    for raw in lines:
+        line = raw.rstrip()
+
+        if line and HASHTAG_LINE.fullmatch(line):
+            for tag in HASHTAG.findall(line):
+                tag = f"#{tag}"
+                if tag not in hashtags:
+                    hashtags.append(tag)
+            continue
+
+        if line.strip() and _EMOJI_LINE.match(line) and formatted and formatted[-1]:
+            formatted[-1] = f"{formatted[-1]} {line.strip()}"
+            continue
+
+        formatted.extend(_wrap_line(line, line_width))
+
+    text = _BLANK_RUNS.sub("\n\n", "\n".join(formatted)).strip("\n")
+    if hashtags:
+        text = f"{text}\n\n{' '.join(hashtags)}" if text else " ".join(hashtags)
+    return text
+
+
+def format_post(post: XHSPost) -> XHSPost:
+    """
+    Format a post locally: tidy title whitespace and normalize body layout.
+
+    Args:
+        post: XHSPost to format
+
+    Returns:
+        New XHSPost with the same wording
+    """
+    title = " ".join(post.title.split())
+    return XHSPost(title=title, body=format_body(post.body))
@@ -0,0 +1,69 @@
+"""Deterministic hashtag fixes for 小紅書 posts (no LLM)."""
+
+from ...utils.hashtags import HASHTAG_LINE, extract_hashtags, normalize_tag
+from ..state import XHSPost
+from .xhs_post_scorer import HASHTAGS_OPTIMAL_MIN
+from .xhs_post_validators import HASHTAG_MAX, scan_text
+
+# Tags a post is filled up to when it has fewer than HASHTAGS_OPTIMAL_MIN
+HASHTAGS_TARGET = 5
+
+
+def fix_hashtags(post: XHSPost, suggest) -> tuple[XHSPost, dict]:
+    """
+    Fix a post's closing hashtag line without touching the rest of the text.
+
+    - Duplicate tags ("#AI" and "#ai", or a tag already used in the text)
+      are dropped from the closing line
+    - More than HASHTAG_MAX tags: the least relevant closing tags go
+    - Fewer than HASHTAGS_OPTIMAL_MIN: suggested tags are added, up to
+      HASHTAGS_TARGET (none if nothing scores high enough)
+
+    Tags inside sentences are never changed. Expects a post laid out by
+    format_post (hashtags collected on the last line).
+
+    Args:
+        post: XHSPost to fix
+        suggest: Ranking function, called as suggest(text, existing=...,
+            limit=...) or with min_score=0.0 to score every known tag, and
+            returning dicts with "tag" and "score", best first (e.g.
+            HashtagIndex.rank)
+
+    Returns:
+        Tuple of (fixed XHSPost, changes dict with added and removed tags)
+    """
+    lines = post.body.rstrip().split("\n")
+    closing = lines[-1] if lines and HASHTAG_LINE.fullmatch(lines[-1]) else ""
+    text = "\n".join(lines[:-1]).rstrip() if closing else post.body.rstrip()
+
+    inline = {normalize_tag(tag) for tag in scan_text(f"{post.title}\n{text}")["hashtags"]}
+    kept, removed, seen = [], [], set(inline)
+    for tag in extract_hashtags(closing):
+        key = normalize_tag(tag)
+        if key in seen:
+            removed.append(tag)
+        else:
+            seen.add(key)
+            kept.append(tag)
+
+    added = []
+    excess = len(inline) + len(kept) - HASHTAG_MAX
+    if excess > 0 and kept:
+        ranked = suggest(f"{post.title}\n{text}", existing=[], limit=None, min_score=0.0)
+        scores = {normalize_tag(s["tag"]): s["score"] for s in ranked}
+        # Least relevant first; later tags go first among equals
+        order = sorted(range(len(kept)), key=lambda i: (scores.get(normalize_tag(kept[i]), 0.0), -i))
+        drop = set(order[:excess])
+        removed += [tag for i, tag in enumerate(kept) if i in drop]
+        kept = [tag for i, tag in enumerate(kept) if i not in drop]
+    elif len(seen) < HASHTAGS_OPTIMAL_MIN:
+        ranked = suggest(f"{post.title}\n{text}", existing=list(seen), limit=HASHTAGS_TARGET - len(seen))
+        added = [s["tag"] for s in ranked]
+        kept += added
+
+    if not removed and not added:
+        return post, {"added": [], "removed": []}
+
+    tag_line = " ".join(f"#{tag}" for tag in kept)
+    body = f"{text}\n\n{tag_line}" if tag_line and text else (tag_line or text)
+    return XHSPost(title=post.title, body=body), {"added": added, "removed": removed}
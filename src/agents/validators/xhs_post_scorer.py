@@ -0,0 +1,79 @@
+"""Local quality score for 小紅書 posts (no LLM), used to rank candidate drafts."""
+
+import re
+from ...utils.hashtags import HASHTAG_LINE
+from ..state import XHSPost
+from .xhs_post_validators import (
+    validate_post,
+    TITLE_OPTIMAL_MIN,
+    TITLE_OPTIMAL_MAX,
+    BODY_OPTIMAL_MIN,
+    BODY_OPTIMAL_MAX,
+    BODY_MAX_LINE_WIDTH,
+)
+
+# Ideal counts for engagement
+HASHTAGS_OPTIMAL_MIN = 3
+HASHTAGS_OPTIMAL_MAX = 8
+EMOJIS_OPTIMAL_MIN = 3
+EMOJIS_OPTIMAL_MAX = 15
+
+# Titles that promise something concrete: numbers, questions, exclamations
+_TITLE_HOOK = re.compile(r"\d|[?？!！]")
+
+# Endings that invite interaction (question, call to comment/save/follow)
+_CALL_TO_ACTION = re.compile(r"[?？]|评论|留言|收藏|关注|点赞|分享|你们")
+
+
+def _range_score(value: int, low: int, high: int) -> float:
+    """1.0 inside [low, high], falling off linearly to 0.0 at half/double the range."""
+    if low <= value <= high:
+        return 1.0
+    if value < low:
+        return max(0.0, 1 - (low - value) / (low / 2 or 1))
+    return max(0.0, 1 - (value - high) / high)
+
+
+def score_post(post: XHSPost) -> dict:
+    """
+    Score a post from validation stats and layout heuristics.
+
+    Hard validation issues dominate (each costs more than every heuristic
+    combined), then length, hashtag and emoji counts, short mobile-friendly
+    lines, a hook in the title and an interactive ending.
+
+    Args:
+        post: XHSPost to score
+
+    Returns:
+        dict with:
+            - score: Higher is better (max 10.0 for a post with no issues)
+            - breakdown: Per-criterion scores
+            - validation: validate_post() result
+    """
+    validation = validate_post(post)
+    stats = validation["stats"]
+
+    body_lines = [line for line in post.body.splitlines() if line.strip()]
+    widths = [w for w, line in zip(stats["body_line_widths"], post.body.split("\n")) if line.strip()]
+    last_lines = "\n".join(line for line in body_lines[-3:] if not HASHTAG_LINE.fullmatch(line))
+
+    breakdown = {
+        "title_length": _range_score(stats["title_length"], TITLE_OPTIMAL_MIN, TITLE_OPTIMAL_MAX) * 1.5,
+        "body_length": _range_score(stats["body_length"], BODY_OPTIMAL_MIN, BODY_OPTIMAL_MAX) * 2.0,
+        "hashtags": _range_score(stats["hashtag_count"], HASHTAGS_OPTIMAL_MIN, HASHTAGS_OPTIMAL_MAX) * 1.5,
+        "emojis": _range_score(stats["emoji_count"], EMOJIS_OPTIMAL_MIN, EMOJIS_OPTIMAL_MAX) * 1.0,
+        "short_lines": (
+            sum(width <= BODY_MAX_LINE_WIDTH for width in widths) / len(widths) * 2.0
+            if widths else 0.0
+        ),
+        "title_hook": 1.0 if _TITLE_HOOK.search(post.title) else 0.0,
+        "call_to_action": 1.0 if _CALL_TO_ACTION.search(last_lines) else 0.0,
+        "issues": -20.0 * len(validation["issues"]),
+    }
+
+    return {
+        "score": round(sum(breakdown.values()), 3),
+        "breakdown": {k: round(v, 3) for k, v in breakdown.items()},
+        "validation": validation,
+    }
@@ -1,5 +1,11 @@
 """小紅書 post validation utilities."""
 
+import operator
+import os
+import re
+from collections import Counter, OrderedDict, deque
+from itertools import chain, compress
+from ...utils.hashtags import HASHTAG, HASHTAG_LINE, TAG_END
 from ..state import XHSPost
 
 # Platform limits
@@ -13,6 +19,227 @@ BODY_OPTIMAL_MIN = 500
 BODY_OPTIMAL_MAX = 2000
 BODY_MAX_CHARS_PER_LINE = 20
 
+# Line width in display columns (CJK, full-width punctuation and emojis take 2)
+BODY_MAX_LINE_WIDTH = BODY_MAX_CHARS_PER_LINE * 2
+
+EMOJI_MAX = 20
+HASHTAG_MAX = 10
+
+# Checks about layout and size rather than wording; a draft failing only
+# these can be fixed without a content critique
+MECHANICAL_CHECKS = frozenset({"title_length", "body_length", "hashtags", "line_width"})
+
+# Repeated clauses at least this long (ignoring spaces and punctuation) are
+# reported; clauses end at sentence stops, commas and colons
+DUPLICATE_MIN_CHARS = 6
+
+# --- Line scanner ------------------------------------------------------------
+# Widths, emoji counts and clauses never span a newline, so they are
+# measured per line and cached: the drafts of one run (candidates, critic
+# revisions, the formatted post) share most of their lines. Lines not in
+# the cache are measured together, with a few whole-text substitutions
+# that run inside the regex engine instead of a Python loop per token.
+# Whole-post scans are cached too, since each draft is validated several
+# times (convergence check, critic, formatting, scorer).
+
+# Lines and posts kept in the caches (least recently used ones go first)
+VALIDATOR_LINE_CACHE_SIZE = int(os.environ.get("VALIDATOR_LINE_CACHE_SIZE", 20000))
+VALIDATOR_POST_CACHE_SIZE = int(os.environ.get("VALIDATOR_POST_CACHE_SIZE", 2000))
+
+# Pictographs (skin tone modifiers excluded: they only modify the emoji before them)
+_EMOJI_ASTRAL = r"\U0001F000-\U0001F1E5\U0001F200-\U0001F3FA\U0001F400-\U0001FAFF"
+# BMP symbols shown as emojis by default (Emoji_Presentation), e.g. ✅ ⭐ ⚡;
+# other symbols such as ★ and ✓ stay text
+_EMOJI_BMP = (
+    r"\u231A\u231B\u23E9-\u23EC\u23F0\u23F3\u25FD\u25FE\u2614\u2615\u2648-\u2653"
+    r"\u267F\u2693\u26A1\u26AA\u26AB\u26BD\u26BE\u26C4\u26C5\u26CE\u26D4\u26EA"
+    r"\u26F2\u26F3\u26F5\u26FA\u26FD\u2705\u270A\u270B\u2728\u274C\u274E"
+    r"\u2753-\u2755\u2757\u2795-\u2797\u27B0\u27BF\u2B1B\u2B1C\u2B50\u2B55"
+)
+# Text symbols that are emojis only when followed by VS16 (❤️ ☀️ ‼️ ©️)
+_EMOJI_TEXT = r"\u00A9\u00AE\u203C-\u3299"
+# VS16 and skin tone modifiers belong to the preceding emoji
+_EMOJI_MODIFIERS = r"[\uFE0F\U0001F3FB-\U0001F3FF]*"
+_EMOJI_ATOM = rf"(?:[{_EMOJI_ASTRAL}{_EMOJI_BMP}]|[{_EMOJI_TEXT}](?=\uFE0F)){_EMOJI_MODIFIERS}"
+# One grapheme cluster: keycap, flag (regional indicator pair), subdivision
+# flag (tag sequence), or atoms joined by ZWJ. The pattern starts with a
+# plain character set so the regex engine skips other characters in C; the
+# lookbehinds then pick the branch for the character matched.
+_EMOJI = re.compile(
+    rf"[0-9#*\U0001F1E6-\U0001F1FF{_EMOJI_ASTRAL}{_EMOJI_BMP}{_EMOJI_TEXT}]"
+    r"(?:(?<=[0-9#*])\uFE0F?\u20E3"
+    r"|(?<=[\U0001F1E6-\U0001F1FF])[\U0001F1E6-\U0001F1FF]"
+    r"|(?<=\U0001F3F4)[\U000E0020-\U000E007F]+"
+    rf"|(?<=[{_EMOJI_ASTRAL}{_EMOJI_BMP}]){_EMOJI_MODIFIERS}(?:\u200D{_EMOJI_ATOM})*"
+    rf"|(?<=[{_EMOJI_TEXT}])\uFE0F{_EMOJI_MODIFIERS}(?:\u200D{_EMOJI_ATOM})*)"
+)
+
+# East Asian wide/full-width characters: CJK, kana, hangul, full-width forms
+_WIDE = (
+    r"\u1100-\u115F\u2E80-\u303E\u3041-\u33FF\u3400-\u4DBF\u4E00-\u9FFF"
+    r"\uA000-\uA4CF\uAC00-\uD7A3\uF900-\uFAFF\uFE30-\uFE4F"
+    r"\uFF00-\uFF60\uFFE0-\uFFE6\U00020000-\U0003FFFD"
+)
+_WIDE_RUN = re.compile(f"[{_WIDE}]+")
+
+# A mention starts the text or follows whitespace or punctuation (not a@b.com)
+_MENTION = re.compile(rf"@(?<![^{TAG_END}]@)([^{TAG_END}]+)")
+
+# Duplicate detection: drop everything but words and clause stops, then split
+_CLAUSE_NOISE = re.compile(r"[^\w\n。！？；!?;，,、：:]+")
+# (a run ending in a comma or colon before a digit, as in 1,000 or 10:30,
+# doesn't split; checked once per run so the scan stays a character class)
+_CLAUSE_STOPS = re.compile(r"[。！？；!?;，,、：:]+(?<![,:](?=\d))")
+_CLAUSE_SEP = "\x1f"
+
+# line -> (display width, emoji count, full-width characters, clauses
+# without spaces, punctuation and emojis, separated by _CLAUSE_SEP)
+_LineStats = tuple[int, int, int, str]
+_line_cache: OrderedDict[str, _LineStats] = OrderedDict()
+# post text -> _scan() result
+_post_cache: OrderedDict[str, dict] = OrderedDict()
+
+
+def _lookup(cache: OrderedDict, keys: list[str]) -> list:
+    """Cached value of each key (None if missing), marking the ones found as recently used."""
+    values = list(map(cache.get, keys))
+    # Cached values are never empty, so compress() keeps the keys found
+    deque(map(cache.move_to_end, compress(keys, values)), maxlen=0)
+    return values
+
+
+def _remember(cache: OrderedDict, entries: dict, size: int) -> None:
+    """Add entries to a cache, dropping the least recently used ones past size."""
+    cache.update(entries)
+    while len(cache) > size:
+        cache.popitem(last=False)
+
+
+def _measure_lines(lines: list[str]) -> dict[str, _LineStats]:
+    """Measure lines (without newlines) in one pass per pattern over all of them."""
+    # NUL marks emoji columns below, so a NUL in the text counts as a space
+    text = "\n".join(lines).replace("\0", " ")
+    # Each emoji becomes two NULs; dropping wide characters from that leaves
+    # the narrow columns, and width = marked length + wide characters
+    marked = _EMOJI.sub("\0\0", text)
+    marked_lines = marked.split("\n")
+    columns = list(map(len, marked_lines))
+    wide = list(map(operator.sub, columns, map(len, _WIDE_RUN.sub("", marked).split("\n"))))
+    clauses = _CLAUSE_STOPS.sub(_CLAUSE_SEP, _CLAUSE_NOISE.sub("", text)).split("\n")
+    return dict(zip(lines, zip(
+        map(operator.add, columns, wide),
+        [line.count("\0") // 2 for line in marked_lines],
+        wide,
+        clauses,
+    )))
+
+
+def _line_stats(lines: list[str]) -> list[_LineStats]:
+    """Cached measurements of each line, measuring the missing ones together."""
+    stats = _lookup(_line_cache, lines)
+    if None not in stats:
+        return stats
+    measured = _measure_lines(list(dict.fromkeys(line for line, s in zip(lines, stats) if s is None)))
+    _remember(_line_cache, measured, VALIDATOR_LINE_CACHE_SIZE)
+    return [s or measured[line] for line, s in zip(lines, stats)]
+
+
+def line_widths(lines: list[str]) -> list[int]:
+    """
+    Display width of each line, as checked by validate_post.
+
+    CJK and full-width characters and emoji clusters take 2 columns,
+    everything else 1.
+
+    Args:
+        lines: Lines without newlines
+
+    Returns:
+        Width of every line in columns
+    """
+    return [stats[0] for stats in _line_stats(lines)]
+
+
+def _repeated(clauses: tuple[str, ...], min_chars: int) -> list[str]:
+    """Clauses (each line's, separated by _CLAUSE_SEP) found more than once."""
+    parts = list(filter(None, _CLAUSE_SEP.join(clauses).split(_CLAUSE_SEP)))
+    if len(set(parts)) == len(parts):
+        return []
+    counts = Counter(parts)
+    return [clause for clause, count in counts.items() if count > 1 and len(clause) >= min_chars]
+
+
+def find_duplicate_phrases(text: str, min_chars: int = DUPLICATE_MIN_CHARS) -> list[str]:
+    """
+    Clauses that appear more than once, ignoring spaces, punctuation and emojis.
+
+    Args:
+        text: Text to check
+        min_chars: Shorter clauses are ignored
+
+    Returns:
+        Repeated clauses in order of first appearance
+    """
+    return _repeated(tuple(line[3] for line in _line_stats(text.split("\n"))), min_chars)
+
+
+def _scan(text: str, stats: list[_LineStats]) -> dict:
+    """scan_text() result from a text's line measurements, with tuples instead of lists."""
+    widths, emojis, wide, clauses = zip(*stats)
+    return {
+        "emoji_count": sum(emojis),
+        "hashtags": tuple(dict.fromkeys(HASHTAG.findall(text))),
+        "mentions": tuple(dict.fromkeys(_MENTION.findall(text))),
+        "full_width_chars": sum(wide),
+        "line_widths": widths,
+        "duplicate_phrases": tuple(_repeated(clauses, DUPLICATE_MIN_CHARS)),
+    }
+
+
+def _scan_texts(texts: list[str]) -> list[dict]:
+    """Cached _scan() of each text; lines of the texts not cached yet are measured together."""
+    scans = _lookup(_post_cache, texts)
+    if None not in scans:
+        return scans
+    missing = list(dict.fromkeys(text for text, scan in zip(texts, scans) if scan is None))
+    lines = [text.split("\n") for text in missing]
+    stats = _line_stats(list(chain.from_iterable(lines)))
+
+    scanned = {}
+    start = 0
+    for text, text_lines in zip(missing, lines):
+        end = start + len(text_lines)
+        scanned[text] = _scan(text, stats[start:end])
+        start = end
+    _remember(_post_cache, scanned, VALIDATOR_POST_CACHE_SIZE)
+    return [scan or scanned[text] for text, scan in zip(texts, scans)]
+
+
+def scan_text(text: str) -> dict:
+    """
+    Measure text: emojis, hashtags, mentions, line widths and repeated clauses.
+
+    Emojis are counted per grapheme cluster, so a ZWJ sequence (👨‍👩‍👧),
+    a flag (🇨🇳), a keycap (1️⃣) or an emoji with a skin tone counts once.
+    Line widths are display columns: CJK and full-width characters and
+    emojis count 2, everything else 1.
+
+    Args:
+        text: Text to scan
+
+    Returns:
+        dict with:
+            - emoji_count: Number of emoji grapheme clusters
+            - hashtags: Unique hashtags in order of appearance (without "#")
+            - mentions: Unique @mentions in order of appearance (without "@")
+            - full_width_chars: Number of CJK/full-width characters
+            - line_widths: Display width of every line
+            - duplicate_phrases: See find_duplicate_phrases
+    """
+    scan = _scan_texts([text])[0]
+    return {key: list(value) if isinstance(value, tuple) else value for key, value in scan.items()}
+
+
 def validate_post(post: XHSPost) -> dict:
     """
     Validate if a post meets 小紅書 guidelines.
@@ -25,10 +252,27 @@ def validate_post(post: XHSPost) -> dict:
             - valid: bool
             - issues: list of validation issues
             - suggestions: list of improvements
-            - stats: character counts and other metrics
+            - checks: the same issues and suggestions as dicts with
+              check (e.g. "title_length"), severity ("issue"/"suggestion")
+              and message
+            - stats: character counts and other metrics (see scan_text)
     """
+    return _validate(post, _scan_texts([f"{post.title}\n{post.body}"])[0])
+
+
+def _validate(post: XHSPost, scan: dict) -> dict:
+    """validate_post() for a post already scanned (see _scan; title on line 0, then the body)."""
     issues = []
     suggestions = []
+    checks = []
+
+    def issue(check: str, message: str) -> None:
+        issues.append(message)
+        checks.append({"check": check, "severity": "issue", "message": message})
+
+    def suggest(check: str, message: str) -> None:
+        suggestions.append(message)
+        checks.append({"check": check, "severity": "suggestion", "message": message})
 
     # Get title and body from post object
     title = post.title
@@ -40,66 +284,165 @@ def validate_post(post: XHSPost) -> dict:
 
     # Check title length
     if title_len > TITLE_MAX_CHARS:
-        issues.append(f"Title too long: {title_len}/{TITLE_MAX_CHARS} characters")
-        suggestions.append(f"Shorten title by {title_len - TITLE_MAX_CHARS} characters")
+        issue("title_length", f"Title too long: {title_len}/{TITLE_MAX_CHARS} characters")
+        suggest("title_length", f"Shorten title by {title_len - TITLE_MAX_CHARS} characters")
     elif title_len < TITLE_OPTIMAL_MIN:
-        suggestions.append(f"Title is short ({title_len} chars). Consider {TITLE_OPTIMAL_MIN}-{TITLE_OPTIMAL_MAX} chars for better engagement")
+        suggest("title_length", f"Title is short ({title_len} chars). Consider {TITLE_OPTIMAL_MIN}-{TITLE_OPTIMAL_MAX} chars for better engagement")
     elif title_len > TITLE_OPTIMAL_MAX:
-        suggestions.append(f"Title is long ({title_len} chars). Consider {TITLE_OPTIMAL_MIN}-{TITLE_OPTIMAL_MAX} chars for better engagement")
+        suggest("title_length", f"Title is long ({title_len} chars). Consider {TITLE_OPTIMAL_MIN}-{TITLE_OPTIMAL_MAX} chars for better engagement")
 
     # Check body length
     if body_len > BODY_MAX_CHARS:
-        issues.append(f"Body too long: {body_len}/{BODY_MAX_CHARS} characters")
-        suggestions.append(f"Reduce body by {body_len - BODY_MAX_CHARS} characters")
+        issue("body_length", f"Body too long: {body_len}/{BODY_MAX_CHARS} characters")
+        suggest("body_length", f"Reduce body by {body_len - BODY_MAX_CHARS} characters")
     elif body_len < BODY_OPTIMAL_MIN:
-        suggestions.append(f"Body is short ({body_len} chars). Consider {BODY_OPTIMAL_MIN}-{BODY_OPTIMAL_MAX} chars for better engagement")
+        suggest("body_length", f"Body is short ({body_len} chars). Consider {BODY_OPTIMAL_MIN}-{BODY_OPTIMAL_MAX} chars for better engagement")
     elif body_len > BODY_OPTIMAL_MAX:
-        suggestions.append(f"Body is long ({body_len} chars). Consider {BODY_OPTIMAL_MIN}-{BODY_OPTIMAL_MAX} chars for mobile reading")
+        suggest("body_length", f"Body is long ({body_len} chars). Consider {BODY_OPTIMAL_MIN}-{BODY_OPTIMAL_MAX} chars for mobile reading")
+
+    hashtags = list(scan["hashtags"])
+    emoji_count = scan["emoji_count"]
 
     # Check for hashtags
-    full_post = f"{title}\n{body}"
-    if '#' not in full_post:
-        suggestions.append("Add hashtags for better discoverability")
+    if not hashtags:
+        suggest("hashtags", "Add hashtags for better discoverability")
+    elif len(hashtags) > HASHTAG_MAX:
+        suggest("hashtags", f"Too many hashtags ({len(hashtags)}). Keep the {HASHTAG_MAX} most relevant")
 
-    # Count emojis (rough check)
-    emoji_count = sum(1 for char in full_post if ord(char) > 0x1F300)
+    # Check emojis
     if emoji_count == 0:
-        suggestions.append("Add emojis for better engagement")
-    elif emoji_count > 20:
-        suggestions.append(f"Too many emojis ({emoji_count}). Use them sparingly")
+        suggest("emojis", "Add emojis for better engagement")
+    elif emoji_count > EMOJI_MAX:
+        suggest("emojis", f"Too many emojis ({emoji_count}). Use them sparingly")
+
+    # Check body line widths (hashtag-only lines may wrap)
+    body_widths = list(scan["line_widths"][1:])
+    long_lines = [i + 1 for i, width in enumerate(body_widths) if width > BODY_MAX_LINE_WIDTH]
+    if long_lines:
+        body_lines = body.split("\n")
+        long_lines = [i for i in long_lines if not HASHTAG_LINE.fullmatch(body_lines[i - 1])]
+    if long_lines:
+        suggest(
+            "line_width",
+            f"Body lines wider than {BODY_MAX_CHARS_PER_LINE} Chinese characters: "
+            f"{', '.join(map(str, long_lines[:5]))}{', ...' if len(long_lines) > 5 else ''}. "
+            "Break them up for mobile reading"
+        )
+
+    # Check repeated phrases
+    duplicates = list(scan["duplicate_phrases"])
+    if duplicates:
+        suggest(
+            "duplicate_phrases",
+            f"Repeated phrases: {'; '.join(duplicates[:3])}{'; ...' if len(duplicates) > 3 else ''}. Vary the wording"
+        )
 
     return {
         "valid": len(issues) == 0,
         "issues": issues,
         "suggestions": suggestions,
+        "checks": checks,
         "stats": {
             "title_length": title_len,
             "body_length": body_len,
             "total_length": total_len,
             "emoji_count": emoji_count,
-            "has_hashtags": '#' in post
+            "has_hashtags": bool(hashtags),
+            "hashtags": hashtags,
+            "hashtag_count": len(hashtags),
+            "mentions": list(scan["mentions"]),
+            "full_width_chars": scan["full_width_chars"],
+            "title_width": scan["line_widths"][0],
+            "body_line_widths": body_widths,
+            "max_line_width": max(body_widths, default=0),
+            "long_lines": long_lines,
+            "duplicate_phrases": duplicates,
         }
     }
 
 
+def validate_posts(posts: list[XHSPost]) -> list[dict]:
+    """
+    Validate many posts, e.g. every candidate draft of a run.
+
+    Lines not seen before are measured together for the whole batch, so
+    lines shared between drafts are measured once. Identical posts (same
+    title and body) are validated once and share one result dict.
+
+    Args:
+        posts: XHSPost objects
+
+    Returns:
+        validate_post() result for each post, in order
+    """
+    unique = {(post.title, post.body): post for post in posts}
+    scans = _scan_texts([f"{title}\n{body}" for title, body in unique])
+    results = {key: _validate(post, scan) for (key, post), scan in zip(unique.items(), scans)}
+    return [results[(post.title, post.body)] for post in posts]
+
+
+def is_mechanical_only(validation_results: dict) -> bool:
+    """
+    Whether a post fails only mechanical checks (see MECHANICAL_CHECKS).
+
+    Args:
+        validation_results: Validation dict from validate_post()
+
+    Returns:
+        True if at least one check failed and all failed checks are mechanical
+    """
+    checks = validation_results['checks']
+    return bool(checks) and all(c['check'] in MECHANICAL_CHECKS for c in checks)
+
+
+def without_checks(validation_results: dict, checks: set[str]) -> dict:
+    """
+    Validation results with some checks left out, e.g. ones fixed later by formatting.
+
+    Args:
+        validation_results: Validation dict from validate_post()
+        checks: Names of the checks to drop (e.g. {"hashtags"})
+
+    Returns:
+        New validation dict (stats are shared with the original)
+    """
+    kept = [c for c in validation_results['checks'] if c['check'] not in checks]
+    issues = [c['message'] for c in kept if c['severity'] == "issue"]
+    return {
+        **validation_results,
+        "valid": not issues,
+        "issues": issues,
+        "suggestions": [c['message'] for c in kept if c['severity'] == "suggestion"],
+        "checks": kept,
+    }
+
+
 def format_validation_feedback(validation_results: dict) -> str:
     """
     Format validation results into feedback string for critique message.
 
+    Each line is tagged with the failed check, e.g. "- [line_width] ...".
+
     Args:
         validation_results: Validation dict from validate_post()
 
     Returns:
         Formatted validation feedback string (empty if no issues/suggestions)
     """
+    def lines(severity: str) -> str:
+        return "\n".join(
+            f"- [{c['check']}] {c['message']}"
+            for c in validation_results['checks'] if c['severity'] == severity
+        )
+
     feedback = ""
 
     if validation_results['issues']:
         feedback += "\n\nValidation Issues:\n"
-        feedback += "\n".join(f"- {issue}" for issue in validation_results['issues'])
+        feedback += lines("issue")
 
     if validation_results['suggestions']:
         feedback += "\n\nSuggestions:\n"
-        feedback += "\n".join(f"- {sug}" for sug in validation_results['suggestions'])
+        feedback += lines("suggestion")
 
     return feedback
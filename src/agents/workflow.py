@@ -1,44 +1,93 @@
 """LangGraph workflow for 小紅書 content generation."""
 
-from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
+import asyncio
+import logging
+from langgraph.graph import StateGraph, START, END
+from .checkpointers import get_checkpointer
 from .state import WorkflowState
-from .nodes import analyze_node, generator_node, critic_node, formatting_node, should_continue
+from .nodes import (
+    analyze_node,
+    compact_history_node,
+    generator_node,
+    critic_node,
+    local_formatting_node,
+    formatting_node,
+    variety_check_node,
+    route_entry,
+    should_continue,
+    after_critic,
+    needs_llm_formatting,
+)
 
+# Configure logger
+logger = logging.getLogger(__name__)
 
-# Create in-memory checkpointer (simple and synchronous)
-checkpointer = MemorySaver()
 
+# Process-wide registry of compiled graphs, keyed by (variant, id(checkpointer)).
+# A checkpointer of None stands for the configured process-wide checkpointer.
+# Values keep a reference to the checkpointer so its id cannot be reused.
+_compiled_workflows: dict[tuple[str, int], tuple[object, object]] = {}
+_registry_lock = asyncio.Lock()
 
-def get_workflow():
+
+def build_default_workflow() -> StateGraph:
     """
-    Create the 小紅書 content generation workflow with checkpointing.
+    Build the default 小紅書 content generation graph (uncompiled).
 
     Flow:
-      analyze → generator → should_continue?
-                       ├─ yes → critic → generator (content improvement)
-                       └─ no  → formatting → END (auto-fix format)
+      START → route_entry? (refinement of an analyzed thread skips analyze)
+      analyze → compact → generator → should_continue?
+                                 ├─ yes → critic → after_critic?
+                                 │                 ├─ improve  → compact → generator (content improvement)
+                                 │                 └─ approved → local_formatting
+                                 └─ no  → local_formatting → needs_llm_formatting?
+                                                        ├─ yes → formatting → variety_check → END
+                                                        └─ no  → variety_check → END
+
+    The analyze node works on size-bounded digests of long sources
+    (SOURCE_ANALYZE_MAX_CHARS / SOURCE_GENERATOR_MAX_CHARS). The compact node
+    keeps the history sent to the generator within HISTORY_TOKEN_BUDGET
+    (a no-op for short conversations).
+
+    The loop can stop before max_iterations: when consecutive drafts are
+    nearly identical, the critic reports no major issues, or the run's
+    time/token budget is spent (see agents/convergence.py).
+
+    Local formatting fixes layout deterministically. The LLM formatting node
+    only runs when validation still reports hard issues (character limits)
+    and fixes them without changing content.
 
-    The formatting node validates and auto-fixes platform requirements
-    (character limits, structure) without changing content.
+    The variety check looks the final post up in the local near-duplicate
+    index (src/utils/post_index.py) and flags or rejects it (VARIETY_CHECK).
 
     Returns:
-        Compiled LangGraph workflow with checkpointer
+        StateGraph ready to be compiled
     """
     # Create graph with state schema
     workflow = StateGraph(WorkflowState)
 
     # Add nodes
     workflow.add_node("analyze", analyze_node)
+    workflow.add_node("compact", compact_history_node)
     workflow.add_node("generator", generator_node)
     workflow.add_node("critic", critic_node)
+    workflow.add_node("local_formatting", local_formatting_node)
     workflow.add_node("formatting", formatting_node)
+    workflow.add_node("variety_check", variety_check_node)
 
-    # Set entry point to analyze
-    workflow.set_entry_point("analyze")
+    # Entry: analyze new content, go straight to the generator on refinement
+    workflow.add_conditional_edges(
+        START,
+        route_entry,
+        {
+            "analyze": "analyze",
+            "compact": "compact",
+        }
+    )
 
-    # Add edge from analyze to generator
-    workflow.add_edge("analyze", "generator")
+    # Add edge from analyze to generator (through history compaction)
+    workflow.add_edge("analyze", "compact")
+    workflow.add_edge("compact", "generator")
 
     # Add conditional edges from generator
     workflow.add_conditional_edges(
@@ -46,16 +95,118 @@ def get_workflow():
         should_continue,
         {
             "critic": "critic",      # Continue to critic for content improvement
-            "end": "formatting",     # Go to formatting for final cleanup
+            "end": "local_formatting",  # Go to formatting for final cleanup
+        }
+    )
+
+    # Add edge from critic back to generator (for improvement), unless the
+    # critic approved the draft
+    workflow.add_conditional_edges(
+        "critic",
+        after_critic,
+        {
+            "compact": "compact",
+            "end": "local_formatting",
         }
     )
 
-    # Add edge from critic back to generator (for improvement)
-    workflow.add_edge("critic", "generator")
+    # LLM formatting only when local formatting can't fix the post
+    workflow.add_conditional_edges(
+        "local_formatting",
+        needs_llm_formatting,
+        {
+            "formatting": "formatting",
+            "end": "variety_check",
+        }
+    )
+
+    # Every final post goes through the near-duplicate check
+    workflow.add_edge("formatting", "variety_check")
+    workflow.add_edge("variety_check", END)
+
+    return workflow
 
-    # Add edge from formatting to END
-    workflow.add_edge("formatting", END)
+
+# Graph builders by workflow variant
+WORKFLOW_BUILDERS = {
+    "default": build_default_workflow,
+}
+
+
+def build_workflow(variant: str = "default", checkpointer=None):
+    """
+    Build and compile a workflow variant without touching the registry.
+
+    Args:
+        variant: Name of the graph builder in WORKFLOW_BUILDERS
+        checkpointer: Checkpointer to compile with
+
+    Returns:
+        Compiled LangGraph workflow with checkpointer
+    """
+    if variant not in WORKFLOW_BUILDERS:
+        raise ValueError(f"Unknown workflow variant: {variant}")
 
     # Compile with checkpointer
     # Will save state with thread_id for continuation
-    return workflow.compile(checkpointer=checkpointer)
+    return WORKFLOW_BUILDERS[variant]().compile(checkpointer=checkpointer)
+
+
+async def get_workflow(variant: str = "default", checkpointer=None):
+    """
+    Get the compiled 小紅書 content generation workflow with checkpointing.
+
+    The graph is built and compiled lazily on first use and then reused by
+    every caller in the process. Concurrent callers wait on a lock so the
+    graph is only compiled once per (variant, checkpointer).
+
+    Args:
+        variant: Name of the graph builder in WORKFLOW_BUILDERS
+        checkpointer: Checkpointer to compile with (defaults to get_checkpointer())
+
+    Returns:
+        Compiled LangGraph workflow with checkpointer
+    """
+    key = (variant, id(checkpointer))
+
+    # Fast path: already compiled
+    entry = _compiled_workflows.get(key)
+    if entry is not None:
+        return entry[0]
+
+    async with _registry_lock:
+        # Another caller may have compiled it while we were waiting
+        entry = _compiled_workflows.get(key)
+        if entry is None:
+            logger.info(f"🧩 Compiling workflow '{variant}'")
+            saver = checkpointer or await get_checkpointer()
+            entry = (build_workflow(variant, saver), checkpointer)
+            _compiled_workflows[key] = entry
+
+    return entry[0]
+
+
+def register_workflow(graph, variant: str = "default", checkpointer=None):
+    """
+    Swap in a compiled graph at runtime.
+
+    Requests already running keep the graph they started with; new calls
+    to get_workflow() receive the registered one.
+
+    Args:
+        graph: Compiled LangGraph workflow
+        variant: Variant name to register the graph under
+        checkpointer: Checkpointer the graph was compiled with (None for
+            the configured process-wide one)
+
+    Returns:
+        The previously registered graph, or None
+    """
+    previous = _compiled_workflows.get((variant, id(checkpointer)))
+    _compiled_workflows[(variant, id(checkpointer))] = (graph, checkpointer)
+    return previous[0] if previous else None
+
+
+def clear_workflows() -> None:
+    """Drop all compiled graphs so the next get_workflow() call rebuilds them."""
+    _compiled_workflows.clear()
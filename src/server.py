@@ -1,53 +1,364 @@
 """MCP Server for 小紅書 Content Generator."""
 
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
 from pydantic import BaseModel
-from mcp.server.fastmcp import FastMCP
-from .tools import generate_xhs_post, refinement_xhs_post
+from mcp.server.fastmcp import FastMCP, Context
+from .utils.cache import get_response_cache
+from .utils.metrics import get_metrics
+
+# The workflow stack (langchain, langgraph, provider SDKs) is imported on
+# first use so the server answers `initialize` quickly. Set WARMUP_ON_START
+# to load it and build the LLM client in the background right after startup.
+WARMUP_ON_START = os.environ.get("WARMUP_ON_START", "false").lower() == "true"
+
+# Interrupted jobs resume from their last checkpoint only if checkpoints
+# outlive the process (see src/agents/checkpointers.py); otherwise they start over
+JOBS_RESUMABLE = os.environ.get("CHECKPOINT_BACKEND", "memory").lower() == "sqlite"
+
+# Configure logger
+logger = logging.getLogger(__name__)
 
 
 class PostResponse(BaseModel):
     """Response model for post generation."""
     thread_id: str
     final_post: str
+    metadata: dict = {}
+
+
+class BatchItemResponse(BaseModel):
+    """Result for one source of a batch."""
+    index: int
+    source: str
+    status: str
+    duration_ms: float
+    thread_id: str | None = None
+    final_post: str | None = None
+    metadata: dict = {}
+    error: str | None = None
+
+
+class BatchResponse(BaseModel):
+    """Response model for batch generation (results in completion order)."""
+    results: list[BatchItemResponse]
+    succeeded: int
+    failed: int
+    duration_ms: float
+
+
+class SyncItemResponse(BatchItemResponse):
+    """Result for one source of a sync pass."""
+    change_ratio: float | None = None
+    lost_thread_id: str | None = None
+
+
+class SyncResponse(BaseModel):
+    """Response model for source sync (results in input order)."""
+    results: list[SyncItemResponse]
+    unchanged: int
+    updated: int
+    generated: int
+    failed: int
+    passes: int = 1
+    duration_ms: float
+
+
+class SimilarPost(BaseModel):
+    """An earlier post similar to the query."""
+    thread_id: str
+    title: str
+    similarity: float
+    created_at: float
+
+
+class SimilarPostsResponse(BaseModel):
+    """Response model for near-duplicate lookups (most similar first)."""
+    matches: list[SimilarPost]
+    candidates: int
+    duration_ms: float
+
+
+class HashtagSuggestion(BaseModel):
+    """A suggested hashtag (without "#")."""
+    tag: str
+    score: float
+    posts: int
+
+
+class HashtagsResponse(BaseModel):
+    """Response model for hashtag suggestions (best first)."""
+    suggestions: list[HashtagSuggestion]
+    related: dict[str, list[dict]] = {}
+    index: dict = {}
+    duration_ms: float
+
+
+class SourceResponse(BaseModel):
+    """Extracted text of one document or web page."""
+    source: str
+    status: str = "ok"
+    title: str = ""
+    content: str = ""
+    metadata: dict = {}
+    error: str | None = None
+
+
+class SourcesResponse(BaseModel):
+    """Extracted texts of many web pages, in input order."""
+    results: list[SourceResponse]
+    succeeded: int
+    failed: int
+    duration_ms: float
+
+
+class JobResponse(BaseModel):
+    """State of one queued generation job."""
+    job_id: str
+    status: str
+    thread_id: str
+    source: str | None = None
+    attempts: int = 0
+    error: str | None = None
+    created_at: float | None = None
+    started_at: float | None = None
+    finished_at: float | None = None
+
+
+class JobSubmitResponse(BaseModel):
+    """Jobs created by one submit call, in submission order."""
+    jobs: list[JobResponse]
+
+
+class JobResultResponse(JobResponse):
+    """A job plus its post once it has succeeded."""
+    final_post: str | None = None
+    metadata: dict = {}
+
+
+# Import of the workflow stack, started by the first tool call or the warm-up
+_tools_import: asyncio.Future | None = None
+
+
+def _import_tools() -> None:
+    """Import the workflow stack and build the LLM client (runs in a worker thread)."""
+    from . import tools  # noqa: F401
+    from .utils.llm import get_llm_pool
+
+    get_llm_pool()
+
+
+async def _load_tools():
+    """
+    Get the tools package, importing it off the event loop on first use.
+
+    Concurrent first calls share one import; a failed import is retried on
+    the next call.
+    """
+    global _tools_import
+    if _tools_import is None:
+        _tools_import = asyncio.ensure_future(asyncio.to_thread(_import_tools))
+    try:
+        await _tools_import
+    except Exception:
+        _tools_import = None
+        raise
+    from . import tools
+
+    return tools
+
+
+async def warm_up() -> None:
+    """Load heavy modules, the LLM client, the checkpointer and the compiled workflow."""
+    start = time.perf_counter()
+    try:
+        await _load_tools()
+        from .agents import get_workflow
+
+        await get_workflow()
+        logger.info(f"🔥 Warm-up finished in {(time.perf_counter() - start) * 1000:.0f}ms")
+    except Exception as e:
+        logger.warning(f"⚠️ Warm-up failed (will retry on first tool call): {e}")
+
+
+async def _run_job(job: dict) -> dict:
+    """Job queue runner: generate (or resume) one queued post."""
+    tools = await _load_tools()
+    return await tools.run_xhs_post_job(job)
+
+
+def _job_queue():
+    """The job queue, without starting workers in this process."""
+    from .utils.jobs import get_job_queue
+
+    return get_job_queue()
+
+
+async def _start_job_workers():
+    """
+    Get the job queue with its worker pool running.
+
+    Workers start with the first job submitted (or waited on) in this
+    process rather than in every session, since all sessions share the queue
+    database; they also pick up jobs whose lease expired after a crash.
+    """
+    queue = _job_queue()
+    await queue.start(_run_job, resumable=JOBS_RESUMABLE)
+    return queue
+
+
+@asynccontextmanager
+async def lifespan(server: FastMCP):
+    """
+    Optionally warm up in the background; stop any job workers and close the
+    post index, checkpoint storage, HTTP pools and parser processes on
+    shutdown.
+    """
+    warm_up_task = asyncio.create_task(warm_up()) if WARMUP_ON_START else None
+    try:
+        yield
+    finally:
+        if warm_up_task is not None:
+            warm_up_task.cancel()
+        # Jobs running here are requeued and resumed by the next queue to claim them
+        from .utils.jobs import close_job_queue
+
+        await close_job_queue()
+        if f"{__package__}.utils.post_index" in sys.modules:
+            from .utils.post_index import close_post_index
+
+            await close_post_index()
+        # Nothing to close if no tool ever loaded the workflow stack
+        if f"{__package__}.agents.checkpointers" in sys.modules:
+            from .agents.checkpointers import close_checkpointer
+            from .agents.workflow import clear_workflows
+
+            await close_checkpointer()
+            clear_workflows()
+        if f"{__package__}.tools" in sys.modules:
+            from .tools.extract import shutdown_process_pool
+            from .tools.web import close_web_client
+
+            await close_web_client()
+            shutdown_process_pool()
+
+        from .utils.llm import close_http_client
+
+        await close_http_client()
+
+
+def _directory_files(directory: str | None) -> list[Path]:
+    """Regular, non-hidden files of a directory sorted by name (none without a directory)."""
+    if not directory:
+        return []
+    return [p for p in sorted(Path(directory).iterdir()) if p.is_file() and not p.name.startswith(".")]
+
+
+def _progress_reporter(ctx: Context):
+    """
+    Forward workflow progress events (incl. drafts) as MCP progress notifications.
+
+    Partial drafts streamed by the generator are sent as a JSON PostResponse
+    with metadata.partial = true; their progress value lies between the
+    surrounding steps so it keeps increasing.
+    """
+    partials = 0
+
+    async def on_progress(event: dict):
+        nonlocal partials
+        if event.get("partial"):
+            partials += 1
+            draft = event["draft"]
+            update = PostResponse(
+                thread_id=event["thread_id"],
+                final_post=f"{draft.title}\n\n{draft.body}",
+                metadata={
+                    "partial": True,
+                    "iteration": event["iteration"],
+                    "title_complete": event["title_complete"],
+                    "elapsed_ms": event["elapsed_ms"],
+                },
+            )
+            await ctx.report_progress(event["step"] + partials / (partials + 1), message=update.model_dump_json())
+            return
+
+        partials = 0
+        message = {"node": event["node"], "elapsed_ms": event["elapsed_ms"]}
+        if event.get("draft") is not None:
+            message["iteration"] = event["iteration"]
+            message["draft"] = event["draft"].model_dump()
+        await ctx.report_progress(event["step"], message=json.dumps(message, ensure_ascii=False))
+    return on_progress
 
 
 # Initialize FastMCP server
-mcp = FastMCP("xhs-assistant")
+mcp = FastMCP("xhs-assistant", lifespan=lifespan)
 
 
 @mcp.tool()
 async def generate_xhs_post_tool(
+    ctx: Context,
     content: str,
-    iterations: int = 2
+    iterations: int = 2,
+    use_cache: bool = True,
+    candidates: int | None = None,
+    time_budget_s: float | None = None,
+    token_budget: int | None = None
 ) -> PostResponse:
     """
     Generate a 小紅書 post using AI multi-agent workflow (generator → critic → improve).
 
+    Progress notifications are sent after every step; each generator step
+    includes the current draft so it can be shown before the run finishes.
+    While a draft is being written, partial PostResponse updates (metadata
+    "partial": true) stream the title and the growing body.
+
     Args:
         content: The source content to generate a post from
         iterations: Number of critic-improve cycles (default: 2)
+        use_cache: Reuse cached analysis/critique/formatting for identical inputs (default: True)
+        candidates: Drafts generated in parallel for the first version, best kept (default: server setting)
+        time_budget_s: Stop critic loops early to finish within this many seconds (default: server setting)
+        token_budget: Stop critic loops early to stay within this many LLM tokens (default: server setting)
 
     Returns:
         PostResponse with thread_id and final_post
     """
     input_data = {
         "content": content,
-        "iterations": iterations
+        "iterations": iterations,
+        "use_cache": use_cache,
+        "candidates": candidates,
+        "time_budget_s": time_budget_s,
+        "token_budget": token_budget
     }
-    result = await generate_xhs_post(input_data)
+    tools = await _load_tools()
+    result = await tools.generate_xhs_post(input_data, on_progress=_progress_reporter(ctx))
 
     # Return structured response - FastMCP handles serialization
     return PostResponse(
         thread_id=result['thread_id'],
-        final_post=result['final_post']
+        final_post=result['final_post'],
+        metadata=result['metadata']
     )
 
 
 @mcp.tool()
 async def refinement_xhs_post_tool(
+    ctx: Context,
     thread_id: str,
     feedback: str,
-    iterations: int = 1
+    iterations: int = 1,
+    use_cache: bool = True,
+    candidates: int | None = None,
+    time_budget_s: float | None = None,
+    token_budget: int | None = None
 ) -> PostResponse:
     """
     Refine a post with user feedback.
@@ -56,6 +367,10 @@ async def refinement_xhs_post_tool(
         thread_id: Thread ID from previous generate_xhs_post_tool call
         feedback: User feedback for refinement (e.g., "make it more casual", "add examples")
         iterations: Number of refinement cycles (default: 1)
+        use_cache: Reuse cached critique/formatting for identical inputs (default: True)
+        candidates: Drafts generated in parallel for the first refined version, best kept (default: server setting)
+        time_budget_s: Stop refinement loops early to finish within this many seconds (default: server setting)
+        token_budget: Stop refinement loops early to stay within this many LLM tokens (default: server setting)
 
     Returns:
         PostResponse with thread_id and refined final_post
@@ -63,12 +378,441 @@ async def refinement_xhs_post_tool(
     input_data = {
         "thread_id": thread_id,
         "feedback": feedback,
-        "iterations": iterations
+        "iterations": iterations,
+        "use_cache": use_cache,
+        "candidates": candidates,
+        "time_budget_s": time_budget_s,
+        "token_budget": token_budget
     }
-    result = await refinement_xhs_post(input_data)
+    tools = await _load_tools()
+    result = await tools.refinement_xhs_post(input_data, on_progress=_progress_reporter(ctx))
 
     # Return structured response - FastMCP handles serialization
     return PostResponse(
         thread_id=result['thread_id'],
-        final_post=result['final_post']
+        final_post=result['final_post'],
+        metadata=result['metadata']
+    )
+
+
+@mcp.tool()
+async def generate_xhs_posts_batch_tool(
+    ctx: Context,
+    sources: list[str] | None = None,
+    urls: list[str] | None = None,
+    paths: list[str] | None = None,
+    directory: str | None = None,
+    iterations: int = 2,
+    concurrency: int = 4,
+    use_cache: bool = True,
+    candidates: int | None = None
+) -> BatchResponse:
+    """
+    Generate 小紅書 posts for many sources concurrently.
+
+    Every finished post is reported immediately as a progress notification.
+
+    Args:
+        sources: Raw source texts
+        urls: Web pages to fetch (concurrently) and use as sources
+        paths: Source files (PDF, Markdown, HTML or text)
+        directory: Directory whose files are all used as sources (e.g. "topic")
+        iterations: Number of critic-improve cycles per post (default: 2)
+        concurrency: Maximum workflows running at once (default: 4)
+        use_cache: Reuse cached analysis/critique/formatting for identical inputs (default: True)
+        candidates: Parallel first drafts per source, best kept (default: server setting)
+
+    Returns:
+        BatchResponse with per-source results in completion order
+    """
+    # Expanded here so the progress total counts the directory's files
+    paths = [*(paths or []), *map(str, _directory_files(directory))]
+    input_data = {
+        "sources": sources or [],
+        "urls": urls or [],
+        "paths": paths,
+        "iterations": iterations,
+        "concurrency": concurrency,
+        "use_cache": use_cache,
+        "candidates": candidates
+    }
+    total = len(input_data["sources"]) + len(input_data["urls"]) + len(input_data["paths"])
+    done = 0
+
+    async def on_result(result: dict):
+        nonlocal done
+        done += 1
+        await ctx.report_progress(
+            done,
+            total or None,
+            f"{result['source']}: {result['status']}"
+        )
+
+    tools = await _load_tools()
+    result = await tools.generate_xhs_posts_batch(input_data, on_result=on_result)
+
+    # Return structured response - FastMCP handles serialization
+    return BatchResponse(**result)
+
+
+@mcp.tool()
+async def sync_xhs_posts_tool(
+    ctx: Context,
+    directory: str | None = None,
+    paths: list[str] | None = None,
+    iterations: int = 2,
+    threshold: float | None = None,
+    force: bool = False,
+    watch_seconds: float = 0,
+    use_cache: bool = True
+) -> SyncResponse:
+    """
+    Keep one post per source file up to date, regenerating only what changed.
+
+    Unchanged files are skipped, small edits (typo fixes) update the existing
+    post with one generator call, and new files or big edits get a full
+    generation. Every post that changed is reported as a progress notification.
+
+    Posts are updated in their workflow threads, which survive a restart only
+    with CHECKPOINT_BACKEND=sqlite. With in-memory checkpoints, files edited
+    after a restart are generated from scratch (status "generated", with
+    lost_thread_id set).
+
+    Args:
+        directory: Directory whose files are all sources (e.g. "topic")
+        paths: Source files
+        iterations: Critic-improve cycles for full generations (default: 2)
+        threshold: Largest fraction of changed characters handled as an update (default: server setting)
+        force: Regenerate every source from scratch (default: False)
+        watch_seconds: Keep watching for edits this long, syncing on every change (default: 0 = one pass)
+        use_cache: Reuse cached analysis/critique/formatting for identical inputs (default: True)
+
+    Returns:
+        SyncResponse with the per-source results of the last pass (all changed results when watching)
+    """
+    input_data = {
+        "directory": directory,
+        "paths": paths or [],
+        "iterations": iterations,
+        "threshold": threshold,
+        "force": force,
+        "use_cache": use_cache
+    }
+    done = 0
+
+    async def on_result(result: dict):
+        nonlocal done
+        done += 1
+        await ctx.report_progress(done, None, f"{result['source']}: {result['status']}")
+
+    tools = await _load_tools()
+    start = time.perf_counter()
+    if watch_seconds <= 0:
+        return SyncResponse(**await tools.sync_xhs_posts(input_data, on_result=on_result))
+
+    watched = await tools.watch_xhs_posts(input_data, on_result=on_result, duration_s=watch_seconds)
+    results = watched["results"]
+    return SyncResponse(
+        results=results,
+        unchanged=watched["unchanged"],
+        updated=sum(1 for r in results if r["status"] == "updated"),
+        generated=sum(1 for r in results if r["status"] == "generated"),
+        failed=sum(1 for r in results if r["status"] == "error"),
+        passes=watched["passes"],
+        duration_ms=round((time.perf_counter() - start) * 1000, 1),
     )
+
+
+@mcp.tool()
+async def extract_content_tool(file_path: str, max_chars: int | None = None) -> SourceResponse:
+    """
+    Extract the text of a document (PDF, Markdown, HTML or plain text) for post generation.
+
+    Args:
+        file_path: Path of the document
+        max_chars: Maximum characters of text to keep (default: server setting)
+
+    Returns:
+        SourceResponse with title, normalized content (ready for generate_xhs_post_tool) and metadata
+    """
+    tools = await _load_tools()
+    result = await tools.extract_content({"file_path": file_path, "max_chars": max_chars})
+    return SourceResponse(**result)
+
+
+@mcp.tool()
+async def fetch_webpage_tool(
+    url: str | None = None,
+    urls: list[str] | None = None,
+    use_cache: bool = True,
+    max_chars: int | None = None
+) -> SourcesResponse:
+    """
+    Fetch web pages concurrently and extract their main text for post generation.
+
+    Pages fetched before are revalidated with conditional requests
+    (ETag / Last-Modified) and reuse the stored text when unchanged.
+
+    Args:
+        url: One URL to fetch
+        urls: More URLs, fetched concurrently
+        use_cache: Revalidate cached pages instead of downloading them again (default: True)
+        max_chars: Maximum characters of text to keep per page (default: server setting)
+
+    Returns:
+        SourcesResponse with one result per URL in input order (status "ok" or "error")
+    """
+    all_urls = ([url] if url else []) + (urls or [])
+    if not all_urls:
+        raise ValueError("Pass url or urls")
+    tools = await _load_tools()
+    result = await tools.fetch_webpages({"urls": all_urls, "use_cache": use_cache, "max_chars": max_chars})
+    return SourcesResponse(
+        results=[SourceResponse(**{k: v for k, v in r.items() if k != "index"}) for r in result["results"]],
+        succeeded=result["succeeded"],
+        failed=result["failed"],
+        duration_ms=result["duration_ms"],
+    )
+
+
+@mcp.tool()
+async def find_similar_posts_tool(
+    text: str | None = None,
+    thread_id: str | None = None,
+    threshold: float | None = None,
+    limit: int = 10
+) -> SimilarPostsResponse:
+    """
+    Find earlier posts that are near-duplicates of a draft or of a thread's post.
+
+    Every final post is indexed by the workflow's variety check, so this
+    searches all generated posts (MinHash over Chinese character 3-grams).
+
+    Args:
+        text: Post or draft to look up (title on the first line)
+        thread_id: Alternatively, look up the final post of this thread
+        threshold: Minimum similarity, 0-1 (default: server setting)
+        limit: Maximum matches (default: 10)
+
+    Returns:
+        SimilarPostsResponse with matches (thread_id, title, similarity), most similar first
+    """
+    tools = await _load_tools()
+    result = await tools.find_similar_posts(
+        {"text": text, "thread_id": thread_id, "threshold": threshold, "limit": limit}
+    )
+    return SimilarPostsResponse(**result)
+
+
+@mcp.tool()
+async def suggest_hashtags_tool(text: str, limit: int = 5) -> HashtagsResponse:
+    """
+    Suggest hashtags for a draft from the tags of every earlier post.
+
+    Args:
+        text: Draft post (hashtags it already has are not suggested again)
+        limit: Maximum suggestions (default: 5)
+
+    Returns:
+        HashtagsResponse with ranked suggestions and, per existing tag, the tags most used with it
+    """
+    tools = await _load_tools()
+    result = await tools.suggest_hashtags({"text": text, "limit": limit})
+    return HashtagsResponse(**result)
+
+
+def _job_response(job: dict, cls=JobResponse):
+    fields = {k: v for k, v in job.items() if k in cls.model_fields}
+    return cls(job_id=job["id"], **fields)
+
+
+@mcp.tool()
+async def submit_xhs_post_job_tool(
+    content: str | None = None,
+    sources: list[str] | None = None,
+    urls: list[str] | None = None,
+    paths: list[str] | None = None,
+    directory: str | None = None,
+    iterations: int = 2,
+    use_cache: bool = True,
+    candidates: int | None = None,
+    time_budget_s: float | None = None,
+    token_budget: int | None = None
+) -> JobSubmitResponse:
+    """
+    Queue 小紅書 post generations and return at once with their job IDs.
+
+    Jobs are stored durably and run in the background by a worker pool;
+    poll job_status_tool / job_result_tool for progress and posts. Each job's
+    thread_id is assigned now and works with refinement_xhs_post_tool once
+    the job has succeeded. Jobs interrupted by a restart or crash run again
+    (after a crash, once their lease expires); they resume from their last
+    checkpoint only with CHECKPOINT_BACKEND=sqlite and start over otherwise.
+
+    Args:
+        content: One source text
+        sources: More source texts, one job each
+        urls: Web pages, one job each (fetched when the job runs)
+        paths: Source files, one job each (extracted when the job runs)
+        directory: Directory whose files each become a job (e.g. "topic")
+        iterations: Number of critic-improve cycles per post (default: 2)
+        use_cache: Reuse cached analysis/critique/formatting for identical inputs (default: True)
+        candidates: Parallel first drafts per post, best kept (default: server setting)
+        time_budget_s: Stop critic loops early to finish within this many seconds (default: server setting)
+        token_budget: Stop critic loops early to stay within this many LLM tokens (default: server setting)
+
+    Returns:
+        JobSubmitResponse with one queued job per source
+    """
+    settings = {
+        "iterations": iterations,
+        "use_cache": use_cache,
+        "candidates": candidates,
+        "time_budget_s": time_budget_s,
+        "token_budget": token_budget
+    }
+    items = []
+    if content:
+        items.append(({**settings, "content": content}, None))
+    for i, text in enumerate(sources or []):
+        items.append(({**settings, "content": text}, f"sources[{i}]"))
+    for url in urls or []:
+        items.append(({**settings, "url": url}, url))
+    files = [Path(path) for path in paths or []] + _directory_files(directory)
+    for path in files:
+        items.append(({**settings, "path": str(path)}, str(path)))
+    if not items:
+        raise ValueError("Nothing to submit: pass content, sources, urls, paths or directory")
+
+    queue = await _start_job_workers()
+    submitted = await queue.submit_many(items)
+    return JobSubmitResponse(jobs=[
+        JobResponse(source=source, **job) for job, (_, source) in zip(submitted, items)
+    ])
+
+
+async def _get_job(job_id: str) -> dict:
+    job = await _job_queue().get(job_id)
+    if job is None:
+        raise ValueError(f"Unknown job_id: {job_id}")
+    return job
+
+
+@mcp.tool()
+async def job_status_tool(job_id: str) -> JobResponse:
+    """
+    Get the status of a queued generation job.
+
+    Args:
+        job_id: Job ID from submit_xhs_post_job_tool
+
+    Returns:
+        JobResponse with status (queued, running, succeeded, failed, cancelled), attempts and timestamps
+    """
+    return _job_response(await _get_job(job_id))
+
+
+@mcp.tool()
+async def job_result_tool(job_id: str, wait_seconds: float = 0) -> JobResultResponse:
+    """
+    Get the post generated by a job.
+
+    Args:
+        job_id: Job ID from submit_xhs_post_job_tool
+        wait_seconds: Wait up to this long for an unfinished job (default: 0, return at once)
+
+    Returns:
+        JobResultResponse; final_post and metadata are set once the job has succeeded
+    """
+    from .utils.jobs import FINISHED_STATUSES
+
+    job = await _get_job(job_id)
+    if wait_seconds > 0 and job["status"] not in FINISHED_STATUSES:
+        # Make sure some worker can run it while we wait
+        await _start_job_workers()
+    deadline = time.monotonic() + wait_seconds
+    while job["status"] not in FINISHED_STATUSES and time.monotonic() < deadline:
+        await asyncio.sleep(min(0.5, max(0.0, deadline - time.monotonic())))
+        job = await _get_job(job_id)
+
+    response = _job_response(job, JobResultResponse)
+    if job["result"]:
+        response.final_post = job["result"]["final_post"]
+        response.metadata = job["result"]["metadata"]
+    return response
+
+
+@mcp.tool()
+async def cancel_job_tool(job_id: str) -> JobResponse:
+    """
+    Cancel a queued or running generation job (finished jobs are unchanged).
+
+    Args:
+        job_id: Job ID from submit_xhs_post_job_tool
+
+    Returns:
+        JobResponse with the job's status after cancellation
+    """
+    job = await _job_queue().cancel(job_id)
+    if job is None:
+        raise ValueError(f"Unknown job_id: {job_id}")
+    return _job_response(job)
+
+
+@mcp.resource("xhs://stats/jobs")
+async def job_stats() -> dict:
+    """Job counts per status, worker pool size and jobs running now."""
+    return await _job_queue().stats()
+
+
+@mcp.resource("xhs://stats/posts")
+async def post_index_stats() -> dict:
+    """Size of the near-duplicate post index and of the hashtag index built from it."""
+    from .utils.post_index import get_post_index
+
+    index = get_post_index()
+    return {**await index.stats(), "hashtags": (await index.hashtag_index()).stats()}
+
+
+@mcp.resource("xhs://stats/checkpointer")
+async def checkpointer_stats() -> dict:
+    """Threads, bytes and evictions/compactions of the workflow checkpointer."""
+    from .agents.checkpointers import get_checkpointer
+
+    saver = await get_checkpointer()
+    return await saver.astats()
+
+
+@mcp.resource("xhs://stats/cache")
+def cache_stats() -> dict:
+    """Hit/miss counters of the LLM response cache."""
+    cache = get_response_cache()
+    return cache.stats() if cache else {"enabled": False}
+
+
+@mcp.resource("xhs://stats/llm")
+async def llm_stats() -> dict:
+    """Calls, failures, hedges, circuit state and latency per LLM backend."""
+    from .utils.llm import get_llm_pool
+
+    # The first call builds the pool, importing langchain and the provider SDKs
+    pool = await asyncio.to_thread(get_llm_pool)
+    return pool.stats()
+
+
+@mcp.resource("xhs://metrics", mime_type="text/plain")
+def metrics_prometheus() -> str:
+    """Per-stage latency (p50/p95), tokens, retries and cost in Prometheus text format."""
+    return get_metrics().render_prometheus()
+
+
+@mcp.resource("xhs://metrics/summary")
+def metrics_summary() -> dict:
+    """Per-stage latency (p50/p95) and per-provider token/cost totals as JSON."""
+    return get_metrics().snapshot()
+
+
+@mcp.resource("xhs://metrics/threads/{thread_id}")
+def thread_metrics(thread_id: str) -> dict:
+    """Node time, tokens, retries and cost accumulated by one thread."""
+    return get_metrics().thread_stats(thread_id) or {"thread_id": thread_id, "known": False}
@@ -1,5 +1,25 @@
 """Tools for content extraction and generation."""
 
-from .generator import generate_xhs_post, refinement_xhs_post
+from .generator import generate_xhs_post, refinement_xhs_post, resume_xhs_post, update_source_xhs_post
+from .batch import generate_xhs_posts_batch, run_xhs_post_job
+from .extract import extract_content
+from .web import fetch_webpage, fetch_webpages
+from .sync import sync_xhs_posts, watch_xhs_posts
+from .variety import find_similar_posts
+from .hashtags import suggest_hashtags
 
-__all__ = ["generate_xhs_post", "refinement_xhs_post"]
+__all__ = [
+    "generate_xhs_post",
+    "refinement_xhs_post",
+    "resume_xhs_post",
+    "update_source_xhs_post",
+    "generate_xhs_posts_batch",
+    "run_xhs_post_job",
+    "extract_content",
+    "fetch_webpage",
+    "fetch_webpages",
+    "sync_xhs_posts",
+    "watch_xhs_posts",
+    "find_similar_posts",
+    "suggest_hashtags",
+]
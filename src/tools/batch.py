@@ -0,0 +1,185 @@
+"""Batch post generation: many sources in, many posts out."""
+
+import asyncio
+import inspect
+import logging
+import os
+import time
+from pathlib import Path
+from .extract import extract_content
+from .generator import generate_xhs_post, resume_xhs_post
+from .web import fetch_webpage
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Default number of workflows run at the same time
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", 4))
+
+
+def _expand_sources(input_data: dict) -> list[dict]:
+    """
+    Normalize batch input into a list of {"source", "content" | "path" | "url"} items.
+
+    Accepts raw texts ("sources"), URLs ("urls"), file paths ("paths") and
+    directories ("directory", every regular file inside, sorted by name).
+    """
+    items = []
+    for i, content in enumerate(input_data.get("sources", [])):
+        items.append({"source": f"sources[{i}]", "content": content})
+    for url in input_data.get("urls", []):
+        items.append({"source": url, "url": url})
+    for path in input_data.get("paths", []):
+        items.append({"source": str(path), "path": Path(path)})
+    if directory := input_data.get("directory"):
+        for path in sorted(Path(directory).iterdir()):
+            if path.is_file() and not path.name.startswith("."):
+                items.append({"source": str(path), "path": path})
+    return items
+
+
+async def load_source(item: dict, use_cache: bool = True) -> str:
+    """
+    Get the normalized text of a source item.
+
+    Args:
+        item: dict with "content" (used as is), "url" (fetched, see web.py)
+            or "path" (extracted, see extract.py)
+        use_cache: Revalidate cached pages instead of refetching them
+
+    Returns:
+        Source text for generate_xhs_post
+    """
+    if item.get("content") is not None:
+        return item["content"]
+    if item.get("url"):
+        return (await fetch_webpage({"url": item["url"], "use_cache": use_cache}))["content"]
+    return (await extract_content({"file_path": str(item["path"])}))["content"]
+
+
+async def _run_item(index: int, item: dict, input_data: dict, semaphore: asyncio.Semaphore) -> dict:
+    """Generate one post; failures are captured in the result instead of raised."""
+    result = {"index": index, "source": item["source"]}
+    start = time.perf_counter()
+    try:
+        # Sources are fetched/extracted outside the semaphore, so downloads
+        # and parsing overlap with the generations already running
+        content = await load_source(item, input_data.get("use_cache", True))
+        if not content.strip():
+            raise ValueError("source is empty")
+    except Exception as e:
+        logger.warning(f"⚠️ Batch item {item['source']} failed: {e}")
+        result.update(status="error", error=f"{type(e).__name__}: {e}")
+        result["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return result
+
+    async with semaphore:
+        try:
+            post = await generate_xhs_post({
+                "content": content,
+                "iterations": input_data.get("iterations", 2),
+                "use_cache": input_data.get("use_cache", True),
+                "candidates": input_data.get("candidates"),
+            })
+            result.update(status="ok", **post)
+        except Exception as e:
+            logger.warning(f"⚠️ Batch item {item['source']} failed: {e}")
+            result.update(status="error", error=f"{type(e).__name__}: {e}")
+        result["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return result
+
+
+async def generate_xhs_posts_batch(input_data: dict, on_result=None) -> dict:
+    """
+    Generate 小紅書 posts for many sources concurrently.
+
+    Each source runs the full analyze → generator → critic → formatting
+    workflow in its own thread. A semaphore bounds how many workflows run at
+    once, and LLM calls are additionally throttled per provider (see
+    src/utils/rate_limit.py). A failing source never affects the others.
+
+    Args:
+        input_data: dict containing:
+            - sources: List of raw source texts
+            - urls: List of web pages to fetch and use as sources
+            - paths: List of source files (PDF, Markdown, HTML or text)
+            - directory: Directory whose files are all used as sources (e.g. "topic")
+            - iterations: Number of critic-improve cycles per post (default: 2)
+            - concurrency: Maximum workflows in flight (default: BATCH_CONCURRENCY)
+            - use_cache: Serve repeated LLM calls from the response cache (default: True)
+            - candidates: Parallel first drafts per source (default: GENERATOR_CANDIDATES)
+        on_result: Optional callback (sync or async) called with each result
+            as soon as it finishes
+
+    Returns:
+        dict with:
+            - results: Per-source results in completion order, each with
+              index, source, status ("ok"/"error"), duration_ms and either
+              thread_id/final_post/metadata or error
+            - succeeded / failed: Counts
+            - duration_ms: Wall-clock time for the whole batch
+    """
+    items = _expand_sources(input_data)
+    concurrency = max(1, input_data.get("concurrency") or BATCH_CONCURRENCY)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    logger.info(f"📦 Starting batch of {len(items)} sources (concurrency {concurrency})")
+    start = time.perf_counter()
+
+    tasks = [
+        asyncio.create_task(_run_item(i, item, input_data, semaphore))
+        for i, item in enumerate(items)
+    ]
+
+    results = []
+    try:
+        for finished in asyncio.as_completed(tasks):
+            result = await finished
+            results.append(result)
+            if on_result is not None:
+                callback = on_result(result)
+                if inspect.isawaitable(callback):
+                    await callback
+    finally:
+        # Don't leave workflows running if the batch itself is cancelled
+        for task in tasks:
+            task.cancel()
+
+    succeeded = sum(1 for r in results if r["status"] == "ok")
+    return {
+        "results": results,
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
+
+
+async def run_xhs_post_job(job: dict) -> dict:
+    """
+    Run one queued generation job (the runner of the job queue, src/utils/jobs.py).
+
+    The job's thread_id was assigned at submit time. A job that was
+    interrupted before (attempts > 1) first tries to finish from its
+    thread's last checkpoint; with no checkpoint it starts over.
+
+    Args:
+        job: Job dict with input (generate_xhs_post input, with "path" or
+            "url" instead of "content" for file and web sources), thread_id
+            and attempts
+
+    Returns:
+        dict with thread_id, final_post and metadata
+    """
+    input_data = {**job["input"], "thread_id": job["thread_id"]}
+    if "content" not in input_data:
+        # Jobs submitted by path or URL load their source when they run
+        item = {"path": input_data.pop("path", None), "url": input_data.pop("url", None)}
+        input_data["content"] = await load_source(item, input_data.get("use_cache", True))
+    if not input_data["content"].strip():
+        raise ValueError("source is empty")
+    if job["attempts"] > 1:
+        result = await resume_xhs_post(input_data)
+        if result is not None:
+            return result
+        logger.info(f"🔁 No checkpoint for job {job['id']}, starting over")
+    return await generate_xhs_post(input_data)
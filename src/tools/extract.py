@@ -0,0 +1,112 @@
+"""Document extraction tool: PDF, Markdown, HTML and text files to normalized text."""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from ..utils.extractors import extract_file
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Worker processes for parsing documents (0 = parse in a thread instead)
+EXTRACT_WORKERS = int(os.environ.get("EXTRACT_WORKERS", min(4, os.cpu_count() or 1)))
+
+# Inputs up to this size are parsed in a thread: starting a process and
+# shipping the data to it costs more than parsing them
+EXTRACT_INLINE_BYTES = int(os.environ.get("EXTRACT_INLINE_BYTES", 256 * 1024))
+
+# Files larger than this are rejected
+EXTRACT_MAX_FILE_BYTES = int(os.environ.get("EXTRACT_MAX_FILE_BYTES", 50 * 1024 * 1024))
+
+# Text kept per source; reading stops once it is reached
+EXTRACT_MAX_CHARS = int(os.environ.get("EXTRACT_MAX_CHARS", 100_000))
+
+_process_pool: ProcessPoolExecutor | None = None
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    """Lazily created pool of parser processes."""
+    global _process_pool
+    if _process_pool is None:
+        # Never fork the server itself: it runs threads (DB connections, to_thread)
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        if context.get_start_method() == "forkserver":
+            context.set_forkserver_preload(["src.utils.extractors"])
+        _process_pool = ProcessPoolExecutor(max_workers=EXTRACT_WORKERS, mp_context=context)
+        logger.info(f"🧮 Started {EXTRACT_WORKERS} extraction processes")
+    return _process_pool
+
+
+def shutdown_process_pool() -> None:
+    """Stop the parser processes (a new pool is created on next use)."""
+    global _process_pool
+    pool, _process_pool = _process_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def run_extraction(func, *args, size: int):
+    """
+    Run a parser from src/utils/extractors.py off the event loop.
+
+    Large inputs go to the process pool so parsing many documents uses every
+    core and never blocks the server; small ones run in a thread.
+
+    Args:
+        func: Extraction function (must be importable by worker processes)
+        *args: Its arguments (picklable)
+        size: Input size in bytes, to pick thread or process
+
+    Returns:
+        The function's result
+    """
+    if EXTRACT_WORKERS <= 0 or size <= EXTRACT_INLINE_BYTES:
+        return await asyncio.to_thread(func, *args)
+    return await asyncio.get_running_loop().run_in_executor(_get_process_pool(), func, *args)
+
+
+async def extract_content(input_data: dict) -> dict:
+    """
+    Extract normalized text from a document for post generation.
+
+    PDFs (needs the optional pypdf package) are read page by page and
+    Markdown line by line, stopping once max_chars of text were produced.
+    HTML keeps the page's main content; anything else is read as UTF-8 text.
+
+    Args:
+        input_data: dict containing:
+            - file_path: Document to extract (type picked by suffix)
+            - max_chars: Text to keep (default: EXTRACT_MAX_CHARS)
+
+    Returns:
+        dict with:
+            - source: The file path
+            - title: Document title ("" if none was found)
+            - content: Normalized text, ready for generate_xhs_post
+            - metadata: type, bytes, chars, truncated, duration_ms (plus
+              pages and pages_read for PDFs)
+    """
+    file_path = input_data.get("file_path")
+    if not file_path:
+        raise ValueError("file_path is required")
+    max_chars = input_data.get("max_chars") or EXTRACT_MAX_CHARS
+
+    path = Path(file_path).expanduser()
+    if not path.is_file():
+        raise ValueError(f"Not a file: {file_path}")
+    size = path.stat().st_size
+    if size > EXTRACT_MAX_FILE_BYTES:
+        raise ValueError(f"{file_path} is {size} bytes, over the {EXTRACT_MAX_FILE_BYTES} byte limit")
+
+    start = time.perf_counter()
+    result = await run_extraction(extract_file, str(path), max_chars, size=size)
+    title = result.pop("title")
+    content = result.pop("content")
+    metadata = {**result, "bytes": size, "duration_ms": round((time.perf_counter() - start) * 1000, 1)}
+    logger.info(f"📄 Extracted {metadata['chars']} chars from {path.name} ({metadata['type']})")
+    return {"source": str(path), "title": title, "content": content, "metadata": metadata}
@@ -1,43 +1,258 @@
 """Main content generation tool with multi-agent workflow."""
 
+import asyncio
+import inspect
 import logging
+import os
+import time
+import unicodedata
 import uuid
 from langchain_core.messages import SystemMessage, HumanMessage
 from ..agents import get_workflow
+from ..agents.convergence import new_budget
+from ..agents.history import SOURCE_UPDATE_PREFIX, USER_FEEDBACK_PREFIX
+from ..agents.nodes import SOURCE_GENERATOR_MAX_CHARS, render_analysis_message
+from ..agents.preprocess import build_digest
 from ..agents.state import XHSPost
 from ..agents.prompts import GENERATOR_PROMPT
 from ..utils import log_conversation_flow
+from ..utils.cache import make_cache_key
+from ..utils.metrics import get_metrics
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
+# Share one workflow run between concurrent identical generation requests
+REQUEST_COALESCING = os.environ.get("REQUEST_COALESCING", "true").lower() == "true"
 
-async def generate_xhs_post(input_data: dict) -> dict:
+
+class _Flight:
+    """A running generation shared by identical concurrent requests."""
+
+    def __init__(self):
+        self.task: asyncio.Future | None = None
+        self.listeners: list = []
+
+    async def broadcast(self, event: dict) -> None:
+        """Forward a progress event to every request waiting on this run."""
+        for listener in list(self.listeners):
+            try:
+                callback = listener(event)
+                if inspect.isawaitable(callback):
+                    await callback
+            except Exception as e:
+                # A disconnected client must not fail the shared run
+                logger.warning(f"⚠️ Dropping progress listener: {e}")
+                self.listeners.remove(listener)
+
+
+# Coalescing key -> generation in flight
+_in_flight: dict[str, _Flight] = {}
+
+
+def _coalesce_key(input_data: dict) -> str:
+    """Hash of the normalized source and every setting that shapes the result."""
+    content = unicodedata.normalize("NFC", input_data.get("content", ""))
+    content = "\n".join(line.rstrip() for line in content.strip().splitlines())
+    return make_cache_key(
+        content=content,
+        iterations=input_data.get("iterations", 2),
+        use_cache=input_data.get("use_cache", True),
+        candidates=input_data.get("candidates"),
+        time_budget_s=input_data.get("time_budget_s"),
+        token_budget=input_data.get("token_budget"),
+    )
+
+
+async def _branch_thread(source_thread_id: str, thread_id: str) -> None:
+    """Start thread_id from the latest checkpoint of source_thread_id."""
+    workflow = await get_workflow()
+    snapshot = await workflow.aget_state({"configurable": {"thread_id": source_thread_id}})
+    # Written as the graph's last node, so the new thread is finished and
+    # can be refined like any other (and its post, the same as the source
+    # thread's, isn't indexed twice by the variety check)
+    await workflow.aupdate_state({"configurable": {"thread_id": thread_id}}, snapshot.values, as_node="variety_check")
+
+
+def _run_metadata(final_state: dict, start: float) -> dict:
+    """Collect per-run stats recorded by the nodes plus total duration."""
+    metadata = {k: v for k, v in final_state.get("run_stats", {}).items() if k != "run_id"}
+    metadata["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return metadata
+
+
+async def _stream_workflow(workflow, inputs: dict, config: dict, on_progress=None,
+                           stream_drafts: bool | None = None) -> tuple[dict, dict]:
+    """
+    Run the workflow with astream, reporting each finished node.
+
+    With a progress callback, single-draft generations are streamed and
+    partial drafts are reported while the generator is still running.
+
+    Args:
+        workflow: Compiled LangGraph workflow
+        inputs: Initial state or state update
+        config: Run config with thread_id
+        on_progress: Optional callback (sync or async) receiving event dicts:
+            {"node", "step", "elapsed_ms", "thread_id"} plus "iteration" and
+            "draft" (an XHSPost) after each generator step; partial drafts
+            come as generator events with "partial": True and "title_complete"
+        stream_drafts: Stream partial drafts (default: whether on_progress
+            is given)
+
+    Returns:
+        Tuple of (final state values, stream stats with time_to_first_token_ms
+        and time_to_first_draft_ms)
+    """
+    start = time.perf_counter()
+    final_state = {}
+    stream_stats = {"time_to_first_token_ms": None, "time_to_first_draft_ms": None}
+    step = 0
+    thread_id = config["configurable"]["thread_id"]
+    if stream_drafts is None:
+        stream_drafts = on_progress is not None
+    config = {**config, "configurable": {**config["configurable"], "stream_drafts": stream_drafts}}
+
+    try:
+        async for mode, chunk in workflow.astream(inputs, config, stream_mode=["updates", "values", "custom"]):
+            if mode == "values":
+                final_state = chunk
+                continue
+
+            if mode == "custom":
+                if "partial_post" not in chunk or on_progress is None:
+                    continue
+                elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+                if stream_stats["time_to_first_token_ms"] is None:
+                    stream_stats["time_to_first_token_ms"] = elapsed_ms
+                    logger.info(f"✏️ First draft tokens after {elapsed_ms}ms")
+                event = {
+                    "node": "generator", "step": step, "elapsed_ms": elapsed_ms, "thread_id": thread_id,
+                    "partial": True, "iteration": chunk["iteration"], "title_complete": chunk["title_complete"],
+                    "draft": XHSPost(**chunk["partial_post"]),
+                }
+                callback = on_progress(event)
+                if inspect.isawaitable(callback):
+                    await callback
+                continue
+
+            for node, update in chunk.items():
+                step += 1
+                elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+                event = {"node": node, "step": step, "elapsed_ms": elapsed_ms, "thread_id": thread_id}
+
+                if node == "generator" and update:
+                    event["iteration"] = update.get("iteration")
+                    event["draft"] = update.get("post")
+                    if stream_stats["time_to_first_draft_ms"] is None:
+                        stream_stats["time_to_first_draft_ms"] = elapsed_ms
+                        logger.info(f"📝 First draft ready after {elapsed_ms}ms")
+
+                if on_progress is not None:
+                    callback = on_progress(event)
+                    if inspect.isawaitable(callback):
+                        await callback
+    except asyncio.CancelledError:
+        # Cancelled between a step's writes and its checkpoint: commit what
+        # the durable checkpointer staged so a resume doesn't redo those tasks
+        flush = getattr(workflow.checkpointer, "aflush", None)
+        if flush is not None:
+            await asyncio.shield(flush())
+        raise
+
+    return final_state, stream_stats
+
+
+async def generate_xhs_post(input_data: dict, on_progress=None) -> dict:
     """
     Generate a 小紅書 post using LangGraph multi-agent workflow.
 
     This tool orchestrates the generator → critic → improve cycle using LangGraph.
 
+    Identical requests (same normalized content and settings) arriving
+    while one is running share that run (REQUEST_COALESCING). Each gets the
+    same post under its own thread_id, branched from the shared run's
+    final checkpoint, plus metadata "coalesced" / "coalesced_with".
+    Progress reaches a joining request from then on; partial drafts are
+    streamed only if the request that started the run asked for progress.
+
     Args:
         input_data: dict containing:
             - content: The source content (text/extracted from file/web)
             - iterations: Number of critic-improve cycles (default: 2)
+            - use_cache: Serve analyze/critic/formatting from the response cache (default: True)
+            - candidates: Parallel drafts for the first generation, best one
+              kept (default: GENERATOR_CANDIDATES)
+            - time_budget_s / token_budget: Stop critic loops early once the
+              run would exceed them (default: RUN_TIME_BUDGET_SECONDS /
+              RUN_TOKEN_BUDGET, 0 = unlimited)
+            - thread_id: Thread to run on (default: a new UUID); lets a
+              caller such as the job queue know it before the run starts
+        on_progress: Optional callback receiving a progress event after every
+            node, including the current draft after each generator step
 
     Returns:
         dict with:
             - thread_id: Conversation thread ID for continuation
             - final_post: The generated post
+            - metadata: Per-run stats (formatting path, latency saved,
+              time to first token and first draft, early-exit reason and
+              iterations skipped, duration)
     """
+    if not REQUEST_COALESCING:
+        get_metrics().record_request()
+        return await _generate(input_data, on_progress)
+
+    key = _coalesce_key(input_data)
+    flight = _in_flight.get(key)
+    if flight is None:
+        # Leader: start the shared run (shielded, so it outlives a cancelled caller)
+        flight = _in_flight[key] = _Flight()
+        if on_progress is not None:
+            flight.listeners.append(on_progress)
+        # Node events reach whoever listens by then; partial drafts are only
+        # streamed if the leader listens, since the run decides at its start
+        flight.task = asyncio.ensure_future(
+            _generate(input_data, flight.broadcast, stream_drafts=on_progress is not None)
+        )
+
+        def landed(_task) -> None:
+            if _in_flight.get(key) is flight:
+                del _in_flight[key]
+
+        flight.task.add_done_callback(landed)
+        get_metrics().record_request()
+        return await asyncio.shield(flight.task)
+
+    # Follower: wait for the shared run, then branch its thread
+    thread_id = input_data.get("thread_id") or str(uuid.uuid4())
+    get_metrics().record_request(coalesced=True)
+    logger.info(f"🔗 Coalescing request into an identical run in flight ({thread_id})")
+    if on_progress is not None:
+        flight.listeners.append(lambda event: on_progress({**event, "thread_id": thread_id}))
+    result = await asyncio.shield(flight.task)
+    await _branch_thread(result["thread_id"], thread_id)
+    return {
+        "thread_id": thread_id,
+        "final_post": result["final_post"],
+        "metadata": {**result["metadata"], "coalesced": True, "coalesced_with": result["thread_id"]},
+    }
+
+
+async def _generate(input_data: dict, on_progress=None, stream_drafts: bool | None = None) -> dict:
+    """Run one generation workflow on a new thread (see generate_xhs_post and _stream_workflow)."""
     # Extract parameters
     content = input_data.get("content", "")
     iterations = input_data.get("iterations", 2)
+    use_cache = input_data.get("use_cache", True)
+    candidates = input_data.get("candidates")
 
     # Generate unique thread ID for this conversation
-    thread_id = str(uuid.uuid4())
+    thread_id = input_data.get("thread_id") or str(uuid.uuid4())
 
     # Get the LangGraph workflow with checkpointer
     logger.info(f"🚀 Starting new conversation {thread_id}")
-    workflow = get_workflow()
+    workflow = await get_workflow()
 
     # Initialize message chain with only SystemMessage
     # The first HumanMessage will be created by analyze_node
@@ -50,13 +265,18 @@ async def generate_xhs_post(input_data: dict) -> dict:
         "content": content,  # Pass content directly in state
         "max_iterations": iterations,
         "iteration": 0,
+        "candidates": candidates,
+        "budget": new_budget(thread_id, input_data.get("time_budget_s"), input_data.get("token_budget")),
+        "stop_reason": None,
         "post": XHSPost(title="", body=""),
         "messages": messages,
+        "run_stats": {"run_id": str(uuid.uuid4())},
     }
 
     # Run workflow with thread ID for checkpointing
-    config = {"configurable": {"thread_id": thread_id}}
-    final_state = await workflow.ainvoke(initial_state, config)
+    config = {"configurable": {"thread_id": thread_id, "cache_bypass": not use_cache}}
+    start = time.perf_counter()
+    final_state, stream_stats = await _stream_workflow(workflow, initial_state, config, on_progress, stream_drafts)
 
     # Log conversation flow (only in debug mode)
     log_conversation_flow(final_state.get("messages", []))
@@ -64,14 +284,138 @@ async def generate_xhs_post(input_data: dict) -> dict:
     # Combine title and body for final post
     final_post = f"{final_state['post'].title}\n\n{final_state['post'].body}"
 
-    # Return thread_id and final post
+    # Return thread_id, final post and run metadata
     return {
         "thread_id": thread_id,
-        "final_post": final_post
+        "final_post": final_post,
+        "metadata": {**_run_metadata(final_state, start), **stream_stats},
     }
 
 
-async def refinement_xhs_post(input_data: dict) -> dict:
+async def resume_xhs_post(input_data: dict, on_progress=None) -> dict | None:
+    """
+    Finish a generation from the latest checkpoint of its thread.
+
+    Used after a crash: nodes that already completed are not run again. A
+    thread whose run already finished returns its post without running
+    anything.
+
+    Args:
+        input_data: dict containing:
+            - thread_id: Thread of the interrupted generation
+            - use_cache: Serve analyze/critic/formatting from the response cache (default: True)
+        on_progress: Optional callback receiving a progress event after every node
+
+    Returns:
+        dict with thread_id, final_post and metadata (with "resumed": True),
+        or None if the thread has no checkpoint to resume from
+    """
+    thread_id = input_data["thread_id"]
+    use_cache = input_data.get("use_cache", True)
+    workflow = await get_workflow()
+    config = {"configurable": {"thread_id": thread_id, "cache_bypass": not use_cache}}
+
+    snapshot = await workflow.aget_state(config)
+    if not snapshot.values:
+        return None
+
+    start = time.perf_counter()
+    if snapshot.next:
+        logger.info(f"⏯️ Resuming conversation {thread_id} at {', '.join(snapshot.next)}")
+        final_state, stream_stats = await _stream_workflow(workflow, None, config, on_progress)
+    else:
+        final_state, stream_stats = snapshot.values, {}
+
+    final_post = f"{final_state['post'].title}\n\n{final_state['post'].body}"
+    return {
+        "thread_id": thread_id,
+        "final_post": final_post,
+        "metadata": {**_run_metadata(final_state, start), **stream_stats, "resumed": True},
+    }
+
+
+def _source_update_message(changes: list[dict]) -> HumanMessage:
+    """Tell the generator which passages of the source were edited."""
+    parts = []
+    for change in changes:
+        if change["before"]:
+            parts.append(f"[Before]\n{change['before']}")
+        parts.append(f"[After]\n{change['after']}" if change["after"] else "[After]\n(removed)")
+    return HumanMessage(
+        content=f"{SOURCE_UPDATE_PREFIX} the source content was edited. Changed passages:\n\n"
+        + "\n\n".join(parts)
+        + "\n\nUpdate the latest post so it matches the edited source. "
+        "Keep everything the edit doesn't affect unchanged."
+    )
+
+
+async def update_source_xhs_post(input_data: dict, on_progress=None) -> dict:
+    """
+    Update a finished post after a small edit to its source.
+
+    The thread's analysis is kept and its latest draft is the starting
+    point: the analysis message is re-rendered with the new source, the
+    edited passages are sent as one message and the generator writes one
+    new draft (no critic rounds unless iterations > 0).
+
+    Args:
+        input_data: dict containing:
+            - thread_id: Thread of the post generated from the old source
+            - content: The edited source text
+            - changes: Edited passages from agents/preprocess.py diff_sources
+            - iterations: Critic-improve cycles after the update (default: 0)
+            - use_cache: Serve critic/formatting from the response cache (default: True)
+        on_progress: Optional callback receiving a progress event after every node
+
+    Returns:
+        dict with thread_id, final_post and metadata
+    """
+    thread_id = input_data.get("thread_id")
+    content = input_data.get("content", "")
+    use_cache = input_data.get("use_cache", True)
+    if not thread_id:
+        raise ValueError("thread_id is required for a source update")
+
+    logger.info(f"✏️ Updating conversation {thread_id} for an edited source")
+    workflow = await get_workflow()
+    config = {"configurable": {"thread_id": thread_id, "cache_bypass": not use_cache}}
+
+    snapshot = await workflow.aget_state(config)
+    if not snapshot.values or not snapshot.values.get("analysis"):
+        raise ValueError(f"Unknown or expired thread_id: {thread_id}")
+
+    # Same id, so the old analysis message (and the source in it) is replaced in place
+    analysis_message = next(m for m in snapshot.values["messages"] if isinstance(m, HumanMessage))
+    digest = build_digest(content, SOURCE_GENERATOR_MAX_CHARS)
+    update_state = {
+        "content": content,
+        "digest": digest,
+        "raw_source_in_history": False,
+        "messages": [
+            render_analysis_message(digest, snapshot.values["analysis"], analysis_message.id),
+            _source_update_message(input_data.get("changes", [])),
+        ],
+        "iteration": 0,
+        "max_iterations": input_data.get("iterations", 0),
+        "candidates": 1,
+        "budget": new_budget(thread_id, input_data.get("time_budget_s"), input_data.get("token_budget")),
+        "stop_reason": None,
+        "run_stats": {"run_id": str(uuid.uuid4()), "source_update": True},
+    }
+
+    start = time.perf_counter()
+    final_state, stream_stats = await _stream_workflow(workflow, update_state, config, on_progress)
+    log_conversation_flow(final_state.get("messages", []), "Source Update Flow")
+
+    final_post = f"{final_state['post'].title}\n\n{final_state['post'].body}"
+    return {
+        "thread_id": thread_id,
+        "final_post": final_post,
+        "metadata": {**_run_metadata(final_state, start), **stream_stats},
+    }
+
+
+async def refinement_xhs_post(input_data: dict, on_progress=None) -> dict:
     """
     Refine a post with user feedback.
 
@@ -80,15 +424,27 @@ async def refinement_xhs_post(input_data: dict) -> dict:
             - thread_id: Thread ID from previous generation
             - feedback: User feedback for refinement
             - iterations: Number of additional refinement cycles (default: 1)
+            - use_cache: Serve critic/formatting from the response cache (default: True)
+            - candidates: Parallel drafts for the first refined version, best
+              one kept (default: GENERATOR_CANDIDATES)
+            - time_budget_s / token_budget: Stop refinement loops early once
+              the run would exceed them (default: env, 0 = unlimited)
+        on_progress: Optional callback receiving a progress event after every
+            node, including the current draft after each generator step
 
     Returns:
         dict with:
             - thread_id: Same thread ID
             - final_post: The refined post
+            - metadata: Per-run stats (formatting path, latency saved,
+              time to first token and first draft, early-exit reason and
+              iterations skipped, duration)
     """
     thread_id = input_data.get("thread_id")
     feedback = input_data.get("feedback", "")
     iterations = input_data.get("iterations", 1)
+    use_cache = input_data.get("use_cache", True)
+    candidates = input_data.get("candidates")
 
     if not thread_id:
         raise ValueError("thread_id is required for continuation")
@@ -96,25 +452,35 @@ async def refinement_xhs_post(input_data: dict) -> dict:
     logger.info(f"🔄 Continuing conversation {thread_id}")
 
     # Get workflow
-    workflow = get_workflow()
+    workflow = await get_workflow()
 
     # Add user feedback as new message
     feedback_msg = HumanMessage(
-        content=f"User feedback: {feedback}\n\nPlease refine the post based on this feedback."
+        content=f"{USER_FEEDBACK_PREFIX} {feedback}\n\nPlease refine the post based on this feedback."
     )
 
     # Resume from checkpoint with new input
-    config = {"configurable": {"thread_id": thread_id}}
+    config = {"configurable": {"thread_id": thread_id, "cache_bypass": not use_cache}}
+
+    # Threads may have been evicted by the bounded checkpointer
+    snapshot = await workflow.aget_state(config)
+    if not snapshot.values:
+        raise ValueError(f"Unknown or expired thread_id: {thread_id}")
 
     # Update state with new message and iterations
     update_state = {
         "messages": [feedback_msg],
         "iteration": 0,  # Reset for new refinement cycles
         "max_iterations": iterations,
+        "candidates": candidates,
+        "budget": new_budget(thread_id, input_data.get("time_budget_s"), input_data.get("token_budget")),
+        "stop_reason": None,
+        "run_stats": {"run_id": str(uuid.uuid4())},
     }
 
     # Continue workflow from checkpoint
-    final_state = await workflow.ainvoke(update_state, config)
+    start = time.perf_counter()
+    final_state, stream_stats = await _stream_workflow(workflow, update_state, config, on_progress)
 
     # Log conversation flow (only in debug mode)
     log_conversation_flow(final_state.get("messages", []), "Refinement Flow")
@@ -124,5 +490,6 @@ async def refinement_xhs_post(input_data: dict) -> dict:
 
     return {
         "thread_id": thread_id,
-        "final_post": final_post
+        "final_post": final_post,
+        "metadata": {**_run_metadata(final_state, start), **stream_stats},
     }
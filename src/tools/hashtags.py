@@ -0,0 +1,45 @@
+"""Hashtag tools: suggest tags for a draft from the post history."""
+
+import logging
+import time
+from ..utils.hashtags import extract_hashtags
+from ..utils.post_index import get_post_index
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+
+async def suggest_hashtags(input_data: dict) -> dict:
+    """
+    Suggest hashtags for a draft, ranked from every earlier post's tags.
+
+    Uses the hashtag index over the post history (see src/utils/hashtags.py):
+    tags that earlier posts with the same terms used, and tags often used
+    together with the draft's own tags, rank first.
+
+    Args:
+        input_data: dict containing:
+            - text: Draft text (its own hashtags are not suggested again)
+            - limit: Maximum suggestions (default: 5)
+
+    Returns:
+        dict with:
+            - suggestions: Best first, each with tag, score and posts
+            - related: For each of the draft's tags, the tags most often
+              used with it
+            - index: posts, tags and terms in the hashtag index
+            - duration_ms: Ranking time
+    """
+    text = input_data.get("text") or ""
+    if not text.strip():
+        raise ValueError("text is required")
+    index = await get_post_index().hashtag_index()
+
+    start = time.perf_counter()
+    existing = extract_hashtags(text)
+    suggestions = index.rank(text, existing=existing, limit=input_data.get("limit") or 5)
+    related = {tag: index.related(tag) for tag in existing}
+    duration_ms = round((time.perf_counter() - start) * 1000, 3)
+
+    logger.info(f"🏷️ Suggested {len(suggestions)} hashtag(s) in {duration_ms}ms")
+    return {"suggestions": suggestions, "related": related, "index": index.stats(), "duration_ms": duration_ms}
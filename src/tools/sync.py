@@ -0,0 +1,222 @@
+"""Incremental sync: keep one post per source file, regenerating only what changed."""
+
+import asyncio
+import inspect
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from ..agents import get_workflow
+from ..agents.preprocess import diff_sources, paragraph_fingerprints
+from ..utils.paths import data_path
+from .batch import BATCH_CONCURRENCY, _expand_sources, load_source
+from .generator import generate_xhs_post, update_source_xhs_post
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Up to this fraction of changed characters, an edited source keeps its
+# analysis and latest draft and costs one generator call; above it the
+# post is generated from scratch
+SYNC_REUSE_THRESHOLD = float(os.environ.get("SYNC_REUSE_THRESHOLD", 0.15))
+
+# How often watch mode looks for changed files
+SYNC_POLL_SECONDS = float(os.environ.get("SYNC_POLL_SECONDS", 2))
+
+SYNC_MANIFEST_PATH = os.environ.get("SYNC_MANIFEST_PATH", "")
+
+
+def _manifest_path() -> Path:
+    return Path(SYNC_MANIFEST_PATH) if SYNC_MANIFEST_PATH else data_path("sync_manifest.json")
+
+
+def _load_manifest(path: Path) -> dict:
+    """Source path -> {mtime_ns, size, fingerprints, thread_id, synced_at}."""
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(path: Path, manifest: dict) -> None:
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False, indent=1), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+async def _thread_content(thread_id: str) -> str | None:
+    """Source text the thread's post was generated from (None if the thread is gone)."""
+    workflow = await get_workflow()
+    snapshot = await workflow.aget_state({"configurable": {"thread_id": thread_id}})
+    if not snapshot.values or not snapshot.values.get("analysis") or snapshot.next:
+        return None
+    return snapshot.values.get("content")
+
+
+async def _sync_item(index: int, item: dict, input_data: dict, manifest: dict, semaphore: asyncio.Semaphore) -> dict:
+    """Bring one source's post up to date; failures are captured in the result instead of raised."""
+    key = str(Path(item["source"]).resolve())
+    record = manifest.get(key)
+    force = input_data.get("force", False)
+    result = {"index": index, "source": item["source"]}
+    try:
+        stat = item["path"].stat()
+        # Untouched file: not even read
+        if record and not force and (record["mtime_ns"], record["size"]) == (stat.st_mtime_ns, stat.st_size):
+            return {**result, "status": "unchanged", "thread_id": record["thread_id"]}
+
+        content = await load_source(item, input_data.get("use_cache", True))
+        if not content.strip():
+            raise ValueError("source is empty")
+        fingerprints = paragraph_fingerprints(content)
+        new_record = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "fingerprints": fingerprints}
+
+        # Touched but not edited (or whitespace-only edits)
+        if record and not force and record["fingerprints"] == fingerprints:
+            manifest[key] = {**record, **new_record}
+            return {**result, "status": "unchanged", "thread_id": record["thread_id"]}
+
+        old_content = await _thread_content(record["thread_id"]) if record and not force else None
+        if record and not force and old_content is None:
+            # Typically in-memory checkpoints lost on restart, while the manifest is on disk
+            logger.warning(
+                f"⚠️ Thread {record['thread_id']} of {item['source']} has no finished post, generating a new one "
+                "(use CHECKPOINT_BACKEND=sqlite to keep threads across restarts)"
+            )
+            result["lost_thread_id"] = record["thread_id"]
+        diff = diff_sources(old_content, content) if old_content is not None else None
+        threshold = input_data.get("threshold")
+        threshold = SYNC_REUSE_THRESHOLD if threshold is None else threshold
+
+        async with semaphore:
+            if diff is not None and diff["ratio"] <= threshold:
+                logger.info(f"🔂 {item['source']} changed {diff['ratio']:.1%}, updating the existing post")
+                post = await update_source_xhs_post({
+                    "thread_id": record["thread_id"],
+                    "content": content,
+                    "changes": diff["changes"],
+                    "use_cache": input_data.get("use_cache", True),
+                })
+                status = "updated"
+            else:
+                if diff is not None:
+                    logger.info(f"🆕 {item['source']} changed {diff['ratio']:.1%}, generating a new post")
+                post = await generate_xhs_post({
+                    "content": content,
+                    "iterations": input_data.get("iterations", 2),
+                    "use_cache": input_data.get("use_cache", True),
+                    "candidates": input_data.get("candidates"),
+                })
+                status = "generated"
+
+        manifest[key] = {**new_record, "thread_id": post["thread_id"], "synced_at": time.time()}
+        result.update(status=status, change_ratio=diff["ratio"] if diff else None, **post)
+    except Exception as e:
+        logger.warning(f"⚠️ Sync of {item['source']} failed: {e}")
+        result.update(status="error", error=f"{type(e).__name__}: {e}")
+    return result
+
+
+async def sync_xhs_posts(input_data: dict, on_result=None) -> dict:
+    """
+    Keep one post per source file up to date (one sync pass).
+
+    A manifest in the data directory records, per file, its mtime/size,
+    paragraph fingerprints (agents/preprocess.py) and the thread of its
+    post. On each pass:
+      - unchanged files (same mtime and size, or same fingerprints) are
+        skipped without any LLM call
+      - files edited by at most `threshold` of their characters keep their
+        thread: the cached analysis is reused and the latest draft is
+        updated with one generator call (update_source_xhs_post)
+      - new files, bigger edits and threads that no longer exist get a
+        full generate_xhs_post run on a new thread
+
+    Threads live in the checkpointer, so cheap updates across restarts need
+    CHECKPOINT_BACKEND=sqlite; with in-memory checkpoints every edited file
+    is generated again after a restart (reported with lost_thread_id).
+
+    Args:
+        input_data: dict containing:
+            - paths: Source files
+            - directory: Directory whose files are all sources (e.g. "topic")
+            - iterations: Critic-improve cycles for full generations (default: 2)
+            - threshold: Largest change ratio handled incrementally (default: SYNC_REUSE_THRESHOLD)
+            - force: Regenerate every source from scratch (default: False)
+            - concurrency: Maximum workflows in flight (default: BATCH_CONCURRENCY)
+            - use_cache / candidates: As for generate_xhs_post
+        on_result: Optional callback (sync or async) called with each result
+            that isn't "unchanged", as soon as it finishes
+
+    Returns:
+        dict with:
+            - results: Per-source results in input order, each with index,
+              source, status ("unchanged", "updated", "generated" or
+              "error"), duration_ms, thread_id and, unless unchanged,
+              final_post, metadata and change_ratio (or error), plus
+              lost_thread_id when the previous post's thread was gone
+            - unchanged / updated / generated / failed: Counts
+            - duration_ms: Wall-clock time for the whole pass
+    """
+    items = [item for item in _expand_sources(input_data) if "path" in item]
+    semaphore = asyncio.Semaphore(max(1, input_data.get("concurrency") or BATCH_CONCURRENCY))
+    manifest_path = _manifest_path()
+    manifest = await asyncio.to_thread(_load_manifest, manifest_path)
+    start = time.perf_counter()
+
+    async def run(index: int, item: dict) -> dict:
+        item_start = time.perf_counter()
+        result = await _sync_item(index, item, input_data, manifest, semaphore)
+        result["duration_ms"] = round((time.perf_counter() - item_start) * 1000, 1)
+        if result["status"] != "unchanged" and on_result is not None:
+            callback = on_result(result)
+            if inspect.isawaitable(callback):
+                await callback
+        return result
+
+    results = await asyncio.gather(*(run(i, item) for i, item in enumerate(items)))
+    await asyncio.to_thread(_save_manifest, manifest_path, manifest)
+
+    counts = {status: 0 for status in ("unchanged", "updated", "generated", "error")}
+    for result in results:
+        counts[result["status"]] += 1
+    return {
+        "results": list(results),
+        "unchanged": counts["unchanged"],
+        "updated": counts["updated"],
+        "generated": counts["generated"],
+        "failed": counts["error"],
+        "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
+
+
+async def watch_xhs_posts(input_data: dict, on_result=None, duration_s: float | None = None) -> dict:
+    """
+    Run sync passes every SYNC_POLL_SECONDS until duration_s has passed.
+
+    Only files whose mtime or size changed are read on each pass, so an
+    idle watch costs one stat() per file per poll.
+
+    Args:
+        input_data: As for sync_xhs_posts (plus optional poll_seconds)
+        on_result: Optional callback for every result that isn't "unchanged"
+        duration_s: How long to watch (None = until cancelled)
+
+    Returns:
+        dict with passes, the results that changed something (in completion
+        order) and unchanged (sources of the last pass unchanged in every pass)
+    """
+    poll = input_data.get("poll_seconds") or SYNC_POLL_SECONDS
+    deadline = None if duration_s is None else time.monotonic() + duration_s
+    changed = []
+    passes = 0
+    while True:
+        summary = await sync_xhs_posts(input_data, on_result)
+        passes += 1
+        changed.extend(r for r in summary["results"] if r["status"] != "unchanged")
+        if deadline is not None and time.monotonic() + poll > deadline:
+            changed_sources = {r["source"] for r in changed}
+            unchanged = sum(1 for r in summary["results"] if r["source"] not in changed_sources)
+            return {"passes": passes, "results": changed, "unchanged": unchanged}
+        await asyncio.sleep(poll)
@@ -0,0 +1,56 @@
+"""Variety tools: look up earlier posts similar to a draft or a thread's post."""
+
+import logging
+import time
+from ..utils.post_index import get_post_index
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+
+async def find_similar_posts(input_data: dict) -> dict:
+    """
+    Find historical posts similar to a text or to a thread's final post.
+
+    Uses the MinHash/LSH post index filled by the workflow's variety check,
+    so a lookup reads only the posts sharing an LSH band with the query.
+
+    Args:
+        input_data: dict containing:
+            - text: Post (or draft) text to look up, title on the first line
+            - thread_id: Alternatively, look up the final post of this thread
+            - threshold: Minimum estimated similarity, 0-1 (default: VARIETY_THRESHOLD)
+            - limit: Maximum matches (default: 10)
+
+    Returns:
+        dict with:
+            - matches: Most similar first, each with thread_id, title,
+              similarity and created_at
+            - candidates: Posts whose signatures were compared
+            - duration_ms: Lookup time
+    """
+    text = input_data.get("text")
+    thread_id = input_data.get("thread_id")
+    index = get_post_index()
+
+    start = time.perf_counter()
+    if thread_id:
+        post = await index.get(thread_id)
+        if post is None:
+            raise ValueError(f"No indexed post for thread_id: {thread_id}")
+        title, body = post["title"], post["body"]
+    elif text:
+        title, _, body = text.partition("\n")
+    else:
+        raise ValueError("Pass text or thread_id")
+
+    result = await index.find_similar(
+        title,
+        body,
+        threshold=input_data.get("threshold"),
+        limit=input_data.get("limit") or 10,
+        exclude_thread_id=thread_id,
+    )
+    result["duration_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    logger.info(f"👯 {len(result['matches'])} similar post(s) among {result['candidates']} candidates")
+    return result
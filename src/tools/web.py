@@ -0,0 +1,181 @@
+"""Web page fetching: concurrent downloads with HTTP caching, extracted to normalized text."""
+
+import asyncio
+import logging
+import os
+import time
+from urllib.parse import urlsplit
+import httpx
+from ..utils.cache import DiskCache, make_cache_key
+from ..utils.extractors import EXTRACTOR_VERSION, detect_type, extract_bytes
+from ..utils.paths import DATA_DIR
+from .extract import EXTRACT_MAX_CHARS, run_extraction
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Responses larger than this are rejected (checked while downloading)
+WEB_MAX_BYTES = int(os.environ.get("WEB_MAX_BYTES", 10 * 1024 * 1024))
+WEB_TIMEOUT_SECONDS = float(os.environ.get("WEB_TIMEOUT_SECONDS", 20))
+WEB_MAX_CONNECTIONS = int(os.environ.get("WEB_MAX_CONNECTIONS", 20))
+WEB_USER_AGENT = os.environ.get("WEB_USER_AGENT", "Mozilla/5.0 (compatible; xhs-assistant/0.1)")
+
+# Remember ETag/Last-Modified and the extracted text of every page, so a
+# refetch is a conditional GET that usually ends with 304 Not Modified
+WEB_CACHE_ENABLED = os.environ.get("WEB_CACHE", "true").lower() == "true"
+WEB_CACHE_TTL_SECONDS = float(os.environ.get("WEB_CACHE_TTL_SECONDS", 30 * 24 * 3600))
+
+_web_client: httpx.AsyncClient | None = None
+_web_cache = DiskCache(DATA_DIR / "web_cache")
+
+
+def get_web_client() -> httpx.AsyncClient:
+    """Shared httpx.AsyncClient (keep-alive pool) for every page fetch."""
+    global _web_client
+    if _web_client is None:
+        _web_client = httpx.AsyncClient(
+            follow_redirects=True,
+            headers={"User-Agent": WEB_USER_AGENT},
+            limits=httpx.Limits(
+                max_connections=WEB_MAX_CONNECTIONS,
+                max_keepalive_connections=WEB_MAX_CONNECTIONS,
+            ),
+            timeout=httpx.Timeout(WEB_TIMEOUT_SECONDS, connect=10.0),
+        )
+    return _web_client
+
+
+async def close_web_client() -> None:
+    """Close the shared page-fetch client (a new one is created on next use)."""
+    global _web_client
+    if _web_client is not None:
+        await _web_client.aclose()
+        _web_client = None
+
+
+async def _download(response: httpx.Response) -> bytes:
+    """Read a streamed body, failing as soon as it exceeds WEB_MAX_BYTES."""
+    length = response.headers.get("content-length")
+    if length and length.isdigit() and int(length) > WEB_MAX_BYTES:
+        raise ValueError(f"response is {length} bytes, over the {WEB_MAX_BYTES} byte limit")
+    chunks = []
+    size = 0
+    async for chunk in response.aiter_bytes():
+        size += len(chunk)
+        if size > WEB_MAX_BYTES:
+            raise ValueError(f"response exceeds the {WEB_MAX_BYTES} byte limit")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+async def fetch_webpage(input_data: dict) -> dict:
+    """
+    Fetch a URL and extract its text for post generation.
+
+    HTML pages keep their main content (see src/utils/extractors.py); PDF
+    and Markdown URLs are extracted like files. With the cache enabled, a
+    page fetched before is requested with If-None-Match / If-Modified-Since
+    and a 304 answer reuses the stored text without downloading or parsing.
+
+    Args:
+        input_data: dict containing:
+            - url: http(s) URL to fetch
+            - use_cache: Revalidate a cached copy instead of refetching (default: True)
+            - max_chars: Text to keep (default: EXTRACT_MAX_CHARS)
+
+    Returns:
+        dict with:
+            - source: The URL
+            - title: Page title ("" if none was found)
+            - content: Normalized text, ready for generate_xhs_post
+            - metadata: type, final_url, status, bytes, chars, truncated,
+              cache ("miss", "revalidated" or "disabled") and duration_ms
+    """
+    url = (input_data.get("url") or "").strip()
+    if urlsplit(url).scheme not in ("http", "https") or not urlsplit(url).netloc:
+        raise ValueError(f"Not an http(s) URL: {url!r}")
+    use_cache = WEB_CACHE_ENABLED and input_data.get("use_cache", True)
+    max_chars = input_data.get("max_chars") or EXTRACT_MAX_CHARS
+
+    start = time.perf_counter()
+    key = make_cache_key(url=url, max_chars=max_chars, extractor=EXTRACTOR_VERSION)
+    cached = await _web_cache.get(key) if use_cache else None
+    headers = {}
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    async with get_web_client().stream("GET", url, headers=headers) as response:
+        if response.status_code == 304 and cached:
+            logger.info(f"🌐 {url} not modified, using cached text")
+            result, cache_state = cached["result"], "revalidated"
+        else:
+            response.raise_for_status()
+            body = await _download(response)
+            kind = detect_type(str(response.url), response.headers.get("content-type", ""))
+            extracted = await run_extraction(
+                extract_bytes, body, kind, response.charset_encoding, max_chars, size=len(body)
+            )
+            result = {
+                **extracted,
+                "final_url": str(response.url),
+                "status": response.status_code,
+                "bytes": len(body),
+            }
+            cache_state = "miss" if use_cache else "disabled"
+            etag, last_modified = response.headers.get("etag"), response.headers.get("last-modified")
+            if use_cache and (etag or last_modified):
+                await _web_cache.set(
+                    key, {"etag": etag, "last_modified": last_modified, "result": result}, WEB_CACHE_TTL_SECONDS
+                )
+            logger.info(f"🌐 Fetched {url}: {len(body)} bytes → {extracted['chars']} chars ({kind})")
+
+    metadata = {k: v for k, v in result.items() if k not in ("title", "content")}
+    metadata.update(cache=cache_state, duration_ms=round((time.perf_counter() - start) * 1000, 1))
+    return {"source": url, "title": result["title"], "content": result["content"], "metadata": metadata}
+
+
+async def _fetch_item(index: int, url: str, input_data: dict) -> dict:
+    """Fetch one URL of a batch; failures are captured in the result instead of raised."""
+    try:
+        page = await fetch_webpage({**input_data, "url": url})
+        return {"index": index, "status": "ok", **page}
+    except Exception as e:
+        logger.warning(f"⚠️ Fetching {url} failed: {e}")
+        return {"index": index, "source": url, "status": "error", "error": f"{type(e).__name__}: {e}"}
+
+
+async def fetch_webpages(input_data: dict) -> dict:
+    """
+    Fetch many URLs concurrently over the shared connection pool.
+
+    All requests start at once; the pool (WEB_MAX_CONNECTIONS) bounds how
+    many are on the wire, and parsing runs off the event loop, so a batch
+    takes about as long as its slowest download.
+
+    Args:
+        input_data: dict containing:
+            - urls: URLs to fetch
+            - use_cache / max_chars: As for fetch_webpage
+
+    Returns:
+        dict with:
+            - results: Per-URL results in input order, each with index,
+              source, status ("ok"/"error") and either title/content/metadata
+              or error
+            - succeeded / failed: Counts
+            - duration_ms: Wall-clock time for the whole batch
+    """
+    urls = input_data.get("urls", [])
+    options = {k: v for k, v in input_data.items() if k != "urls"}
+    start = time.perf_counter()
+    results = await asyncio.gather(*(_fetch_item(i, url, options) for i, url in enumerate(urls)))
+    succeeded = sum(1 for r in results if r["status"] == "ok")
+    return {
+        "results": list(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
@@ -1,5 +1,6 @@
 """Utility functions."""
 
 from .logging_config import setup_logging, log_conversation_flow
+from .paths import DATA_DIR, data_path
 
-__all__ = ["setup_logging", "log_conversation_flow"]
+__all__ = ["setup_logging", "log_conversation_flow", "DATA_DIR", "data_path"]
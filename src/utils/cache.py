@@ -0,0 +1,280 @@
+"""Content-addressed response cache for deterministic LLM calls."""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from .paths import DATA_DIR
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Configuration
+LLM_CACHE_ENABLED = os.environ.get("LLM_CACHE", "true").lower() == "true"
+LLM_CACHE_TTL_SECONDS = float(os.environ.get("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", 1024))
+LLM_CACHE_DISK = os.environ.get("LLM_CACHE_DISK", "true").lower() == "true"
+# Budget of the disk tier; the least recently used files go first
+LLM_CACHE_DISK_MAX_ENTRIES = int(os.environ.get("LLM_CACHE_DISK_MAX_ENTRIES", 20000))
+LLM_CACHE_DISK_MAX_BYTES = int(os.environ.get("LLM_CACHE_DISK_MAX_BYTES", 512 * 1024 * 1024))
+
+
+def make_cache_key(**parts) -> str:
+    """
+    Hash the parts that fully determine an LLM response.
+
+    Args:
+        **parts: JSON-serializable values (model, provider, prompt version,
+            schema, input, ...)
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class MemoryCache:
+    """LRU cache tier held in process memory."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, object]] = OrderedDict()
+
+    async def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value, ttl_seconds: float) -> None:
+        self._entries[key] = (time.time() + ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskCache:
+    """
+    On-disk cache tier: one JSON file per key, sharded by key prefix.
+
+    Holds at most max_entries files and max_bytes. A file's mtime is its
+    last use (hits refresh it). The directory is scanned on the first
+    write, which also accounts for files left by earlier runs, and again
+    whenever a write goes over budget; each scan deletes the least recently
+    used files down to 90% of the budget.
+
+    Args:
+        directory: Cache directory
+        max_entries: Maximum number of files (None = unlimited)
+        max_bytes: Maximum total file size (None = unlimited)
+    """
+
+    name = "disk"
+
+    def __init__(self, directory: Path, max_entries: int | None = None, max_bytes: int | None = None):
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # Totals as of the last scan plus this process's writes since
+        # (files deleted elsewhere are only noticed by the next scan)
+        self._entries: int | None = None
+        self._bytes = 0
+        self._pruned = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _over_budget(self) -> bool:
+        return (
+            (self.max_entries is not None and self._entries > self.max_entries)
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        )
+
+    def _prune(self) -> None:
+        """Rescan the directory and delete the least recently used files down to 90% of the budget (holding _lock)."""
+        files = []
+        for path in self.directory.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        files.sort(key=lambda f: f[0])
+        entries, size = len(files), sum(f[1] for f in files)
+        max_entries = int(self.max_entries * 0.9) if self.max_entries is not None else None
+        max_bytes = int(self.max_bytes * 0.9) if self.max_bytes is not None else None
+
+        pruned = 0
+        for _, file_size, path in files:
+            if (max_entries is None or entries <= max_entries) and (max_bytes is None or size <= max_bytes):
+                break
+            path.unlink(missing_ok=True)
+            entries -= 1
+            size -= file_size
+            pruned += 1
+        self._entries, self._bytes = entries, size
+        if pruned:
+            self._pruned += pruned
+            logger.info(f"🧹 Pruned {pruned} least recently used disk cache entries")
+
+    def _read(self, key: str):
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if entry["expires_at"] < time.time():
+            path.unlink(missing_ok=True)
+            return None
+        try:
+            # Mark as recently used for pruning
+            os.utime(path)
+        except OSError:
+            pass
+        return entry["value"]
+
+    def _write(self, key: str, value, ttl_seconds: float) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        entry = {"expires_at": time.time() + ttl_seconds, "value": value}
+        data = json.dumps(entry, ensure_ascii=False).encode("utf-8")
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(data)
+        with self._lock:
+            if self._entries is None:
+                self._prune()
+            try:
+                replaced = path.stat().st_size
+            except OSError:
+                replaced = None
+            os.replace(tmp, path)
+            if replaced is None:
+                self._entries += 1
+                self._bytes += len(data)
+            else:
+                self._bytes += len(data) - replaced
+            if self._over_budget():
+                self._prune()
+
+    def stats(self) -> dict:
+        """
+        Report the disk tier's size.
+
+        Returns:
+            dict with entries and bytes (None before the first write),
+            limits and files pruned
+        """
+        return {
+            "entries": self._entries,
+            "bytes": self._bytes if self._entries is not None else None,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "pruned": self._pruned,
+        }
+
+    async def get(self, key: str):
+        return await asyncio.to_thread(self._read, key)
+
+    async def set(self, key: str, value, ttl_seconds: float) -> None:
+        try:
+            await asyncio.to_thread(self._write, key, value, ttl_seconds)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not write cache entry {key[:12]}: {e}")
+
+
+class ResponseCache:
+    """
+    Tiered cache for JSON-serializable LLM responses.
+
+    Lookups go through the tiers in order (e.g. memory, then disk); a hit in
+    a slower tier is promoted to the faster ones. Tiers are any objects with
+    async get(key) and set(key, value, ttl_seconds) methods.
+
+    Args:
+        tiers: Cache tiers, fastest first
+        ttl_seconds: Default time-to-live for new entries
+    """
+
+    def __init__(self, tiers: list, ttl_seconds: float = LLM_CACHE_TTL_SECONDS):
+        self.tiers = tiers
+        self.ttl_seconds = ttl_seconds
+        self._hits = {tier.name: 0 for tier in tiers}
+        self._misses = 0
+
+    async def get(self, key: str):
+        """Return the cached value for key, or None."""
+        for i, tier in enumerate(self.tiers):
+            value = await tier.get(key)
+            if value is not None:
+                self._hits[tier.name] += 1
+                for faster in self.tiers[:i]:
+                    await faster.set(key, value, self.ttl_seconds)
+                return value
+        self._misses += 1
+        return None
+
+    async def set(self, key: str, value, ttl_seconds: float | None = None) -> None:
+        """Store value in every tier."""
+        for tier in self.tiers:
+            await tier.set(key, value, ttl_seconds or self.ttl_seconds)
+
+    def stats(self) -> dict:
+        """
+        Report hit/miss counters.
+
+        Returns:
+            dict with hits per tier, misses, hit rate and the stats of
+            tiers that report them (e.g. "disk")
+        """
+        hits = sum(self._hits.values())
+        lookups = hits + self._misses
+        return {
+            "hits": dict(self._hits),
+            "misses": self._misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            **{tier.name: tier.stats() for tier in self.tiers if hasattr(tier, "stats")},
+        }
+
+
+def _default_cache() -> ResponseCache | None:
+    if not LLM_CACHE_ENABLED:
+        return None
+    tiers = [MemoryCache(LLM_CACHE_MAX_ENTRIES)]
+    if LLM_CACHE_DISK:
+        tiers.append(DiskCache(
+            DATA_DIR / "llm_cache",
+            max_entries=LLM_CACHE_DISK_MAX_ENTRIES or None,
+            max_bytes=LLM_CACHE_DISK_MAX_BYTES or None,
+        ))
+    return ResponseCache(tiers)
+
+
+_response_cache = _default_cache()
+
+
+def get_response_cache() -> ResponseCache | None:
+    """Get the process-wide response cache (None when disabled)."""
+    return _response_cache
+
+
+def set_response_cache(cache: ResponseCache | None) -> None:
+    """Replace the process-wide response cache (None disables caching)."""
+    global _response_cache
+    _response_cache = cache
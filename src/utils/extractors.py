@@ -0,0 +1,377 @@
+"""
+Text extraction for source documents (HTML, Markdown, PDF, plain text).
+
+Every function here is pure CPU work with no heavy imports, so it can run
+in a worker process (see src/tools/extract.py). Output is normalized text
+ready for analyze_node: NFC, no markup, headings kept as "# " lines and
+paragraphs separated by blank lines (which agents/preprocess.py relies on).
+"""
+
+import io
+import re
+import unicodedata
+from html.parser import HTMLParser
+from pathlib import Path
+
+# Bump when extraction output changes, so cached results are not reused
+EXTRACTOR_VERSION = 1
+
+PDF_SUFFIXES = {".pdf"}
+MARKDOWN_SUFFIXES = {".md", ".markdown", ".mdx"}
+HTML_SUFFIXES = {".html", ".htm"}
+
+_SPACES = re.compile(r"[ \t\u00a0\u3000\u200b]+")
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+# Markdown inline syntax
+_MD_IMAGE = re.compile(r"!\[([^\]]*)\]\([^)]*\)")
+_MD_LINK = re.compile(r"\[([^\]]+)\]\([^)]*\)")
+_MD_REF_LINK = re.compile(r"\[([^\]]+)\]\[[^\]]*\]")
+_MD_EMPHASIS = re.compile(r"(\*\*|__|~~)(.+?)\1|(?<![\w*])\*(?!\s)(.+?)(?<!\s)\*(?![\w*])")
+_MD_CODE = re.compile(r"`([^`]+)`")
+_MD_HTML_TAG = re.compile(r"</?[a-zA-Z][^>]*>")
+_MD_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_MD_FENCE = re.compile(r"^\s*(```|~~~)")
+_MD_QUOTE = re.compile(r"^\s*(>\s?)+")
+_MD_RULE = re.compile(r"^\s*([-*_])(\s*\1){2,}\s*$")
+_MD_TABLE_RULE = re.compile(r"^\s*\|?\s*:?-{3,}:?\s*(\|\s*:?-{3,}:?\s*)*\|?\s*$")
+_MD_REF_DEFINITION = re.compile(r"^\s*\[[^\]]+\]:\s+\S+")
+
+
+def normalize_text(text: str, max_chars: int | None = None) -> tuple[str, bool]:
+    """
+    Normalize extracted text for the workflow.
+
+    NFC-normalizes, collapses runs of spaces (including full-width and
+    non-breaking ones) after a line's indentation, strips line ends and
+    keeps at most one blank line between paragraphs.
+
+    Args:
+        text: Extracted text
+        max_chars: Cut the result at this length, at a paragraph or line
+            break when possible (None = no limit)
+
+    Returns:
+        Tuple of (normalized text, whether it was truncated)
+    """
+    text = unicodedata.normalize("NFC", text.replace("\r\n", "\n").replace("\r", "\n"))
+    lines = []
+    for line in text.split("\n"):
+        # Leading indentation is kept for code
+        body = line.lstrip(" \t")
+        lines.append(line[:len(line) - len(body)] + _SPACES.sub(" ", body).rstrip())
+    text = _BLANK_LINES.sub("\n\n", "\n".join(lines)).strip()
+    if max_chars is None or len(text) <= max_chars:
+        return text, False
+    cut = text.rfind("\n", max_chars // 2, max_chars)
+    return text[:cut if cut > 0 else max_chars].rstrip(), True
+
+
+# ----------------------------------------------------------------------
+# HTML
+# ----------------------------------------------------------------------
+
+_SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "canvas", "iframe", "form",
+              "nav", "header", "footer", "aside", "button", "select"}
+_VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+_BLOCK_TAGS = {"p", "div", "section", "article", "main", "ul", "ol", "table", "blockquote",
+               "pre", "figure", "figcaption", "dl", "h1", "h2", "h3", "h4", "h5", "h6"}
+# Start a new line, but not a new paragraph
+_LINE_TAGS = {"li", "tr", "dt", "dd"}
+_MAIN_TAGS = {"article", "main"}
+
+
+class _HTMLTextParser(HTMLParser):
+    """Collect visible text, the <title> and the text inside <article>/<main>."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ""
+        self.og_title = ""
+        self.parts: list[str] = []
+        self.main_parts: list[str] = []
+        self._skip = 0
+        self._main = 0
+        self._pre = 0
+        self._in_title = False
+        self._line_start = True
+
+    def _emit(self, text: str) -> None:
+        self.parts.append(text)
+        if self._main:
+            self.main_parts.append(text)
+        self._line_start = text.endswith("\n")
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _VOID_TAGS:
+            if tag == "br" and not self._skip:
+                self._emit("\n")
+            elif tag == "meta":
+                attrs = dict(attrs)
+                if attrs.get("property") == "og:title" and attrs.get("content"):
+                    self.og_title = attrs["content"]
+            return
+        if tag in _SKIP_TAGS:
+            self._skip += 1
+        elif tag == "title":
+            self._in_title = True
+        elif not self._skip:
+            if tag in _MAIN_TAGS:
+                self._main += 1
+            elif tag == "pre":
+                self._pre += 1
+            if tag in _BLOCK_TAGS:
+                self._emit("\n\n")
+            elif tag in _LINE_TAGS:
+                self._emit("\n")
+            if tag[0] == "h" and tag[1:].isdigit():
+                self._emit("#" * int(tag[1:]) + " ")
+            elif tag == "li":
+                self._emit("- ")
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS:
+            self._skip = max(0, self._skip - 1)
+        elif tag == "title":
+            self._in_title = False
+        elif not self._skip:
+            if tag in _BLOCK_TAGS:
+                self._emit("\n\n")
+            if tag in _MAIN_TAGS:
+                self._main = max(0, self._main - 1)
+            elif tag == "pre":
+                self._pre = max(0, self._pre - 1)
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self._skip:
+            if not self._pre:
+                # Source line breaks and indentation are layout, not content
+                data = data.replace("\n", " ")
+                if self._line_start:
+                    data = data.lstrip()
+            if data:
+                self._emit(data)
+
+
+def html_to_text(html: str) -> dict:
+    """
+    Extract the readable text of an HTML page.
+
+    Scripts, styles, navigation, headers, footers, sidebars and forms are
+    dropped. When the page marks its content with <article> or <main>, only
+    that part is kept.
+
+    Returns:
+        dict with title and text (not yet normalized)
+    """
+    parser = _HTMLTextParser()
+    parser.feed(html)
+    parser.close()
+    main = "".join(parser.main_parts)
+    text = main if main.strip() else "".join(parser.parts)
+    title = parser.og_title or parser.title
+    return {"title": _SPACES.sub(" ", title).strip(), "text": text}
+
+
+# ----------------------------------------------------------------------
+# Markdown
+# ----------------------------------------------------------------------
+
+def _markdown_inline(line: str) -> str:
+    line = _MD_IMAGE.sub(r"\1", line)
+    line = _MD_LINK.sub(r"\1", line)
+    line = _MD_REF_LINK.sub(r"\1", line)
+    line = _MD_CODE.sub(r"\1", line)
+    line = _MD_EMPHASIS.sub(lambda m: m.group(2) or m.group(3), line)
+    return _MD_HTML_TAG.sub("", line)
+
+
+def markdown_to_text(lines, max_chars: int | None = None) -> dict:
+    """
+    Convert Markdown to plain text, one line at a time.
+
+    Front matter, link targets, image URLs, emphasis markers, inline HTML,
+    rules and table separators are removed. Headings stay as "# " lines,
+    list markers stay, code blocks are kept verbatim without their fences.
+    Reading stops once max_chars of text were produced, so a huge file is
+    never read completely.
+
+    Args:
+        lines: Iterable of lines (e.g. an open file)
+        max_chars: Stop after about this many characters (None = no limit)
+
+    Returns:
+        dict with title (the first heading), text and truncated
+    """
+    out: list[str] = []
+    size = 0
+    title = ""
+    in_code = False
+    in_front_matter = False
+    truncated = False
+
+    for number, line in enumerate(lines):
+        line = line.rstrip("\r\n")
+        if number == 0 and line.strip() == "---":
+            in_front_matter = True
+            continue
+        if in_front_matter:
+            in_front_matter = line.strip() not in ("---", "...")
+            continue
+
+        if _MD_FENCE.match(line):
+            in_code = not in_code
+            line = ""
+        elif not in_code:
+            if _MD_RULE.match(line) or _MD_TABLE_RULE.match(line) or _MD_REF_DEFINITION.match(line):
+                continue
+            line = _MD_QUOTE.sub("", line)
+            if heading := _MD_HEADING.match(line):
+                text = _markdown_inline(heading.group(2))
+                title = title or text
+                line = f"\n{heading.group(1)} {text}\n"
+            else:
+                line = _markdown_inline(line)
+                if line.lstrip().startswith("|"):
+                    line = " ".join(cell.strip() for cell in line.strip().strip("|").split("|"))
+
+        out.append(line)
+        size += len(line) + 1
+        if max_chars is not None and size > max_chars:
+            truncated = True
+            break
+
+    return {"title": title, "text": "\n".join(out), "truncated": truncated}
+
+
+# ----------------------------------------------------------------------
+# PDF
+# ----------------------------------------------------------------------
+
+def pdf_to_text(source, max_chars: int | None = None) -> dict:
+    """
+    Extract text from a PDF page by page (needs the optional pypdf package).
+
+    Pages are parsed lazily and reading stops once max_chars are reached,
+    so only the pages that are used get decoded.
+
+    Args:
+        source: File path or bytes
+        max_chars: Stop after about this many characters (None = no limit)
+
+    Returns:
+        dict with title, text, pages (total) and pages_read, truncated
+    """
+    try:
+        from pypdf import PdfReader
+    except ImportError as e:
+        raise ImportError("PDF extraction needs the optional 'pypdf' package (pip install pypdf)") from e
+
+    reader = PdfReader(io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else str(source))
+    title = ""
+    if reader.metadata is not None and reader.metadata.title:
+        title = str(reader.metadata.title)
+
+    parts: list[str] = []
+    size = 0
+    truncated = False
+    pages_read = 0
+    for page in reader.pages:
+        text = page.extract_text() or ""
+        pages_read += 1
+        parts.append(text)
+        size += len(text) + 2
+        if max_chars is not None and size > max_chars:
+            truncated = pages_read < len(reader.pages)
+            break
+
+    return {
+        "title": title,
+        "text": "\n\n".join(parts),
+        "pages": len(reader.pages),
+        "pages_read": pages_read,
+        "truncated": truncated,
+    }
+
+
+# ----------------------------------------------------------------------
+# Entry points (run in a worker process)
+# ----------------------------------------------------------------------
+
+def _finish(result: dict, kind: str, max_chars: int | None) -> dict:
+    text, cut = normalize_text(result.pop("text"), max_chars)
+    return {
+        **result,
+        "type": kind,
+        "content": text,
+        "chars": len(text),
+        "truncated": result.get("truncated", False) or cut,
+    }
+
+
+def detect_type(name: str = "", content_type: str = "") -> str:
+    """Source type ("pdf", "markdown", "html" or "text") from a file name/URL and a MIME type."""
+    content_type = content_type.split(";")[0].strip().lower()
+    suffix = Path(name.split("?")[0].split("#")[0]).suffix.lower()
+    if content_type == "application/pdf" or suffix in PDF_SUFFIXES:
+        return "pdf"
+    if content_type in ("text/markdown", "text/x-markdown") or suffix in MARKDOWN_SUFFIXES:
+        return "markdown"
+    if content_type in ("text/html", "application/xhtml+xml") or suffix in HTML_SUFFIXES:
+        return "html"
+    return "text"
+
+
+def extract_file(path: str, max_chars: int | None = None) -> dict:
+    """
+    Extract normalized text from a file, streaming where the format allows.
+
+    Args:
+        path: File path; the type is picked by suffix
+        max_chars: Maximum characters of text to return (None = no limit)
+
+    Returns:
+        dict with title, content, type, chars and truncated (plus pages and
+        pages_read for PDFs)
+    """
+    kind = detect_type(path)
+    if kind == "pdf":
+        return _finish(pdf_to_text(path, max_chars), kind, max_chars)
+    with open(path, encoding="utf-8", errors="replace") as f:
+        if kind == "markdown":
+            return _finish(markdown_to_text(f, max_chars), kind, max_chars)
+        if kind == "html":
+            # Parsed whole: markup, scripts and styles can take up any share
+            # of the file, so the limit applies to the extracted text
+            text = f.read()
+        else:
+            # Read a little past the limit so normalization has whole lines to cut at
+            text = f.read() if max_chars is None else f.read(max_chars * 2)
+    if kind == "html":
+        return _finish(html_to_text(text), kind, max_chars)
+    return _finish({"title": "", "text": text}, kind, max_chars)
+
+
+def extract_bytes(data: bytes, kind: str, encoding: str | None = None, max_chars: int | None = None) -> dict:
+    """
+    Extract normalized text from a downloaded document.
+
+    Args:
+        data: Response body
+        kind: Source type from detect_type
+        encoding: Charset from the response headers (default: UTF-8)
+        max_chars: Maximum characters of text to return (None = no limit)
+
+    Returns:
+        Same dict as extract_file
+    """
+    if kind == "pdf":
+        return _finish(pdf_to_text(data, max_chars), kind, max_chars)
+    text = data.decode(encoding or "utf-8", errors="replace")
+    if kind == "markdown":
+        return _finish(markdown_to_text(io.StringIO(text), max_chars), kind, max_chars)
+    if kind == "html":
+        return _finish(html_to_text(text), kind, max_chars)
+    return _finish({"title": "", "text": text}, kind, max_chars)
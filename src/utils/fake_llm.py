@@ -0,0 +1,157 @@
+"""Local fake chat model for offline failover, latency and load testing."""
+
+import asyncio
+import math
+import random
+from langchain_core.messages import AIMessage, AIMessageChunk
+from .tokens import estimate_message_tokens, estimate_tokens
+
+
+class FakeProviderError(Exception):
+    """Simulated transient provider failure (HTTP 503)."""
+    status_code = 503
+
+
+def _prompt_tokens(llm_input) -> int:
+    if isinstance(llm_input, str):
+        return estimate_tokens(llm_input)
+    return estimate_message_tokens(llm_input)
+
+
+def _default_output(schema) -> dict:
+    """Placeholder values for every string field of a pydantic schema."""
+    return {name: f"fake {name}" for name in schema.model_fields}
+
+
+class FakeChatModel:
+    """
+    Chat model stand-in with configurable latency and failures.
+
+    Supports the subset of the chat model interface the workflow uses:
+    `ainvoke` (returns an AIMessage with usage metadata) and
+    `with_structured_output(schema, include_raw=...)`, whose `astream`
+    yields the JSON in chunks like a streaming provider.
+
+    Args:
+        latency_ms: Base latency of every call (the median when latency_sigma > 0)
+        jitter_ms: Uniform random latency added on top (0..jitter_ms)
+        tail_probability: Chance of a slow call
+        tail_ms: Extra latency of a slow call
+        failure_rate: Chance a call raises FakeProviderError
+        responses: Canned outputs: {"text": str} for plain calls and
+            {schema name: dict} for structured output; a list value means
+            one of its items is picked at random per call, a callable is
+            called with the request input
+        seed: Random seed, for reproducible runs
+        first_token_ms: Streaming: delay before the first chunk (default: 10%
+            of the call's latency); the rest is spread over the chunks
+        stream_chunk_chars: Streaming: characters per chunk
+        latency_sigma: Log-normal spread of the base latency (0 = fixed)
+    """
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, tail_probability: float = 0.0,
+                 tail_ms: float = 0.0, failure_rate: float = 0.0, responses: dict | None = None,
+                 seed: int | None = None, first_token_ms: float | None = None, stream_chunk_chars: int = 16,
+                 latency_sigma: float = 0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tail_probability = tail_probability
+        self.tail_ms = tail_ms
+        self.failure_rate = failure_rate
+        self.responses = responses or {}
+        self.first_token_ms = first_token_ms
+        self.stream_chunk_chars = stream_chunk_chars
+        self.latency_sigma = latency_sigma
+        self.calls = 0
+        self._random = random.Random(seed)
+
+    def _draw(self) -> tuple[float, bool]:
+        """Count a call and draw its latency (ms) and whether it fails."""
+        self.calls += 1
+        delay = self.latency_ms
+        if self.latency_sigma > 0:
+            delay *= math.exp(self._random.gauss(0, self.latency_sigma))
+        delay += self._random.uniform(0, self.jitter_ms)
+        if self._random.random() < self.tail_probability:
+            delay += self.tail_ms
+        return delay, self._random.random() < self.failure_rate
+
+    @staticmethod
+    def _usage(llm_input, text: str) -> dict:
+        prompt_tokens = _prompt_tokens(llm_input)
+        completion_tokens = estimate_tokens(text)
+        return {
+            "input_tokens": prompt_tokens,
+            "output_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+    async def _respond(self, llm_input, text: str) -> AIMessage:
+        delay, failed = self._draw()
+        await asyncio.sleep(delay / 1000)
+        if failed:
+            raise FakeProviderError("fake provider unavailable")
+        return AIMessage(content=text, usage_metadata=self._usage(llm_input, text))
+
+    async def _stream(self, llm_input, text: str):
+        """Yield text as AIMessageChunks; usage metadata rides on the last one."""
+        delay, failed = self._draw()
+        first = delay * 0.1 if self.first_token_ms is None else min(self.first_token_ms, delay)
+        size = max(1, self.stream_chunk_chars)
+        pieces = [text[i:i + size] for i in range(0, len(text), size)] or [""]
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await asyncio.sleep(first / 1000)
+        if failed:
+            raise FakeProviderError("fake provider unavailable")
+        interval = (delay - first) / max(1, len(pieces) - 1) / 1000
+        for i, piece in enumerate(pieces):
+            if i:
+                # Sleep to each chunk's deadline so timer overshoot doesn't add up
+                await asyncio.sleep(max(0.0, start + first / 1000 + i * interval - loop.time()))
+            last = i == len(pieces) - 1
+            yield AIMessageChunk(content=piece, usage_metadata=self._usage(llm_input, text) if last else None)
+
+    def canned(self, key: str, default=None, llm_input=None):
+        """Canned response for key (a random item if it is a list, the result if it is callable)."""
+        value = self.responses.get(key, default)
+        if callable(value):
+            return value(llm_input)
+        return self._random.choice(value) if isinstance(value, list) else value
+
+    async def ainvoke(self, llm_input, config=None, **kwargs) -> AIMessage:
+        return await self._respond(llm_input, self.canned("text", "Looks good overall.", llm_input))
+
+    def with_structured_output(self, schema, include_raw: bool = False, **kwargs):
+        return _FakeStructured(self, schema, include_raw)
+
+
+class _FakeStructured:
+    """Structured-output view of a FakeChatModel."""
+
+    def __init__(self, model: FakeChatModel, schema, include_raw: bool):
+        self.model = model
+        self.schema = schema
+        self.include_raw = include_raw
+
+    async def ainvoke(self, llm_input, config=None, **kwargs):
+        parsed = self.schema.model_validate(
+            self.model.canned(self.schema.__name__, llm_input=llm_input) or _default_output(self.schema)
+        )
+        raw = await self.model._respond(llm_input, parsed.model_dump_json())
+        if self.include_raw:
+            return {"raw": raw, "parsed": parsed, "parsing_error": None}
+        return parsed
+
+    async def astream(self, llm_input, config=None, **kwargs):
+        parsed = self.schema.model_validate(
+            self.model.canned(self.schema.__name__, llm_input=llm_input) or _default_output(self.schema)
+        )
+        async for chunk in self.model._stream(llm_input, parsed.model_dump_json()):
+            if self.include_raw:
+                yield {"raw": chunk}
+        if self.include_raw:
+            yield {"parsed": parsed}
+            yield {"parsing_error": None}
+        else:
+            yield parsed
@@ -0,0 +1,212 @@
+"""In-memory hashtag index: which tags go with which terms and with each other."""
+
+import math
+import os
+import re
+from collections import Counter
+
+# Keywords kept per post (most frequent terms first)
+HASHTAG_POST_TERMS = int(os.environ.get("HASHTAG_POST_TERMS", 40))
+
+# Terms found in more than this share of posts carry no signal ("我们", "分享")
+HASHTAG_MAX_TERM_SHARE = float(os.environ.get("HASHTAG_MAX_TERM_SHARE", 0.5))
+
+# Suggestions scoring below this are dropped (term evidence scores 0-1;
+# co-occurrence and name matches add on top, see HashtagIndex.rank)
+HASHTAG_MIN_SCORE = float(os.environ.get("HASHTAG_MIN_SCORE", 0.05))
+
+# Weight of co-occurrence with the draft's own tags, and of the tag's name
+# appearing in the draft, next to term evidence
+_COOCCURRENCE_WEIGHT = 0.5
+_MENTION_BONUS = 0.2
+
+# Characters that end a hashtag or mention besides whitespace
+TAG_END = r"\s#@，。！？、,.!?；;：:（）()【】\[\]「」“”\"'"
+
+# The hashtag syntax every module uses ("#AI工具", or "#AI工具#" as the
+# app writes it); a closing "#" is only taken when no tag follows it, so
+# "#标签1#标签2" is two tags. "#️⃣" is a keycap emoji, not a hashtag
+HASHTAG = re.compile(rf"#(?![\uFE0F\u20E3])([^{TAG_END}]+)(?:#(?![^{TAG_END}]))?")
+# A line of nothing but hashtags
+HASHTAG_LINE = re.compile(rf"\s*(?:{HASHTAG.pattern}\s*)+")
+_WORD = re.compile(r"[a-z][a-z0-9_\-]{1,}|[\u3400-\u4dbf\u4e00-\u9fff]{2,}")
+
+
+def extract_hashtags(text: str) -> list[str]:
+    """Unique hashtags of a text in order of appearance (without "#")."""
+    return list(dict.fromkeys(HASHTAG.findall(text)))
+
+
+def post_terms(text: str, limit: int = HASHTAG_POST_TERMS) -> list[str]:
+    """
+    Keywords of a post: Latin words and Chinese character bigrams.
+
+    Hashtags are left out (they are what gets predicted). Terms are ranked
+    by frequency, ties by first appearance.
+
+    Args:
+        text: Post or draft text
+        limit: Terms kept
+
+    Returns:
+        Up to limit distinct terms
+    """
+    counts: Counter = Counter()
+    for word in _WORD.findall(HASHTAG.sub(" ", text.lower())):
+        if word.isascii():
+            counts[word] += 1
+        else:
+            counts.update(word[i:i + 2] for i in range(len(word) - 1))
+    return [term for term, _ in counts.most_common(limit)]
+
+
+def _mentions(lowered: str, key: str) -> bool:
+    """Whether a lowercased text names a tag: as a whole word for Latin tags ("ai" not in "said")."""
+    if key not in lowered:
+        return False
+    if not key.isascii():
+        return True
+    return re.search(rf"(?<![a-z0-9_]){re.escape(key)}(?![a-z0-9_])", lowered) is not None
+
+
+def normalize_tag(tag: str) -> str:
+    """Key under which spelling variants of a tag are merged ("#AI", "ai")."""
+    return tag.lstrip("#").rstrip("#").lower()
+
+
+class HashtagIndex:
+    """
+    Inverted index from post terms to the hashtags used with them.
+
+    Keeps, over every indexed post:
+      - tag_posts: posts per tag (and the most used spelling of each tag)
+      - term_posts / term_tags: posts per term and tags per term
+      - cooccurrence: posts per pair of tags
+
+    Everything is in memory, so ranking a draft costs microseconds; the
+    post index (src/utils/post_index.py) persists tags and terms and
+    rebuilds this on startup.
+    """
+
+    def __init__(self):
+        self.posts = 0
+        self.tag_posts: Counter = Counter()
+        self.spellings: dict[str, Counter] = {}
+        self.term_posts: Counter = Counter()
+        self.term_tags: dict[str, Counter] = {}
+        self.cooccurrence: dict[str, Counter] = {}
+
+    def __len__(self) -> int:
+        return self.posts
+
+    def _update(self, tags: list[str], terms: list[str], sign: int) -> None:
+        keys = list(dict.fromkeys(normalize_tag(tag) for tag in tags))
+        self.posts += sign
+        for tag in dict.fromkeys(tags):
+            self.spellings.setdefault(normalize_tag(tag), Counter())[tag.strip("#")] += sign
+        for key in keys:
+            self.tag_posts[key] += sign
+            others = self.cooccurrence.setdefault(key, Counter())
+            for other in keys:
+                if other != key:
+                    others[other] += sign
+        for term in dict.fromkeys(terms):
+            self.term_posts[term] += sign
+            tags_for_term = self.term_tags.setdefault(term, Counter())
+            for key in keys:
+                tags_for_term[key] += sign
+
+    def add(self, tags: list[str], terms: list[str]) -> None:
+        """Count one post's hashtags (as written) and keywords (see post_terms)."""
+        self._update(tags, terms, 1)
+
+    def remove(self, tags: list[str], terms: list[str]) -> None:
+        """Undo add() for a post that was replaced."""
+        self._update(tags, terms, -1)
+
+    def spelling(self, key: str) -> str:
+        """Most used spelling of a normalized tag."""
+        spellings = self.spellings.get(key)
+        if not spellings:
+            return key
+        return max(spellings.items(), key=lambda item: (item[1], item[0]))[0]
+
+    def rank(self, text: str, existing: list[str] = (), limit: int | None = 5,
+             min_score: float = HASHTAG_MIN_SCORE) -> list[dict]:
+        """
+        Suggest hashtags for a draft.
+
+        A tag's score is the idf-weighted average, over the draft's terms,
+        of the share of posts with that term that used the tag. Tags that
+        often appear with the draft's own tags, and tags whose name occurs
+        in the draft, score higher.
+
+        Args:
+            text: Draft text
+            existing: Tags the draft already has (not suggested again)
+            limit: Maximum suggestions (None = all)
+            min_score: Drop weaker suggestions
+
+        Returns:
+            Suggestions, best first, each with tag (most used spelling,
+            without "#"), score and posts (how many posts used it)
+        """
+        if not self.posts:
+            return []
+        lowered = text.lower()
+        present = {normalize_tag(tag) for tag in existing}
+        max_posts = max(1, self.posts * HASHTAG_MAX_TERM_SHARE)
+
+        scores: Counter = Counter()
+        total_weight = 0.0
+        for term in post_terms(text):
+            df = self.term_posts.get(term, 0)
+            if df <= 0 or df > max_posts:
+                continue
+            weight = math.log(1 + self.posts / df)
+            total_weight += weight
+            for key, count in self.term_tags[term].items():
+                if count > 0:
+                    scores[key] += weight * count / df
+        if total_weight:
+            for key in scores:
+                scores[key] /= total_weight
+
+        if present:
+            for tag in present:
+                tag_count = self.tag_posts.get(tag, 0)
+                if tag_count <= 0:
+                    continue
+                for key, count in self.cooccurrence.get(tag, {}).items():
+                    if count > 0:
+                        scores[key] += _COOCCURRENCE_WEIGHT * count / tag_count / len(present)
+
+        for key in scores:
+            if _mentions(lowered, key):
+                scores[key] += _MENTION_BONUS
+
+        ranked = sorted(
+            (key for key, score in scores.items() if key not in present and score >= min_score),
+            key=lambda key: (-scores[key], -self.tag_posts[key], key),
+        )
+        return [
+            {"tag": self.spelling(key), "score": round(scores[key], 4), "posts": self.tag_posts[key]}
+            for key in ranked[:limit]
+        ]
+
+    def related(self, tag: str, limit: int = 5) -> list[dict]:
+        """Tags most often used together with a tag, each with tag and posts (shared posts)."""
+        counts = self.cooccurrence.get(normalize_tag(tag), Counter())
+        return [
+            {"tag": self.spelling(key), "posts": count}
+            for key, count in sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]
+            if count > 0
+        ]
+
+    def stats(self) -> dict:
+        """Posts, distinct tags and distinct terms in the index."""
+        return {
+            "posts": self.posts,
+            "tags": sum(1 for count in self.tag_posts.values() if count > 0),
+            "terms": sum(1 for count in self.term_posts.values() if count > 0),
+        }
@@ -0,0 +1,402 @@
+"""Durable SQLite-backed job queue with an async worker pool."""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+import aiosqlite
+from .paths import data_path
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Jobs run at the same time. LLM calls are still throttled per provider
+# (LLM_RATE_LIMITS / LLM_MAX_CONCURRENCY), so set this high enough to keep
+# those limits saturated rather than to protect the provider.
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 8))
+JOB_DB_PATH = os.environ.get("JOB_DB_PATH", "")
+
+# Idle workers re-check the table this often, in case a wake-up was missed
+JOB_POLL_SECONDS = float(os.environ.get("JOB_POLL_SECONDS", 5))
+
+# A job interrupted this many times (crash or shutdown) is marked failed
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", 3))
+
+# A running job belongs to the worker holding its lease; the lease is
+# renewed every third of this while the job runs, and a job whose lease
+# ran out (its process died) is requeued by any queue on the same database
+JOB_LEASE_SECONDS = float(os.environ.get("JOB_LEASE_SECONDS", 60))
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+FINISHED_STATUSES = frozenset({SUCCEEDED, FAILED, CANCELLED})
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    input TEXT NOT NULL,
+    source TEXT,
+    thread_id TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    worker_id TEXT,
+    lease_expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+"""
+
+_COLUMNS = "id, status, input, source, thread_id, result, error, attempts, created_at, started_at, finished_at"
+
+# Columns added after the first release, with their types
+_ADDED_COLUMNS = {"worker_id": "TEXT", "lease_expires_at": "REAL"}
+
+
+def _row_to_job(row) -> dict:
+    """Turn a jobs row into a dict with input/result decoded."""
+    job = dict(zip(_COLUMNS.split(", "), row))
+    job["input"] = json.loads(job["input"])
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+
+class JobQueue:
+    """
+    Durable queue of generation jobs, drained by a pool of async workers.
+
+    Jobs live in a SQLite table, so queued work, results and errors survive
+    restarts. Submitting is a single INSERT and returns immediately; workers
+    claim the oldest queued job with an atomic UPDATE ... RETURNING and hand
+    it to the runner coroutine.
+
+    Any number of processes may share the database. A claimed job records
+    the claiming queue's worker_id and a lease (lease_expires_at) that the
+    queue renews while the job runs. Only a running job whose lease expired
+    was interrupted (its process crashed); any queue requeues it when
+    claiming, with its attempt count kept, so the runner can resume it from
+    the thread's last checkpoint (every job gets its workflow thread_id at
+    submit time). On shutdown a queue requeues its own jobs at once.
+
+    Args:
+        path: SQLite database file
+        workers: Number of jobs run concurrently
+    """
+
+    def __init__(self, path: str, workers: int = JOB_WORKERS):
+        self.path = path
+        self.workers = max(1, workers)
+        self._conn: aiosqlite.Connection | None = None
+        self._open_lock = asyncio.Lock()
+        # One connection is shared by all workers; a statement must not be
+        # in progress when another task commits
+        self._write_lock = asyncio.Lock()
+        self._runner = None
+        self._worker_tasks: list[asyncio.Task] = []
+        # job_id -> task of the worker running it, for cancellation
+        self._running: dict[str, asyncio.Task] = {}
+        self._cancel_requested: set[str] = set()
+        self._wakeup = asyncio.Event()
+        self._submitted = 0
+        self._resumable = True
+        self._lease_task: asyncio.Task | None = None
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    async def open(self) -> None:
+        """Open the database and create (or extend) the schema."""
+        async with self._open_lock:
+            if self._conn is not None:
+                return
+            conn = aiosqlite.connect(self.path)
+            # Don't let the connection thread block interpreter exit
+            conn.daemon = True
+            await conn
+            await conn.execute("PRAGMA journal_mode=WAL")
+            await conn.execute("PRAGMA synchronous=NORMAL")
+            await conn.execute("PRAGMA busy_timeout=5000")
+            await conn.executescript(_SCHEMA)
+            columns = {row[1] for row in await conn.execute_fetchall("PRAGMA table_info(jobs)")}
+            for name, type_ in _ADDED_COLUMNS.items():
+                if name not in columns:
+                    await conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {type_}")
+            await conn.commit()
+            self._conn = conn
+
+    async def start(self, runner, resumable: bool = True) -> None:
+        """
+        Open the queue and start the worker pool.
+
+        Args:
+            runner: Coroutine function called with each claimed job dict
+                (id, input, thread_id, attempts, ...); its return value
+                (JSON-serializable) is stored as the job result, an
+                exception as the job error
+            resumable: Whether the runner can resume interrupted jobs, i.e.
+                the workflow checkpoints survive a restart; if not, a
+                warning names the interrupted jobs that will start over
+        """
+        await self.open()
+        self._runner = runner
+        self._resumable = resumable
+        if self._worker_tasks:
+            return
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._lease_task = asyncio.create_task(self._renew_leases())
+        logger.info(f"👷 Started {self.workers} job workers ({self.path}, {self.worker_id})")
+
+    async def aclose(self) -> None:
+        """Stop the workers, requeue the jobs they were running and close the database."""
+        tasks, self._worker_tasks = self._worker_tasks, []
+        if self._lease_task is not None:
+            tasks.append(self._lease_task)
+            self._lease_task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        if tasks:
+            # Resumed by the next queue to claim them, without waiting for the lease
+            cursor = await conn.execute(
+                "UPDATE jobs SET status = ?, worker_id = NULL, lease_expires_at = NULL "
+                "WHERE worker_id = ? AND status = ?",
+                (QUEUED, self.worker_id, RUNNING),
+            )
+            if cursor.rowcount:
+                logger.info(f"♻️ Requeued {cursor.rowcount} running job(s) on shutdown")
+            await conn.commit()
+        await conn.close()
+
+    async def submit(self, input_data: dict, source: str | None = None) -> dict:
+        """
+        Queue one generation.
+
+        Args:
+            input_data: generate_xhs_post input (content, iterations, ...)
+            source: Optional label, e.g. the file the content came from
+
+        Returns:
+            dict with job_id, status and thread_id
+        """
+        return (await self.submit_many([(input_data, source)]))[0]
+
+    async def submit_many(self, items: list[tuple[dict, str | None]]) -> list[dict]:
+        """
+        Queue many generations in one transaction.
+
+        Args:
+            items: (input_data, source) pairs
+
+        Returns:
+            One dict with job_id, status and thread_id per item, in order
+        """
+        await self.open()
+        now = time.time()
+        rows = [
+            (str(uuid.uuid4()), QUEUED, json.dumps(input_data, ensure_ascii=False), source, str(uuid.uuid4()), now)
+            for input_data, source in items
+        ]
+        async with self._write_lock:
+            await self._conn.executemany(
+                "INSERT INTO jobs (id, status, input, source, thread_id, created_at) VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            await self._conn.commit()
+        self._submitted += len(rows)
+        self._wakeup.set()
+        return [{"job_id": row[0], "status": QUEUED, "thread_id": row[4]} for row in rows]
+
+    async def get(self, job_id: str) -> dict | None:
+        """Get a job by id (None if unknown)."""
+        await self.open()
+        rows = await self._conn.execute_fetchall(f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job_id,))
+        return _row_to_job(rows[0]) if rows else None
+
+    async def cancel(self, job_id: str) -> dict | None:
+        """
+        Cancel a queued or running job; finished jobs are left as they are.
+
+        Each status change is a single conditional UPDATE, so a job that
+        finishes at the same time (in this or another process) keeps its
+        result. A job running in another process is marked cancelled at
+        once; that process stops it when it next renews its leases.
+
+        Returns:
+            The job after cancellation (None if unknown)
+        """
+        await self.open()
+        now = time.time()
+        async with self._write_lock:
+            queued = await self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status = ?",
+                (CANCELLED, now, job_id, QUEUED),
+            )
+            running = await self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, worker_id = NULL, lease_expires_at = NULL "
+                "WHERE id = ? AND status = ?",
+                (CANCELLED, now, job_id, RUNNING),
+            )
+            await self._conn.commit()
+        if running.rowcount:
+            # Claimed jobs whose task hasn't started yet check this flag first
+            self._cancel_requested.add(job_id)
+            if (task := self._running.get(job_id)) is not None:
+                task.cancel()
+        if queued.rowcount or running.rowcount:
+            logger.info(f"⏹️ Job {job_id} cancelled")
+        return await self.get(job_id)
+
+    async def stats(self) -> dict:
+        """Job counts per status, plus worker pool size and jobs running in this process."""
+        await self.open()
+        counts = dict(await self._conn.execute_fetchall("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+        return {
+            **{status: counts.get(status, 0) for status in (QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED)},
+            "workers": len(self._worker_tasks),
+            "active": len(self._running),
+        }
+
+    async def _requeue_expired(self, now: float) -> None:
+        """Requeue running jobs whose lease expired, or fail them after JOB_MAX_ATTEMPTS (in the open transaction)."""
+        cursor = await self._conn.execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, error = ?, worker_id = NULL, lease_expires_at = NULL "
+            "WHERE status = ? AND (lease_expires_at IS NULL OR lease_expires_at < ?) AND attempts >= ?",
+            (FAILED, now, f"interrupted {JOB_MAX_ATTEMPTS} times", RUNNING, now, JOB_MAX_ATTEMPTS),
+        )
+        if cursor.rowcount:
+            logger.warning(f"⚠️ Giving up on {cursor.rowcount} job(s) interrupted {JOB_MAX_ATTEMPTS} times")
+        cursor = await self._conn.execute(
+            "UPDATE jobs SET status = ?, worker_id = NULL, lease_expires_at = NULL "
+            "WHERE status = ? AND (lease_expires_at IS NULL OR lease_expires_at < ?)",
+            (QUEUED, RUNNING, now),
+        )
+        if cursor.rowcount:
+            if self._resumable:
+                logger.info(f"♻️ Requeued {cursor.rowcount} interrupted job(s) for resume")
+            else:
+                logger.warning(
+                    f"⚠️ Requeued {cursor.rowcount} interrupted job(s); they will start over because "
+                    "checkpoints are not durable (set CHECKPOINT_BACKEND=sqlite to resume them)"
+                )
+
+    async def _claim(self) -> dict | None:
+        """Atomically lease the oldest queued job to this queue and return it."""
+        now = time.time()
+        async with self._write_lock:
+            await self._requeue_expired(now)
+            rows = await self._conn.execute_fetchall(
+                f"""
+                UPDATE jobs SET status = ?, started_at = ?, attempts = attempts + 1,
+                    worker_id = ?, lease_expires_at = ?
+                WHERE id = (SELECT id FROM jobs WHERE status = ? ORDER BY created_at, rowid LIMIT 1)
+                RETURNING {_COLUMNS}
+                """,
+                (RUNNING, now, self.worker_id, now + JOB_LEASE_SECONDS, QUEUED),
+            )
+            await self._conn.commit()
+        return _row_to_job(rows[0]) if rows else None
+
+    async def _renew_leases(self) -> None:
+        """Extend the leases of this queue's running jobs; stop jobs cancelled or taken over elsewhere."""
+        while True:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+            if not self._running:
+                continue
+            try:
+                async with self._write_lock:
+                    rows = await self._conn.execute_fetchall(
+                        "UPDATE jobs SET lease_expires_at = ? WHERE worker_id = ? AND status = ? RETURNING id",
+                        (time.time() + JOB_LEASE_SECONDS, self.worker_id, RUNNING),
+                    )
+                    await self._conn.commit()
+            except Exception as e:
+                logger.warning(f"⚠️ Renewing job leases failed (will retry): {e}")
+                continue
+            held = {row[0] for row in rows}
+            for job_id, task in list(self._running.items()):
+                if job_id not in held and not task.done():
+                    logger.info(f"⏹️ Job {job_id} was cancelled or taken over elsewhere, stopping it")
+                    self._cancel_requested.add(job_id)
+                    task.cancel()
+
+    async def _finish(self, job_id: str, status: str, result=None, error: str | None = None) -> bool:
+        """Record how a job this queue holds ended; False if it no longer holds it (e.g. cancelled)."""
+        result = json.dumps(result, ensure_ascii=False) if result is not None else None
+        async with self._write_lock:
+            cursor = await self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, "
+                "worker_id = NULL, lease_expires_at = NULL WHERE id = ? AND status = ? AND worker_id = ?",
+                (status, result, error, time.time(), job_id, RUNNING, self.worker_id),
+            )
+            await self._conn.commit()
+        return cursor.rowcount > 0
+
+    async def _worker(self) -> None:
+        while True:
+            seen = self._submitted
+            job = await self._claim()
+            if job is None:
+                # Sleep unless something was submitted while we were claiming
+                if self._submitted == seen:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), JOB_POLL_SECONDS)
+                    except asyncio.TimeoutError:
+                        pass
+                continue
+            await self._run(job)
+
+    async def _run(self, job: dict) -> None:
+        """Run one claimed job in its own task and record how it ended."""
+        job_id = job["id"]
+        if job_id in self._cancel_requested:
+            self._cancel_requested.discard(job_id)
+            return
+        logger.info(f"▶️ Job {job_id} started (attempt {job['attempts']})")
+        start = time.perf_counter()
+        task = asyncio.create_task(self._runner(job))
+        self._running[job_id] = task
+        try:
+            result = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if job_id in self._cancel_requested:
+                # Already recorded by cancel() (here or in another process)
+                return
+            # Shutdown: stop the job; aclose() requeues it for resume
+            task.cancel()
+            raise
+        except Exception as e:
+            if await self._finish(job_id, FAILED, error=f"{type(e).__name__}: {e}"):
+                logger.warning(f"⚠️ Job {job_id} failed: {e}")
+        else:
+            if await self._finish(job_id, SUCCEEDED, result=result):
+                logger.info(f"✅ Job {job_id} finished in {(time.perf_counter() - start) * 1000:.0f}ms")
+            else:
+                logger.info(f"⏹️ Job {job_id} finished after it was cancelled; result dropped")
+        finally:
+            self._running.pop(job_id, None)
+            self._cancel_requested.discard(job_id)
+
+
+_job_queue: JobQueue | None = None
+
+
+def get_job_queue() -> JobQueue:
+    """Get the process-wide job queue (opened lazily, at JOB_DB_PATH or the data directory)."""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue(JOB_DB_PATH or str(data_path("jobs.sqlite")))
+    return _job_queue
+
+
+async def close_job_queue() -> None:
+    """Stop the process-wide job queue's workers and close its database."""
+    global _job_queue
+    queue, _job_queue = _job_queue, None
+    if queue is not None:
+        await queue.aclose()
@@ -1,25 +1,535 @@
 """Shared LLM configuration and initialization."""
 
+import asyncio
+import json
+import logging
 import os
-from langchain.chat_models import init_chat_model
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import parse_qsl
+from .metrics import current_node, get_metrics
+from .partial_json import PartialJSONParser
+from .rate_limit import get_rate_limiter
+
+# Configure logger
+logger = logging.getLogger(__name__)
 
 # Configuration (loaded once in main.py)
 MODEL_PROVIDER = os.environ.get("MODEL_PROVIDER", "deepseek")
 MODEL_NAME = os.environ.get("MODEL_NAME", "deepseek-chat")
 
+# Backends of the provider pool in preference order, e.g.
+# "deepseek:deepseek-chat,openai:gpt-4o-mini" or "fake:slow?latency_ms=2000";
+# defaults to MODEL_PROVIDER:MODEL_NAME
+LLM_BACKENDS = os.environ.get("LLM_BACKENDS", f"{MODEL_PROVIDER}:{MODEL_NAME}")
+
+# Retries for transient LLM errors (timeouts, 429, 5xx), with exponential backoff.
+# With several backends a retry goes to the next healthy one.
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", 2))
+LLM_RETRY_BACKOFF_SECONDS = float(os.environ.get("LLM_RETRY_BACKOFF_SECONDS", 0.5))
+
+# Circuit breaker: consecutive failures that open a backend's circuit, and
+# seconds before a single trial request is let through again
+LLM_CIRCUIT_FAILURES = int(os.environ.get("LLM_CIRCUIT_FAILURES", 3))
+LLM_CIRCUIT_RESET_SECONDS = float(os.environ.get("LLM_CIRCUIT_RESET_SECONDS", 30))
+
+# Send a second (hedged) request when the first hasn't answered after this
+# many milliseconds and keep whichever finishes first (0 = disabled)
+LLM_HEDGE_AFTER_MS = float(os.environ.get("LLM_HEDGE_AFTER_MS", 0))
+
+# Per-node model routing: JSON (or path to a JSON file) mapping node names to
+# {"model": "provider:model", "fallbacks": [...], "max_tokens": N, "temperature": T}.
+# Merged over DEFAULT_ROUTES; a node without "model" uses LLM_BACKENDS.
+LLM_ROUTES = os.environ.get("LLM_ROUTES", "")
+
+# Shared HTTP connection pool for all backends
+LLM_HTTP_MAX_CONNECTIONS = int(os.environ.get("LLM_HTTP_MAX_CONNECTIONS", 100))
+LLM_HTTP_MAX_KEEPALIVE = int(os.environ.get("LLM_HTTP_MAX_KEEPALIVE", 20))
+LLM_HTTP_TIMEOUT_SECONDS = float(os.environ.get("LLM_HTTP_TIMEOUT_SECONDS", 120))
 
-def get_api_key():
+
+def get_api_key(provider: str = MODEL_PROVIDER):
     """Get the appropriate API key for the provider."""
-    if MODEL_PROVIDER == "deepseek":
+    if provider == "deepseek":
         return os.environ.get("DEEPSEEK_API_KEY")
     else:
         return os.environ.get("OPENAI_API_KEY")
 
 
-# Initialize base LLM - shared by all agents
-base_llm = init_chat_model(
-    model=MODEL_NAME,
-    model_provider=MODEL_PROVIDER,
-    api_key=get_api_key(),
-    max_tokens=4096
-)
+_http_client = None
+
+
+def get_http_client():
+    """Shared httpx.AsyncClient (keep-alive pool) used by every HTTP backend."""
+    global _http_client
+    if _http_client is None:
+        import httpx
+
+        _http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=LLM_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_HTTP_MAX_KEEPALIVE,
+            ),
+            timeout=httpx.Timeout(LLM_HTTP_TIMEOUT_SECONDS, connect=10.0),
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Close the shared HTTP connection pool (on server shutdown)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def _parse_value(value: str):
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+
+def parse_backend_spec(spec: str) -> tuple[str, str, dict]:
+    """Parse "provider:model?key=value&..." into (provider, model, options)."""
+    spec, _, query = spec.strip().partition("?")
+    provider, _, model = spec.partition(":")
+    options = {key: _parse_value(value) for key, value in parse_qsl(query)}
+    return provider, model, options
+
+
+class Backend:
+    """
+    One configured model behind the pool, with health tracking.
+
+    The client is built on first use. For HTTP providers it shares the
+    process-wide connection pool; provider "fake" builds a FakeChatModel
+    (src/utils/fake_llm.py) from the options.
+
+    Args:
+        provider: Model provider ("deepseek", "openai", "fake", ...)
+        model: Model name
+        options: Extra client options (e.g. temperature, base_url, latency_ms for fake)
+        llm: Pre-built client (skips construction)
+    """
+
+    def __init__(self, provider: str, model: str, options: dict | None = None, llm=None):
+        self.provider = provider
+        self.model = model
+        self.options = options or {}
+        self.name = f"{provider}:{model}"
+        self._llm = llm
+        self._variants = {}
+        self.calls = 0
+        self.failures = 0
+        self.hedges = 0
+        self.consecutive_failures = 0
+        self.opened_at: float | None = None
+        self.latency_ms: float | None = None  # moving average of successful calls
+
+    @property
+    def llm(self):
+        if self._llm is None:
+            if self.provider == "fake":
+                from .fake_llm import FakeChatModel
+
+                self._llm = FakeChatModel(**self.options)
+            else:
+                from langchain.chat_models import init_chat_model
+
+                self._llm = init_chat_model(
+                    model=self.model,
+                    model_provider=self.provider,
+                    api_key=get_api_key(self.provider),
+                    http_async_client=get_http_client(),
+                    **{"max_tokens": 4096, "max_retries": 0, **self.options}
+                )
+        return self._llm
+
+    def client(self, max_tokens: int | None = None, temperature: float | None = None):
+        """
+        The client with per-route generation settings applied.
+
+        Variants are shallow copies sharing the HTTP pool; health stays
+        tracked per backend. Clients without model_copy (fake) are returned as-is.
+        """
+        settings = {k: v for k, v in (("max_tokens", max_tokens), ("temperature", temperature)) if v is not None}
+        if not settings or not hasattr(self.llm, "model_copy"):
+            return self.llm
+        key = tuple(sorted(settings.items()))
+        variant = self._variants.get(key)
+        if variant is None:
+            variant = self._variants[key] = self.llm.model_copy(update=settings)
+        return variant
+
+    def available(self, now: float) -> bool:
+        """Closed circuit, or open long enough to let a trial request through."""
+        return self.opened_at is None or now - self.opened_at >= LLM_CIRCUIT_RESET_SECONDS
+
+    def record_success(self, latency_ms: float) -> None:
+        self.calls += 1
+        self.consecutive_failures = 0
+        if self.opened_at is not None:
+            logger.info(f"✅ Circuit closed for {self.name}")
+        self.opened_at = None
+        self.latency_ms = latency_ms if self.latency_ms is None else 0.8 * self.latency_ms + 0.2 * latency_ms
+
+    def record_failure(self) -> None:
+        self.calls += 1
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= LLM_CIRCUIT_FAILURES:
+            if self.opened_at is None:
+                logger.warning(f"🔌 Circuit opened for {self.name} after {self.consecutive_failures} failures")
+            # A failed trial request keeps the circuit open for another period
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "hedges": self.hedges,
+            "circuit": "closed" if self.opened_at is None else "open",
+            "latency_ms": round(self.latency_ms, 1) if self.latency_ms is not None else None,
+        }
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Timeouts, connection errors, rate limits and server errors are worth retrying."""
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in (408, 409, 429) or status >= 500
+    return isinstance(error, (TimeoutError, ConnectionError)) or any(
+        name in type(error).__name__ for name in ("Timeout", "Connection")
+    )
+
+
+def _json_fragment(chunk) -> str:
+    """Structured-output text carried by a streamed chunk: first tool call's arguments, else content."""
+    args = [tc.get("args") or "" for tc in getattr(chunk, "tool_call_chunks", None) or [] if tc.get("index") in (None, 0)]
+    if args:
+        return "".join(args)
+    return chunk.content if isinstance(chunk.content, str) else ""
+
+
+async def _stream_structured(runnable, llm_input, on_partial) -> dict:
+    """
+    Stream a with_structured_output(include_raw=True) runnable.
+
+    The raw chunks are parsed incrementally and on_partial(values,
+    completed) is called whenever a field grows or completes.
+
+    Returns:
+        {"raw", "parsed", "parsing_error"}, like ainvoke on the same runnable
+    """
+    parser = PartialJSONParser()
+    raw = None
+    result = {"parsed": None, "parsing_error": None}
+    async for chunk in runnable.astream(llm_input):
+        if "raw" not in chunk:
+            result.update(chunk)
+            continue
+        raw = chunk["raw"] if raw is None else raw + chunk["raw"]
+        fragment = _json_fragment(chunk["raw"])
+        if fragment and parser.feed(fragment):
+            on_partial(parser.values, parser.completed)
+    return {"raw": raw, **result}
+
+
+def _usage(response) -> tuple[int, int]:
+    """Prompt and completion tokens from an AIMessage's usage metadata."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+
+
+@dataclass(frozen=True)
+class ModelRoute:
+    """
+    Model settings for one node.
+
+    Args:
+        models: Backend specs in preference order (model, then fallbacks);
+            empty means the pool's default backends
+        max_tokens: Completion token limit (None = backend default)
+        temperature: Sampling temperature (None = backend default)
+    """
+    models: tuple[str, ...] = ()
+    max_tokens: int | None = None
+    temperature: float | None = None
+
+    def cache_key(self) -> str:
+        """Stable description for response cache keys."""
+        return json.dumps([list(self.models) or LLM_BACKENDS, self.max_tokens, self.temperature])
+
+
+# Critique and analysis answers are short; drafts and formatting return a full post
+DEFAULT_ROUTES = {
+    "analyze": {"max_tokens": 2048},
+    "generator": {"max_tokens": 4096},
+    "critic": {"max_tokens": 1536},
+    "formatting": {"max_tokens": 4096},
+}
+
+
+def _load_routes(value: str) -> dict[str, ModelRoute]:
+    """Build per-node routes from DEFAULT_ROUTES and the LLM_ROUTES override."""
+    overrides = {}
+    if value.strip():
+        text = value if value.lstrip().startswith("{") else Path(value).read_text(encoding="utf-8")
+        overrides = json.loads(text)
+
+    routes = {}
+    for node in DEFAULT_ROUTES.keys() | overrides.keys():
+        config = {**DEFAULT_ROUTES.get(node, {}), **overrides.get(node, {})}
+        models = ([config["model"]] if config.get("model") else []) + list(config.get("fallbacks", []))
+        routes[node] = ModelRoute(
+            models=tuple(models),
+            max_tokens=config.get("max_tokens"),
+            temperature=config.get("temperature"),
+        )
+    return routes
+
+
+_routes = _load_routes(LLM_ROUTES)
+
+
+def get_route(node: str | None) -> ModelRoute:
+    """Model route for a node (the default route for unknown nodes)."""
+    return _routes.get(node) or ModelRoute()
+
+
+def set_routes(routes: dict) -> None:
+    """Replace the per-node routes (same format as LLM_ROUTES, as a dict)."""
+    global _routes
+    _routes = _load_routes(json.dumps(routes))
+
+
+class LLMPool:
+    """
+    Health-aware pool of LLM backends.
+
+    Requests go to the first available backend in preference order.
+    Backends whose circuit is open (LLM_CIRCUIT_FAILURES consecutive
+    failures) are skipped until LLM_CIRCUIT_RESET_SECONDS have passed; if
+    every circuit is open, the least recently opened one is tried anyway.
+    Transient errors fail over to the next backend. With hedging enabled,
+    a second request is sent after hedge_after_ms and the first answer wins.
+
+    A ModelRoute can name its own backends (created on first use and
+    shared by every route naming the same spec) and generation settings.
+
+    Args:
+        backends: Default backends in preference order
+        hedge_after_ms: Hedging threshold (0 = disabled)
+    """
+
+    def __init__(self, backends: list[Backend], hedge_after_ms: float = LLM_HEDGE_AFTER_MS):
+        if not backends:
+            raise ValueError("LLMPool needs at least one backend")
+        self.backends = backends
+        self.hedge_after_ms = hedge_after_ms
+        self._by_spec = {b.name: b for b in backends}
+
+    def backend(self, spec: str) -> Backend:
+        """Get or create the backend for a "provider:model?options" spec."""
+        backend = self._by_spec.get(spec)
+        if backend is None:
+            backend = self._by_spec[spec] = Backend(*parse_backend_spec(spec))
+        return backend
+
+    def candidates(self, route: ModelRoute | None = None) -> list[Backend]:
+        """Backends for a route in preference order."""
+        if route is None or not route.models:
+            return self.backends
+        return [self.backend(spec) for spec in route.models]
+
+    def select(self, candidates: list[Backend] | None = None, avoid: Backend | None = None) -> Backend:
+        """Pick the preferred available backend, avoiding one that just failed if possible."""
+        candidates = candidates or self.backends
+        now = time.monotonic()
+        available = [b for b in candidates if b.available(now)]
+        if not available:
+            available = [min(candidates, key=lambda b: b.opened_at)]
+        preferred = [b for b in available if b is not avoid]
+        backend = (preferred or available)[0]
+        if backend.opened_at is not None:
+            # Half-open: this request is the trial; others keep skipping it
+            backend.opened_at = now
+        return backend
+
+    async def _call(self, backend: Backend, llm_input, schema, route: ModelRoute | None = None, on_partial=None):
+        """One request to one backend, updating its health (streamed when on_partial is given)."""
+        llm = backend.client(route.max_tokens, route.temperature) if route else backend.llm
+        runnable = llm.with_structured_output(schema, include_raw=True) if schema else llm
+        start = time.perf_counter()
+        try:
+            async with get_rate_limiter(backend.provider).limit():
+                if on_partial is not None and schema:
+                    result = await _stream_structured(runnable, llm_input, on_partial)
+                else:
+                    result = await runnable.ainvoke(llm_input)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            backend.record_failure()
+            raise
+        backend.record_success((time.perf_counter() - start) * 1000)
+        return result
+
+    async def _call_hedged(self, backend: Backend, llm_input, schema, route: ModelRoute | None,
+                           candidates: list[Backend]) -> tuple[object, Backend]:
+        """Call backend; past the hedge threshold, race a second request."""
+        first = asyncio.ensure_future(self._call(backend, llm_input, schema, route))
+        done, _ = await asyncio.wait({first}, timeout=self.hedge_after_ms / 1000)
+        if done:
+            return first.result(), backend
+
+        hedge_backend = self.select(candidates, avoid=backend)
+        hedge_backend.hedges += 1
+        logger.info(f"🏁 Hedging slow request to {backend.name} with {hedge_backend.name}")
+        second = asyncio.ensure_future(self._call(hedge_backend, llm_input, schema, route))
+        owners = {first: backend, second: hedge_backend}
+
+        pending = set(owners)
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result(), owners[task]
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def ainvoke(self, llm_input, schema=None, call: dict | None = None, route: ModelRoute | None = None,
+                      on_partial=None):
+        """
+        Run one request with failover (and hedging when enabled).
+
+        Args:
+            llm_input: Prompt string or list of messages
+            schema: Pydantic model for structured output (raw + parsed result), or None
+            call: Optional dict that receives "backend" (the one that answered)
+                and "retries" (retries used), also when the request fails
+            route: Backends and generation settings (None = default backends)
+            on_partial: Stream structured output, calling on_partial(values,
+                completed) as fields arrive; values restart from empty when
+                a retry goes to another backend. Streamed calls are not hedged.
+
+        Returns:
+            Raw result of the backend call
+        """
+        call = call if call is not None else {}
+        call["retries"] = 0
+        candidates = self.candidates(route)
+        failed = None
+        while True:
+            backend = call["backend"] = self.select(candidates, avoid=failed)
+            if backend is failed:
+                await asyncio.sleep(LLM_RETRY_BACKOFF_SECONDS * 2 ** (call["retries"] - 1))
+            try:
+                if self.hedge_after_ms > 0 and on_partial is None:
+                    result, call["backend"] = await self._call_hedged(backend, llm_input, schema, route, candidates)
+                    return result
+                return await self._call(backend, llm_input, schema, route, on_partial)
+            except Exception as e:
+                if call["retries"] >= LLM_MAX_RETRIES or not _is_retryable(e):
+                    raise
+                call["retries"] += 1
+                failed = backend
+                logger.warning(f"🔁 Retrying LLM call ({call['retries']}/{LLM_MAX_RETRIES}) after {backend.name} failed: {e}")
+
+    def stats(self) -> dict:
+        """Health and call counters per backend."""
+        return {
+            "hedge_after_ms": self.hedge_after_ms,
+            "backends": {name: b.stats() for name, b in self._by_spec.items()},
+        }
+
+
+_pool: LLMPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_llm_pool() -> LLMPool:
+    """
+    Get the shared LLM pool, building it from LLM_BACKENDS on first use.
+
+    Clients are constructed here rather than at module import so the MCP
+    server can start answering before langchain and the provider SDKs load.
+
+    Returns:
+        Process-wide LLMPool
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                backends = [Backend(*parse_backend_spec(spec)) for spec in LLM_BACKENDS.split(",") if spec.strip()]
+                for backend in backends:
+                    backend.llm  # noqa: B018 - build clients up front
+                _pool = LLMPool(backends)
+    return _pool
+
+
+def set_llm_pool(pool: LLMPool | None) -> None:
+    """Replace the shared LLM pool (e.g. with fake backends); None rebuilds it from env."""
+    global _pool
+    _pool = pool
+
+
+async def ainvoke_llm(llm_input, schema=None, node: str | None = None, on_partial=None):
+    """
+    Call the LLM pool with the node's model route, rate limiting, failover and metrics.
+
+    Latency, token usage (from response metadata), retries and estimated
+    cost are recorded in the process metrics (src/utils/metrics.py) and
+    attributed to the running node and thread.
+
+    Args:
+        llm_input: Prompt string or list of messages
+        schema: Pydantic model for structured output, or None for an AIMessage
+        node: Node name for routing and metrics (defaults to the instrumented node running)
+        on_partial: Optional callback for streamed structured output, called
+            with (values, completed) as fields arrive (see LLMPool.ainvoke)
+
+    Returns:
+        Instance of schema, or the AIMessage when schema is None
+    """
+    thread_id, running_node = current_node()
+    node = node or running_node
+    pool = get_llm_pool()
+
+    call = {}
+    start = time.perf_counter()
+    try:
+        result = await pool.ainvoke(llm_input, schema, call, get_route(node), on_partial)
+    except Exception:
+        backend = call.get("backend") or pool.candidates(get_route(node))[0]
+        get_metrics().record_llm(
+            node, (time.perf_counter() - start) * 1000, provider=backend.provider, model=backend.model,
+            retries=call.get("retries", 0), thread_id=thread_id, error=True,
+        )
+        raise
+
+    backend = call["backend"]
+    response = result["raw"] if schema else result
+    prompt_tokens, completion_tokens = _usage(response)
+    get_metrics().record_llm(
+        node, (time.perf_counter() - start) * 1000, provider=backend.provider, model=backend.model,
+        prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+        retries=call["retries"], thread_id=thread_id,
+    )
+
+    if schema:
+        if result["parsed"] is None:
+            raise result["parsing_error"] or ValueError(f"LLM returned no {schema.__name__}")
+        return result["parsed"]
+    return result
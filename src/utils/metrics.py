@@ -0,0 +1,318 @@
+"""Per-node latency, token and cost metrics."""
+
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+
+def _parse_pricing(value: str) -> dict[str, tuple[float, float]]:
+    """Parse "deepseek=0.27/1.10,openai=2.5/10" into {provider: (input, output)}."""
+    pricing = {}
+    for item in value.split(","):
+        if "=" in item and "/" in item:
+            provider, prices = item.split("=", 1)
+            prompt_price, completion_price = prices.split("/", 1)
+            pricing[provider.strip()] = (float(prompt_price), float(completion_price))
+    return pricing
+
+
+# USD per million prompt / completion tokens, overridable with LLM_PRICING
+DEFAULT_PRICING = {
+    "deepseek": (0.27, 1.10),
+    "openai": (2.50, 10.00),
+}
+LLM_PRICING = {**DEFAULT_PRICING, **_parse_pricing(os.environ.get("LLM_PRICING", ""))}
+
+# Latency samples kept per stage for percentiles (most recent ones)
+METRICS_SAMPLE_SIZE = int(os.environ.get("METRICS_SAMPLE_SIZE", 1024))
+
+# Threads whose totals are kept in memory (least recently updated are dropped)
+METRICS_MAX_THREADS = int(os.environ.get("METRICS_MAX_THREADS", 1000))
+
+# Optional JSONL trace of every node and LLM call (empty = disabled)
+METRICS_TRACE_PATH = os.environ.get("METRICS_TRACE_PATH", "")
+
+# (thread_id, node) of the node currently running in this task
+_current_node: ContextVar[tuple[str | None, str | None]] = ContextVar("current_node", default=(None, None))
+
+
+def estimate_cost(provider: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Estimated USD cost of one call (0.0 for providers without pricing)."""
+    prompt_price, completion_price = LLM_PRICING.get(provider, (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+def percentile(samples, q: float) -> float:
+    """Nearest-rank percentile of samples (q in 0-100); 0.0 when empty."""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+class _Stage:
+    """Counters and recent latency samples for one stage (node or LLM call)."""
+
+    def __init__(self, sample_size: int):
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.samples = deque(maxlen=sample_size)
+
+    def observe(self, duration_ms: float, error: bool) -> None:
+        self.count += 1
+        self.errors += int(error)
+        self.total_ms += duration_ms
+        self.samples.append(duration_ms)
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "total_ms": round(self.total_ms, 1),
+            "p50_ms": round(percentile(self.samples, 50), 1),
+            "p95_ms": round(percentile(self.samples, 95), 1),
+        }
+
+
+def _empty_usage() -> dict:
+    return {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "retries": 0, "cost_usd": 0.0}
+
+
+class MetricsRegistry:
+    """
+    Process-wide aggregation of node and LLM call metrics.
+
+    Stages are named after graph nodes ("analyze") and their LLM calls
+    ("llm:analyze"). Token and cost totals are kept per provider and per
+    thread. Every observation can also be appended to a JSONL trace.
+
+    Args:
+        sample_size: Latency samples kept per stage for p50/p95
+        max_threads: Threads whose totals are kept (LRU)
+        trace_path: JSONL trace file (None/"" = no trace)
+    """
+
+    def __init__(self, sample_size: int = METRICS_SAMPLE_SIZE, max_threads: int = METRICS_MAX_THREADS,
+                 trace_path: str | None = METRICS_TRACE_PATH):
+        self.sample_size = sample_size
+        self.max_threads = max_threads
+        self.trace_path = trace_path or None
+        self._lock = threading.Lock()
+        self._trace_file = None
+        self.reset()
+
+    def reset(self) -> None:
+        """Drop all collected metrics."""
+        with self._lock:
+            self.started_at = time.time()
+            self._stages: dict[str, _Stage] = {}
+            self._providers: dict[str, dict] = {}
+            self._threads: OrderedDict[str, dict] = OrderedDict()
+            self._requests = {"total": 0, "coalesced": 0}
+
+    def _stage(self, name: str) -> _Stage:
+        stage = self._stages.get(name)
+        if stage is None:
+            stage = self._stages[name] = _Stage(self.sample_size)
+        return stage
+
+    def _thread(self, thread_id: str) -> dict:
+        totals = self._threads.get(thread_id)
+        if totals is None:
+            totals = self._threads[thread_id] = {"nodes": {}, **_empty_usage()}
+            while len(self._threads) > self.max_threads:
+                self._threads.popitem(last=False)
+        else:
+            self._threads.move_to_end(thread_id)
+        return totals
+
+    def _trace(self, event: dict) -> None:
+        if not self.trace_path:
+            return
+        try:
+            if self._trace_file is None:
+                self._trace_file = open(self.trace_path, "a", encoding="utf-8", buffering=1)
+            self._trace_file.write(json.dumps(event, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logger.warning(f"⚠️ Disabling metrics trace {self.trace_path}: {e}")
+            self.trace_path = None
+
+    def record_node(self, node: str, duration_ms: float, thread_id: str | None = None, error: bool = False) -> None:
+        """Record one node execution."""
+        with self._lock:
+            self._stage(node).observe(duration_ms, error)
+            if thread_id:
+                nodes = self._thread(thread_id)["nodes"]
+                nodes[node] = round(nodes.get(node, 0.0) + duration_ms, 1)
+            self._trace({
+                "ts": datetime.now(timezone.utc).isoformat(),
+                "type": "node",
+                "thread_id": thread_id,
+                "node": node,
+                "duration_ms": round(duration_ms, 1),
+                "error": error,
+            })
+
+    def record_llm(self, node: str | None, duration_ms: float, *, provider: str, model: str,
+                   prompt_tokens: int = 0, completion_tokens: int = 0, retries: int = 0,
+                   thread_id: str | None = None, error: bool = False) -> None:
+        """Record one LLM call (including its retries)."""
+        cost = estimate_cost(provider, prompt_tokens, completion_tokens)
+        with self._lock:
+            self._stage(f"llm:{node or 'unknown'}").observe(duration_ms, error)
+            targets = [self._providers.setdefault(provider, _empty_usage())]
+            if thread_id:
+                targets.append(self._thread(thread_id))
+            for usage in targets:
+                usage["calls"] += 1
+                usage["prompt_tokens"] += prompt_tokens
+                usage["completion_tokens"] += completion_tokens
+                usage["retries"] += retries
+                usage["cost_usd"] += cost
+            self._trace({
+                "ts": datetime.now(timezone.utc).isoformat(),
+                "type": "llm",
+                "thread_id": thread_id,
+                "node": node,
+                "provider": provider,
+                "model": model,
+                "duration_ms": round(duration_ms, 1),
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "retries": retries,
+                "cost_usd": round(cost, 8),
+                "error": error,
+            })
+
+    def record_request(self, coalesced: bool = False) -> None:
+        """Record one generation request; coalesced ones shared an identical in-flight run."""
+        with self._lock:
+            self._requests["total"] += 1
+            self._requests["coalesced"] += int(coalesced)
+
+    def thread_stats(self, thread_id: str) -> dict | None:
+        """Totals for one thread, or None if unknown or evicted."""
+        with self._lock:
+            totals = self._threads.get(thread_id)
+            if totals is None:
+                return None
+            return {**totals, "nodes": dict(totals["nodes"]), "cost_usd": round(totals["cost_usd"], 6)}
+
+    def snapshot(self) -> dict:
+        """Per-stage latency summaries (p50/p95) and per-provider usage."""
+        with self._lock:
+            return {
+                "uptime_seconds": round(time.time() - self.started_at, 1),
+                "stages": {name: stage.summary() for name, stage in sorted(self._stages.items())},
+                "providers": {
+                    name: {**usage, "cost_usd": round(usage["cost_usd"], 6)}
+                    for name, usage in sorted(self._providers.items())
+                },
+                "threads": len(self._threads),
+                "requests": {
+                    **self._requests,
+                    "coalesce_rate": round(self._requests["coalesced"] / (self._requests["total"] or 1), 4),
+                },
+            }
+
+    def render_prometheus(self) -> str:
+        """Metrics in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = [
+            "# HELP xhs_stage_duration_ms Node and LLM call latency in milliseconds.",
+            "# TYPE xhs_stage_duration_ms summary",
+        ]
+        for name, stage in snapshot["stages"].items():
+            lines.append(f'xhs_stage_duration_ms{{stage="{name}",quantile="0.5"}} {stage["p50_ms"]}')
+            lines.append(f'xhs_stage_duration_ms{{stage="{name}",quantile="0.95"}} {stage["p95_ms"]}')
+            lines.append(f'xhs_stage_duration_ms_sum{{stage="{name}"}} {stage["total_ms"]}')
+            lines.append(f'xhs_stage_duration_ms_count{{stage="{name}"}} {stage["count"]}')
+
+        lines += ["# HELP xhs_stage_errors_total Failed node executions and LLM calls.",
+                  "# TYPE xhs_stage_errors_total counter"]
+        for name, stage in snapshot["stages"].items():
+            lines.append(f'xhs_stage_errors_total{{stage="{name}"}} {stage["errors"]}')
+
+        provider_metrics = [
+            ("calls", "xhs_llm_calls_total", "LLM calls."),
+            ("prompt_tokens", "xhs_llm_prompt_tokens_total", "Prompt tokens reported by the provider."),
+            ("completion_tokens", "xhs_llm_completion_tokens_total", "Completion tokens reported by the provider."),
+            ("retries", "xhs_llm_retries_total", "Retried LLM requests."),
+            ("cost_usd", "xhs_llm_cost_usd_total", "Estimated LLM cost in USD."),
+        ]
+        for key, metric, help_text in provider_metrics:
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+            for provider, usage in snapshot["providers"].items():
+                lines.append(f'{metric}{{provider="{provider}"}} {usage[key]}')
+
+        requests = snapshot["requests"]
+        lines += [
+            "# HELP xhs_requests_total Generation requests.",
+            "# TYPE xhs_requests_total counter",
+            f'xhs_requests_total {requests["total"]}',
+            "# HELP xhs_requests_coalesced_total Generation requests served by an identical in-flight run.",
+            "# TYPE xhs_requests_coalesced_total counter",
+            f'xhs_requests_coalesced_total {requests["coalesced"]}',
+        ]
+
+        return "\n".join(lines) + "\n"
+
+
+_metrics = MetricsRegistry()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Get the process-wide metrics registry."""
+    return _metrics
+
+
+def current_node() -> tuple[str | None, str | None]:
+    """(thread_id, node) of the instrumented node running in this task."""
+    return _current_node.get()
+
+
+def instrument_node(name: str):
+    """
+    Decorator: time a graph node and record it under `name`.
+
+    The wrapped node always accepts (state, config) so the thread_id can be
+    read from the run config; the original function only receives config if
+    it declares it. LLM calls made inside the node are attributed to it.
+
+    Args:
+        name: Node name used in the graph
+    """
+    def decorator(fn):
+        takes_config = "config" in inspect.signature(fn).parameters
+
+        async def wrapper(state: dict, config):
+            thread_id = (config or {}).get("configurable", {}).get("thread_id")
+            token = _current_node.set((thread_id, name))
+            start = time.perf_counter()
+            error = False
+            try:
+                return await (fn(state, config) if takes_config else fn(state))
+            except BaseException:
+                error = True
+                raise
+            finally:
+                _current_node.reset(token)
+                get_metrics().record_node(name, (time.perf_counter() - start) * 1000, thread_id, error)
+
+        # Not functools.wraps: LangGraph must see the wrapper's own signature
+        wrapper.__name__ = fn.__name__
+        wrapper.__qualname__ = fn.__qualname__
+        wrapper.__doc__ = fn.__doc__
+        return wrapper
+    return decorator
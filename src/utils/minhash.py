@@ -0,0 +1,100 @@
+"""MinHash signatures and LSH band keys over CJK character n-grams (pure stdlib)."""
+
+import hashlib
+import os
+import random
+import re
+import zlib
+from array import array
+from .hashtags import HASHTAG
+
+# Signature length and its split into LSH bands. With 16 bands of 4 rows a
+# pair with Jaccard 0.7 shares a band ~99% of the time, a pair at 0.3 ~12%.
+MINHASH_PERMUTATIONS = int(os.environ.get("MINHASH_PERMUTATIONS", 64))
+MINHASH_BANDS = int(os.environ.get("MINHASH_BANDS", 16))
+
+# Characters per shingle
+MINHASH_NGRAM = int(os.environ.get("MINHASH_NGRAM", 3))
+
+# Mersenne prime for the (a * x + b) mod p permutations
+_PRIME = (1 << 61) - 1
+
+# Fixed seed: signatures are persisted and must be comparable across runs
+_PERMUTATIONS = [
+    (rng.randrange(1, _PRIME), rng.randrange(0, _PRIME))
+    for rng in [random.Random(20240601)]
+    for _ in range(MINHASH_PERMUTATIONS)
+]
+
+# Hashtags (HASHTAG) are shared by every post on a topic and would mask
+# real differences; everything but CJK, letters and digits is layout
+_NOISE = re.compile(r"[^0-9a-z\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase text without hashtags, punctuation, emojis or whitespace."""
+    return _NOISE.sub("", HASHTAG.sub("", text.lower()))
+
+
+def shingles(text: str, n: int = MINHASH_NGRAM) -> set[int]:
+    """
+    Hashed character n-grams of the normalized text.
+
+    Args:
+        text: Post or source text
+        n: Characters per shingle
+
+    Returns:
+        Set of 32-bit shingle hashes (a text shorter than n gives one shingle)
+    """
+    chars = normalize(text)
+    if len(chars) <= n:
+        return {zlib.crc32(chars.encode("utf-8"))} if chars else set()
+    return {zlib.crc32(chars[i:i + n].encode("utf-8")) for i in range(len(chars) - n + 1)}
+
+
+def signature(text: str) -> list[int]:
+    """
+    MinHash signature of a text.
+
+    The fraction of equal positions in two signatures estimates the Jaccard
+    similarity of their shingle sets.
+
+    Returns:
+        MINHASH_PERMUTATIONS integers (all _PRIME for an empty text)
+    """
+    hashes = shingles(text)
+    if not hashes:
+        return [_PRIME] * MINHASH_PERMUTATIONS
+    return [min([(a * x + b) % _PRIME for x in hashes]) for a, b in _PERMUTATIONS]
+
+
+def band_keys(sig: list[int], bands: int = MINHASH_BANDS) -> list[int]:
+    """
+    LSH bucket keys: one signed 64-bit key per band of the signature.
+
+    Texts sharing any key are candidate near-duplicates. The band number is
+    part of the key, so all bands can live in one lookup table.
+    """
+    rows = len(sig) // bands
+    keys = []
+    for i in range(bands):
+        band = array("Q", sig[i * rows:(i + 1) * rows]).tobytes()
+        digest = hashlib.blake2b(band, digest_size=8, salt=i.to_bytes(8, "little")).digest()
+        keys.append(int.from_bytes(digest, "little", signed=True))
+    return keys
+
+
+def similarity(sig_a: list[int], sig_b: list[int]) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(a == b for a, b in zip(sig_a, sig_b)) / max(1, len(sig_a))
+
+
+def pack(sig: list[int]) -> bytes:
+    """Signature as bytes for storage."""
+    return array("Q", sig).tobytes()
+
+
+def unpack(data: bytes) -> list[int]:
+    """Signature stored with pack()."""
+    return array("Q", data).tolist()
@@ -0,0 +1,199 @@
+"""Incremental parser for a JSON object arriving in fragments (streamed structured output)."""
+
+import json
+import re
+
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class PartialJSONParser:
+    """
+    Parse a flat JSON object while it streams in, one fragment at a time.
+
+    String values are exposed as they grow, so a streamed {"title": ...,
+    "body": ...} shows the title as soon as it is complete and the body
+    while it is being written. Non-string values (numbers, lists, nested
+    objects) appear once complete. Each character is looked at once; string
+    contents are copied in slices between quotes and backslashes.
+
+    Usage:
+        parser = PartialJSONParser()
+        for fragment in stream:
+            if parser.feed(fragment):
+                show(parser.values, parser.completed)
+    """
+
+    def __init__(self):
+        self.values: dict = {}
+        self.completed: set[str] = set()
+        self.done = False
+        self._state = "start"
+        self._key: list[str] = []
+        self._key_escape = False
+        self._current: str | None = None
+        self._parts: list[str] = []
+        self._escape: str | None = None  # pending escape: "" after "\", hex digits after "\u"
+        self._high_surrogate: int | None = None
+        self._depth = 0
+        self._in_string = False
+
+    def feed(self, fragment: str) -> bool:
+        """
+        Consume the next fragment.
+
+        Args:
+            fragment: Next piece of the JSON text
+
+        Returns:
+            True if any value changed or completed
+        """
+        changed = False
+        i, n = 0, len(fragment)
+        while i < n and not self.done:
+            state = self._state
+            if state == "string":
+                i, grew = self._feed_string(fragment, i)
+                changed = changed or grew
+                continue
+
+            char = fragment[i]
+            i += 1
+            if state == "start":
+                if char == "{":
+                    self._state = "key_or_end"
+            elif state == "key_or_end":
+                if char == '"':
+                    self._key = []
+                    self._state = "key"
+                elif char == "}":
+                    self.done = True
+            elif state == "key":
+                if self._key_escape:
+                    self._key.append(_ESCAPES.get(char, char))
+                    self._key_escape = False
+                elif char == "\\":
+                    self._key_escape = True
+                elif char == '"':
+                    self._state = "colon"
+                else:
+                    self._key.append(char)
+            elif state == "colon":
+                if char == ":":
+                    self._current = "".join(self._key)
+                    self._state = "value"
+            elif state == "value":
+                if char == '"':
+                    self._parts = []
+                    self.values[self._current] = ""
+                    self._state = "string"
+                    changed = True
+                elif not char.isspace():
+                    self._parts = [char]
+                    self._depth = 1 if char in "[{" else 0
+                    self._in_string = False
+                    self._state = "raw"
+            elif state == "raw":
+                changed = self._feed_raw(char) or changed
+            elif state == "after_value":
+                if char == ",":
+                    self._state = "key_or_end"
+                elif char == "}":
+                    self.done = True
+        return changed
+
+    def _feed_string(self, fragment: str, i: int) -> tuple[int, bool]:
+        """Consume string contents from position i; return the new position and whether the value grew."""
+        start_len = len(self._parts)
+        n = len(fragment)
+        while i < n:
+            if self._escape is not None:
+                i = self._feed_escape(fragment, i)
+                continue
+            match = _STRING_SPECIAL.search(fragment, i)
+            end = match.start() if match else n
+            if end > i:
+                self._flush_surrogate()
+                self._parts.append(fragment[i:end])
+            if match is None:
+                i = n
+                break
+            i = end + 1
+            if match.group() == "\\":
+                self._escape = ""
+            else:
+                self._flush_surrogate()
+                self.values[self._current] = "".join(self._parts)
+                self.completed.add(self._current)
+                self._state = "after_value"
+                return i, True
+
+        grew = len(self._parts) != start_len
+        if grew:
+            self.values[self._current] = "".join(self._parts)
+        return i, grew
+
+    def _feed_escape(self, fragment: str, i: int) -> int:
+        """Consume (part of) an escape sequence; it may span fragments."""
+        if self._escape == "":
+            char = fragment[i]
+            if char == "u":
+                self._escape = "u"
+            else:
+                self._flush_surrogate()
+                self._parts.append(_ESCAPES.get(char, char))
+                self._escape = None
+            return i + 1
+
+        # \uXXXX: collect four hex digits
+        needed = 5 - len(self._escape)
+        self._escape += fragment[i:i + needed]
+        i += min(needed, len(fragment) - i)
+        if len(self._escape) == 5:
+            code = int(self._escape[1:], 16)
+            self._escape = None
+            if 0xD800 <= code < 0xDC00:
+                self._flush_surrogate()
+                self._high_surrogate = code
+            elif 0xDC00 <= code < 0xE000 and self._high_surrogate is not None:
+                self._parts.append(chr(0x10000 + (self._high_surrogate - 0xD800) * 0x400 + code - 0xDC00))
+                self._high_surrogate = None
+            else:
+                self._flush_surrogate()
+                self._parts.append(chr(code))
+        return i
+
+    def _flush_surrogate(self) -> None:
+        """Emit a lone high surrogate as U+FFFD."""
+        if self._high_surrogate is not None:
+            self._parts.append("\ufffd")
+            self._high_surrogate = None
+
+    def _feed_raw(self, char: str) -> bool:
+        """Consume one character of a non-string value; True when the value completed."""
+        if self._in_string:
+            self._parts.append(char)
+            if self._escape is not None:
+                self._escape = None
+            elif char == "\\":
+                self._escape = ""
+            elif char == '"':
+                self._in_string = False
+            return False
+
+        if self._depth == 0 and (char == "," or char == "}"):
+            self.values[self._current] = json.loads("".join(self._parts))
+            self.completed.add(self._current)
+            self._state = "key_or_end"
+            self.done = char == "}"
+            return True
+
+        self._parts.append(char)
+        if char == '"':
+            self._in_string = True
+        elif char in "[{":
+            self._depth += 1
+        elif char in "]}":
+            self._depth -= 1
+        return False
@@ -0,0 +1,22 @@
+"""Filesystem locations for persistent data."""
+
+import os
+from pathlib import Path
+
+# Root directory for databases and caches (override with XHS_DATA_DIR)
+DATA_DIR = Path(os.environ.get("XHS_DATA_DIR", Path.home() / ".xhs-assistant")).expanduser()
+
+
+def data_path(*parts: str) -> Path:
+    """
+    Build a path under DATA_DIR, creating parent directories as needed.
+
+    Args:
+        *parts: Path components relative to DATA_DIR
+
+    Returns:
+        Absolute Path inside the data directory
+    """
+    path = DATA_DIR.joinpath(*parts)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return path
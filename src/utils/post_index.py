@@ -0,0 +1,276 @@
+"""Local SQLite index of every final post, for near-duplicate lookups and hashtag suggestions."""
+
+import asyncio
+import json
+import logging
+import os
+import time
+import aiosqlite
+from .hashtags import HashtagIndex, extract_hashtags, post_terms
+from .minhash import band_keys, pack, signature, similarity, unpack
+from .paths import data_path
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+POST_INDEX_DB_PATH = os.environ.get("POST_INDEX_DB_PATH", "")
+
+# Estimated Jaccard similarity (over character 3-grams) from which two
+# posts count as near-duplicates
+VARIETY_THRESHOLD = float(os.environ.get("VARIETY_THRESHOLD", 0.6))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    id INTEGER PRIMARY KEY,
+    thread_id TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    body TEXT NOT NULL,
+    signature BLOB NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS post_bands (
+    key INTEGER NOT NULL,
+    post_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS post_bands_key ON post_bands (key);
+CREATE INDEX IF NOT EXISTS post_bands_post ON post_bands (post_id);
+CREATE TABLE IF NOT EXISTS post_tags (
+    post_id INTEGER PRIMARY KEY,
+    hashtags TEXT NOT NULL,
+    terms TEXT NOT NULL
+);
+"""
+
+
+def post_signature(title: str, body: str) -> list[int]:
+    """MinHash signature of a post, as stored in the index."""
+    return signature(f"{title}\n{body}")
+
+
+def _tags_and_terms(text: str) -> tuple[list[str], list[str]]:
+    """Hashtags and keywords of a post, as stored for the hashtag index."""
+    return extract_hashtags(text), post_terms(text)
+
+
+def _score_candidates(rows: list, sig: list[int], threshold: float, exclude_thread_id: str | None) -> list[dict]:
+    """Candidate posts (id, thread_id, title, signature, created_at rows) at least threshold similar, best first."""
+    matches = []
+    for _, thread_id, title, match_sig, created_at in rows:
+        if thread_id == exclude_thread_id:
+            continue
+        score = similarity(sig, unpack(match_sig))
+        if score >= threshold:
+            matches.append({"thread_id": thread_id, "title": title, "similarity": round(score, 3), "created_at": created_at})
+    matches.sort(key=lambda m: m["similarity"], reverse=True)
+    return matches
+
+
+class NearDuplicateError(ValueError):
+    """A post is too similar to one published earlier (see VARIETY_CHECK)."""
+
+    def __init__(self, message: str, matches: list[dict]):
+        super().__init__(message)
+        self.matches = matches
+
+
+class PostIndex:
+    """
+    MinHash/LSH index of final posts, one entry per workflow thread.
+
+    Each post is stored with its MinHash signature (src/utils/minhash.py)
+    and one row per LSH band key. A lookup reads the posts sharing a band
+    key with the query and compares only their signatures, so its cost
+    depends on the number of similar posts, not on the size of the index.
+
+    Each post's hashtags and keywords are stored as well; they feed the
+    in-memory HashtagIndex (src/utils/hashtags.py), built on first use
+    and kept current by add().
+
+    Args:
+        path: SQLite database file
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: aiosqlite.Connection | None = None
+        self._open_lock = asyncio.Lock()
+        # One connection is shared; a statement must not be in progress
+        # when another task commits
+        self._write_lock = asyncio.Lock()
+        self._hashtags: HashtagIndex | None = None
+        self._hashtags_lock = asyncio.Lock()
+
+    async def open(self) -> None:
+        """Open the database and create the schema."""
+        async with self._open_lock:
+            if self._conn is not None:
+                return
+            conn = aiosqlite.connect(self.path)
+            # Don't let the connection thread block interpreter exit
+            conn.daemon = True
+            await conn
+            await conn.execute("PRAGMA journal_mode=WAL")
+            await conn.execute("PRAGMA synchronous=NORMAL")
+            await conn.executescript(_SCHEMA)
+            await conn.commit()
+            self._conn = conn
+
+    async def aclose(self) -> None:
+        """Close the database (reopened on next use)."""
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            await conn.close()
+
+    async def add(self, thread_id: str, title: str, body: str, sig: list[int] | None = None) -> int:
+        """
+        Index a thread's final post, replacing the thread's previous version.
+
+        Args:
+            thread_id: Workflow thread the post belongs to
+            title / body: The post
+            sig: Its signature, if already computed (see post_signature)
+
+        Returns:
+            Row id of the indexed post
+        """
+        await self.open()
+        sig = sig or await asyncio.to_thread(post_signature, title, body)
+        tags, terms = await asyncio.to_thread(_tags_and_terms, f"{title}\n{body}")
+        async with self._write_lock:
+            old = await self._conn.execute_fetchall(
+                "SELECT hashtags, terms FROM post_tags WHERE post_id IN (SELECT id FROM posts WHERE thread_id = ?)",
+                (thread_id,),
+            )
+            for table in ("post_bands", "post_tags"):
+                await self._conn.execute(
+                    f"DELETE FROM {table} WHERE post_id IN (SELECT id FROM posts WHERE thread_id = ?)", (thread_id,)
+                )
+            await self._conn.execute("DELETE FROM posts WHERE thread_id = ?", (thread_id,))
+            cursor = await self._conn.execute(
+                "INSERT INTO posts (thread_id, title, body, signature, created_at) VALUES (?, ?, ?, ?, ?)",
+                (thread_id, title, body, pack(sig), time.time()),
+            )
+            post_id = cursor.lastrowid
+            await self._conn.executemany(
+                "INSERT INTO post_bands (key, post_id) VALUES (?, ?)",
+                [(key, post_id) for key in set(band_keys(sig))],
+            )
+            await self._conn.execute(
+                "INSERT INTO post_tags (post_id, hashtags, terms) VALUES (?, ?, ?)",
+                (post_id, json.dumps(tags, ensure_ascii=False), json.dumps(terms, ensure_ascii=False)),
+            )
+            await self._conn.commit()
+            if self._hashtags is not None:
+                for old_tags, old_terms in old:
+                    self._hashtags.remove(json.loads(old_tags), json.loads(old_terms))
+                self._hashtags.add(tags, terms)
+        return post_id
+
+    async def hashtag_index(self) -> HashtagIndex:
+        """
+        The hashtag index over every indexed post (loaded on first call).
+
+        Posts indexed before hashtags were tracked are backfilled from
+        their stored text.
+        """
+        if self._hashtags is not None:
+            return self._hashtags
+        await self.open()
+        async with self._hashtags_lock:
+            if self._hashtags is not None:
+                return self._hashtags
+            start = time.perf_counter()
+            async with self._write_lock:
+                missing = await self._conn.execute_fetchall(
+                    "SELECT id, title, body FROM posts WHERE id NOT IN (SELECT post_id FROM post_tags)"
+                )
+                if missing:
+                    rows = []
+                    for post_id, title, body in missing:
+                        text = f"{title}\n{body}"
+                        rows.append((
+                            post_id,
+                            json.dumps(extract_hashtags(text), ensure_ascii=False),
+                            json.dumps(post_terms(text), ensure_ascii=False),
+                        ))
+                    await self._conn.executemany(
+                        "INSERT INTO post_tags (post_id, hashtags, terms) VALUES (?, ?, ?)", rows
+                    )
+                    await self._conn.commit()
+                index = HashtagIndex()
+                for tags, terms in await self._conn.execute_fetchall("SELECT hashtags, terms FROM post_tags"):
+                    index.add(json.loads(tags), json.loads(terms))
+                self._hashtags = index
+            logger.info(
+                f"🏷️ Loaded hashtag index: {index.stats()} in {(time.perf_counter() - start) * 1000:.0f}ms"
+                + (f" ({len(missing)} posts backfilled)" if missing else "")
+            )
+            return index
+
+    async def find_similar(self, title: str, body: str, threshold: float | None = None, limit: int = 10,
+                           exclude_thread_id: str | None = None, sig: list[int] | None = None) -> dict:
+        """
+        Find indexed posts similar to a post.
+
+        Args:
+            title / body: The post to look up
+            threshold: Minimum estimated similarity (default: VARIETY_THRESHOLD)
+            limit: Maximum matches returned
+            exclude_thread_id: Thread to leave out (the post's own earlier version)
+            sig: The post's signature, if already computed (see post_signature)
+
+        Returns:
+            dict with:
+                - matches: Most similar first, each with thread_id, title,
+                  similarity and created_at
+                - candidates: Posts sharing an LSH band (signatures compared)
+        """
+        await self.open()
+        threshold = VARIETY_THRESHOLD if threshold is None else threshold
+        sig = sig or await asyncio.to_thread(post_signature, title, body)
+        keys = band_keys(sig)
+        rows = await self._conn.execute_fetchall(
+            f"""
+            SELECT id, thread_id, title, signature, created_at FROM posts
+            WHERE id IN (SELECT post_id FROM post_bands WHERE key IN ({', '.join('?' * len(keys))}))
+            """,
+            keys,
+        )
+        matches = await asyncio.to_thread(_score_candidates, rows, sig, threshold, exclude_thread_id) if rows else []
+        return {"matches": matches[:limit], "candidates": len(rows)}
+
+    async def get(self, thread_id: str) -> dict | None:
+        """Indexed post of a thread (None if the thread has none)."""
+        await self.open()
+        rows = await self._conn.execute_fetchall(
+            "SELECT thread_id, title, body, created_at FROM posts WHERE thread_id = ?", (thread_id,)
+        )
+        return dict(zip(("thread_id", "title", "body", "created_at"), rows[0])) if rows else None
+
+    async def stats(self) -> dict:
+        """Number of indexed posts and LSH bucket entries."""
+        await self.open()
+        rows = await self._conn.execute_fetchall(
+            "SELECT (SELECT COUNT(*) FROM posts), (SELECT COUNT(*) FROM post_bands)"
+        )
+        posts, bands = rows[0]
+        return {"posts": posts, "band_entries": bands, "threshold": VARIETY_THRESHOLD, "path": self.path}
+
+
+_post_index: PostIndex | None = None
+
+
+def get_post_index() -> PostIndex:
+    """Get the process-wide post index (opened lazily, at POST_INDEX_DB_PATH or the data directory)."""
+    global _post_index
+    if _post_index is None:
+        _post_index = PostIndex(POST_INDEX_DB_PATH or str(data_path("posts.sqlite")))
+    return _post_index
+
+
+async def close_post_index() -> None:
+    """Close the process-wide post index."""
+    global _post_index
+    index, _post_index = _post_index, None
+    if index is not None:
+        await index.aclose()
@@ -0,0 +1,91 @@
+"""Per-provider rate limiting for LLM calls."""
+
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+
+
+def _parse_limits(value: str) -> dict[str, float]:
+    """Parse "deepseek=5,openai=10" into {"deepseek": 5.0, "openai": 10.0}."""
+    limits = {}
+    for item in value.split(","):
+        if "=" in item:
+            provider, limit = item.split("=", 1)
+            limits[provider.strip()] = float(limit)
+    return limits
+
+
+# Requests per second and concurrent requests allowed per provider
+# (e.g. LLM_RATE_LIMITS="deepseek=5,openai=10"); unset means unlimited
+LLM_RATE_LIMITS = _parse_limits(os.environ.get("LLM_RATE_LIMITS", ""))
+LLM_MAX_CONCURRENCY = _parse_limits(os.environ.get("LLM_MAX_CONCURRENCY", ""))
+
+
+class AsyncRateLimiter:
+    """
+    Token bucket plus concurrency cap for one provider.
+
+    Args:
+        rate: Requests per second (None = unlimited)
+        burst: Bucket size; defaults to max(1, rate)
+        max_concurrency: Maximum in-flight requests (None = unlimited)
+    """
+
+    def __init__(self, rate: float | None = None, burst: float | None = None, max_concurrency: int | None = None):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate or 1.0)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self._semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+        self.waited_seconds = 0.0
+
+    async def _take_token(self) -> None:
+        if not self.rate:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+                self.waited_seconds += wait
+                await asyncio.sleep(wait)
+
+    @asynccontextmanager
+    async def limit(self):
+        """Wait for a token and a concurrency slot for the duration of one request."""
+        if self._semaphore is None:
+            await self._take_token()
+            yield
+            return
+        async with self._semaphore:
+            await self._take_token()
+            yield
+
+
+_limiters: dict[str, AsyncRateLimiter] = {}
+
+
+def get_rate_limiter(provider: str) -> AsyncRateLimiter:
+    """
+    Get the shared rate limiter for a provider.
+
+    Args:
+        provider: Model provider name (e.g. "deepseek")
+
+    Returns:
+        AsyncRateLimiter configured from LLM_RATE_LIMITS / LLM_MAX_CONCURRENCY
+    """
+    limiter = _limiters.get(provider)
+    if limiter is None:
+        concurrency = LLM_MAX_CONCURRENCY.get(provider)
+        limiter = _limiters[provider] = AsyncRateLimiter(
+            rate=LLM_RATE_LIMITS.get(provider),
+            max_concurrency=int(concurrency) if concurrency else None,
+        )
+    return limiter
@@ -0,0 +1,28 @@
+"""Cheap token estimates for budgeting prompts."""
+
+import re
+
+# CJK ideographs, kana, hangul and full-width punctuation: roughly one token each
+_CJK = re.compile(r"[\u3000-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the token count of mixed Chinese/English text.
+
+    CJK characters count as one token each, everything else as one token
+    per four characters. Good enough for budgets; not a tokenizer.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Estimated number of tokens
+    """
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def estimate_message_tokens(messages: list) -> int:
+    """Estimate tokens for a list of chat messages (content plus per-message overhead)."""
+    return sum(estimate_tokens(str(m.content)) + 4 for m in messages)